@@ -39,6 +39,11 @@ class OrderSerializer(serializers.ModelSerializer):
         
         return order
 
+class OrderBulkStatusUpdateSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(child=serializers.UUIDField(), min_length=1, max_length=500)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    restaurant_id = serializers.UUIDField(required=False)
+
 class MenuItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuItem
@@ -1,3 +1,156 @@
+from unittest.mock import patch
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from ..models import Order, Restaurant, Role, User, UserRole
+from ..utils import apply_order_transitions, is_valid_order_transition
+from ..views import OrderViewSet
+
+
+def create_restaurant(name):
+    return Restaurant.objects.create(
+        name=name,
+        address={'street': '1 Main St'},
+        contact_info={'phone': '555-0100'},
+        operation_hours={}
+    )
+
+
+def create_order(restaurant, order_status='pending'):
+    return Order.objects.create(
+        restaurant=restaurant,
+        order_type='sales',
+        status=order_status,
+        total_amount='10.00'
+    )
+
+
+class OrderStateMachineTests(TestCase):
+    def setUp(self):
+        self.restaurant = create_restaurant('Main')
+        self.other_restaurant = create_restaurant('Other')
+
+    def test_transition_table(self):
+        self.assertTrue(is_valid_order_transition('pending', 'confirmed'))
+        self.assertTrue(is_valid_order_transition('ready', 'delivered'))
+        self.assertFalse(is_valid_order_transition('pending', 'ready'))
+        self.assertFalse(is_valid_order_transition('delivered', 'cancelled'))
+        self.assertFalse(is_valid_order_transition('unknown', 'confirmed'))
+
+    def test_only_eligible_orders_move(self):
+        pending = create_order(self.restaurant)
+        delivered = create_order(self.restaurant, 'delivered')
+
+        result = apply_order_transitions([pending.id, delivered.id], 'confirmed')
+
+        self.assertEqual(result, {'updated': [str(pending.id)], 'rejected': [str(delivered.id)]})
+        pending.refresh_from_db()
+        delivered.refresh_from_db()
+        self.assertEqual(pending.status, 'confirmed')
+        self.assertEqual(delivered.status, 'delivered')
+
+    def test_restaurant_scope(self):
+        own = create_order(self.restaurant)
+        foreign = create_order(self.other_restaurant)
+
+        result = apply_order_transitions([own.id, foreign.id], 'confirmed', restaurant_ids={self.restaurant.id})
+
+        self.assertEqual(result['updated'], [str(own.id)])
+        self.assertEqual(result['rejected'], [str(foreign.id)])
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'pending')
+
+
+class OrderStatusAPITests(TestCase):
+    def setUp(self):
+        self.restaurant = create_restaurant('Main')
+        self.other_restaurant = create_restaurant('Other')
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        role = Role.objects.create(role_name='waiter', permissions={})
+        UserRole.objects.create(user=self.user, role=role, restaurant=self.restaurant)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_update_status(self):
+        order = create_order(self.restaurant)
+
+        response = self.client.patch(f'/api/orders/{order.id}/update_status/', {'status': 'confirmed'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'confirmed')
+
+    def test_update_status_rejects_invalid_transition(self):
+        order = create_order(self.restaurant)
+
+        response = self.client.patch(f'/api/orders/{order.id}/update_status/', {'status': 'delivered'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'pending')
+
+    def test_update_status_conflict(self):
+        order = create_order(self.restaurant)
+        # Another request cancels the order after this one has read it
+        Order.objects.filter(id=order.id).update(status='cancelled')
+
+        with patch.object(OrderViewSet, 'get_object', return_value=order):
+            response = self.client.patch(f'/api/orders/{order.id}/update_status/', {'status': 'confirmed'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+
+    def test_bulk_update_status_is_scoped_to_staff_restaurants(self):
+        own = create_order(self.restaurant)
+        finished = create_order(self.restaurant, 'delivered')
+        foreign = create_order(self.other_restaurant)
+
+        response = self.client.post(
+            '/api/orders/bulk_update_status/',
+            {'order_ids': [str(own.id), str(finished.id), str(foreign.id)], 'status': 'confirmed'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], [str(own.id)])
+        self.assertEqual(set(response.data['rejected']), {str(finished.id), str(foreign.id)})
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'pending')
+
+    def test_bulk_update_status_rejects_foreign_restaurant(self):
+        foreign = create_order(self.other_restaurant)
+
+        response = self.client.post(
+            '/api/orders/bulk_update_status/',
+            {'order_ids': [str(foreign.id)], 'status': 'confirmed', 'restaurant_id': str(self.other_restaurant.id)},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'pending')
+
+    def test_bulk_update_status_requires_a_restaurant_role(self):
+        order = create_order(self.restaurant)
+        outsider = User.objects.create_user(username='outsider', password='testpass123')
+        self.client.force_authenticate(user=outsider)
+
+        response = self.client.post(
+            '/api/orders/bulk_update_status/',
+            {'order_ids': [str(order.id)], 'status': 'confirmed'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_update_status_validates_order_ids(self):
+        response = self.client.post(
+            '/api/orders/bulk_update_status/',
+            {'order_ids': ['not-a-uuid'], 'status': 'confirmed'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('order_ids', response.data)
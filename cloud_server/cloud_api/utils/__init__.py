@@ -1,3 +1,5 @@
 from .account_utils import *
 from .ticket_utils import *
-from .payment_gateways import *
\ No newline at end of file
+from .payment_gateways import *
+from .order_state_machine import *
+from .menu_cache_utils import *
\ No newline at end of file
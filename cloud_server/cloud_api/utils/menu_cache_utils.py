@@ -0,0 +1,105 @@
+import gzip
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from ..models import Menu
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Rendered bodies are keyed by version, so stale ones just expire
+MENU_RENDER_TIMEOUT = 24 * 60 * 60
+
+
+def bump_menu_version(menu_id):
+    """Advance a menu's version after it or one of its items changed"""
+    Menu.objects.filter(id=menu_id).update(version=F('version') + 1)
+
+
+def accepted_encoding(request):
+    """Best content encoding the client accepts: 'br', 'gzip' or 'identity'"""
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    if BROTLI_AVAILABLE and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return 'identity'
+
+
+def menu_etag(tag, encoding='identity'):
+    """Strong ETag per menu version and content encoding"""
+    suffix = '' if encoding == 'identity' else f'-{encoding}'
+    return f'"{tag}{suffix}"'
+
+
+def etag_matches(request, tag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+
+    # Any encoding of the same version is the same menu
+    current = {menu_etag(tag, encoding) for encoding in ('identity', 'gzip', 'br')}
+    for value in header.split(','):
+        value = value.strip()
+        if value.startswith('W/'):
+            value = value[2:]
+        if value in current:
+            return True
+    return False
+
+
+def rendered_menu(key, tag, build):
+    """
+    Bodies for one menu version in every supported encoding.
+    `build` produces the payload; it only runs when this version is not cached yet.
+    """
+    cache_key = f'menu_render_{key}_{tag}'
+    bodies = cache.get(cache_key)
+    if bodies is None:
+        identity = JSONRenderer().render(build())
+        bodies = {
+            'identity': identity,
+            'gzip': gzip.compress(identity, compresslevel=9, mtime=0),
+        }
+        if BROTLI_AVAILABLE:
+            bodies['br'] = brotli.compress(identity, quality=11)
+        cache.set(cache_key, bodies, MENU_RENDER_TIMEOUT)
+    return bodies
+
+
+def menu_response(request, key, tag, build):
+    """200 with the pre-rendered body, or 304 when the client already has this version"""
+    encoding = accepted_encoding(request)
+
+    if etag_matches(request, tag):
+        response = HttpResponseNotModified()
+    else:
+        bodies = rendered_menu(key, tag, build)
+        if encoding not in bodies:
+            encoding = 'gzip'  # Rendered by a worker without brotli
+        response = HttpResponse(bodies[encoding], content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = menu_etag(tag, encoding)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,60 @@
+from types import MappingProxyType
+from django.db import transaction
+from django.utils import timezone
+from ..models import Order
+
+# Frozen transition table for cloud orders, built once at import time
+ORDER_TRANSITIONS = MappingProxyType({
+    'pending': frozenset({'confirmed', 'cancelled'}),
+    'confirmed': frozenset({'preparing', 'cancelled'}),
+    'preparing': frozenset({'ready', 'cancelled'}),
+    'ready': frozenset({'in_delivery', 'delivered'}),
+    'in_delivery': frozenset({'delivered'}),
+    'delivered': frozenset(),  # Final state
+    'cancelled': frozenset(),  # Final state
+})
+
+# Reverse index: statuses an order may be in to move to a given status
+ORDER_TRANSITION_SOURCES = MappingProxyType({
+    target: frozenset(source for source, targets in ORDER_TRANSITIONS.items() if target in targets)
+    for target in ORDER_TRANSITIONS
+})
+
+_NO_STATUSES = frozenset()
+
+def is_valid_order_transition(current_status, new_status):
+    """Check whether an order may move from current_status to new_status"""
+    return new_status in ORDER_TRANSITIONS.get(current_status, _NO_STATUSES)
+
+def apply_order_transitions(order_ids, new_status, restaurant_ids=None):
+    """Move many orders to new_status with one conditional UPDATE
+    
+    When restaurant_ids is given, orders belonging to other restaurants are
+    left untouched and reported as rejected.
+    """
+    sources = ORDER_TRANSITION_SOURCES.get(new_status, _NO_STATUSES)
+    order_ids = [str(order_id) for order_id in order_ids]
+    if not sources:
+        return {'updated': [], 'rejected': order_ids}
+    
+    queryset = Order.objects.filter(id__in=order_ids, status__in=sources)
+    if restaurant_ids is not None:
+        queryset = queryset.filter(restaurant_id__in=restaurant_ids)
+    
+    with transaction.atomic():
+        # Lock eligible rows first so callers learn exactly which orders moved
+        updated = [
+            str(order_id)
+            for order_id in queryset.select_for_update().values_list('id', flat=True)
+        ]
+        if updated:
+            Order.objects.filter(id__in=updated, status__in=sources).update(
+                status=new_status,
+                updated_at=timezone.now()
+            )
+    
+    updated_set = set(updated)
+    return {
+        'updated': updated,
+        'rejected': [order_id for order_id in order_ids if order_id not in updated_set]
+    }
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from ..models import Menu, MenuItem, Restaurant, UserRole
 from ..serializers import MenuSerializer, MenuItemSerializer, MenuWithItemsSerializer
+from ..utils.menu_cache_utils import bump_menu_version
 
 class ManagerPermissionMixin:
     def check_manager_permission(self, restaurant_id):
@@ -36,7 +37,8 @@ class MenuManagerViewSet(ManagerPermissionMixin, viewsets.ModelViewSet):
         restaurant_id = serializer.instance.restaurant.id
         if not self.check_manager_permission(restaurant_id):
             raise PermissionError("Only managers can update menus")
-        serializer.save()
+        menu = serializer.save()
+        bump_menu_version(menu.id)
     
     def perform_destroy(self, instance):
         if not self.check_manager_permission(instance.restaurant.id):
@@ -68,14 +70,20 @@ class MenuItemManagerViewSet(ManagerPermissionMixin, viewsets.ModelViewSet):
         if not self.check_manager_permission(menu.restaurant.id):
             raise PermissionError("Only managers can create menu items")
         serializer.save()
+        bump_menu_version(menu.id)
     
     def perform_update(self, serializer):
         menu = serializer.instance.menu
         if not self.check_manager_permission(menu.restaurant.id):
             raise PermissionError("Only managers can update menu items")
-        serializer.save()
+        item = serializer.save()
+        bump_menu_version(menu.id)
+        if item.menu_id != menu.id:
+            bump_menu_version(item.menu_id)
     
     def perform_destroy(self, instance):
         if not self.check_manager_permission(instance.menu.restaurant.id):
             raise PermissionError("Only managers can delete menu items")
-        instance.delete()
\ No newline at end of file
+        menu_id = instance.menu_id
+        instance.delete()
+        bump_menu_version(menu_id)
\ No newline at end of file
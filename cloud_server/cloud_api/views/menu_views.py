@@ -4,16 +4,20 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from ..models import Menu, MenuItem, UserRole
 from ..serializers import MenuSerializer, MenuItemCreateSerializer, MenuItemCreateSerializer
+from ..utils.menu_cache_utils import bump_menu_version, menu_response
 
 @api_view(['GET'])
 def get_menu(request, menu_id):
     try:
-        menu = Menu.objects.prefetch_related('menuitem_set').get(id=menu_id, is_active=True)
-        serializer = MenuSerializer(menu)
-        return Response(serializer.data)
+        menu = Menu.objects.only('id', 'version').get(id=menu_id, is_active=True)
     except Menu.DoesNotExist:
         return Response({'error': 'Menu not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    def build():
+        return MenuSerializer(Menu.objects.prefetch_related('menuitem_set').get(id=menu.id)).data
+
+    return menu_response(request, f'menu_{menu.id}', f'{menu.id}-v{menu.version}', build)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def add_menu_item(request):
@@ -41,6 +45,7 @@ def add_menu_item(request):
             )
         
         menu_item = serializer.save()
+        bump_menu_version(menu.id)
         return Response(
             {
                 'message': 'Menu item added successfully',
@@ -3,23 +3,30 @@ from rest_framework.response import Response
 from rest_framework import status
 from ..models import Restaurant, Menu, RestaurantTable
 from ..serializers import MenuSerializer
+from ..utils.menu_cache_utils import menu_response
 
 @api_view(['GET'])
 def restaurant_menu(request, restaurant_id):
     try:
         restaurant = Restaurant.objects.get(id=restaurant_id, status='active')
-        menu = Menu.objects.prefetch_related('menuitem_set').get(restaurant=restaurant, is_active=True)
-        serializer = MenuSerializer(menu)
-        return Response({
+        menu = Menu.objects.only('id', 'version').get(restaurant=restaurant, is_active=True)
+    except (Restaurant.DoesNotExist, Menu.DoesNotExist):
+        return Response({'error': 'Restaurant or menu not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    def build():
+        full_menu = Menu.objects.prefetch_related('menuitem_set').get(id=menu.id)
+        return {
             'restaurant': {
                 'id': str(restaurant.id),
                 'name': restaurant.name,
                 'description': restaurant.description
             },
-            'menu': serializer.data
-        })
-    except (Restaurant.DoesNotExist, Menu.DoesNotExist):
-        return Response({'error': 'Restaurant or menu not found'}, status=status.HTTP_404_NOT_FOUND)
+            'menu': MenuSerializer(full_menu).data
+        }
+
+    # Items are only loaded and serialized once per menu version
+    tag = f'{menu.id}-v{menu.version}-{int(restaurant.updated_at.timestamp())}'
+    return menu_response(request, f'restaurant_{restaurant.id}', tag, build)
 
 @api_view(['GET'])
 def restaurant_table_info(request, restaurant_id, table_id):
@@ -1,9 +1,9 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from ..models import Order, OrderItem, SalesOrder, BillingRecord, CustomerAccount
-from ..serializers import OrderSerializer
-from ..utils import check_sufficient_balance
+from ..models import Order, OrderItem, SalesOrder, BillingRecord, CustomerAccount, UserRole
+from ..serializers import OrderSerializer, OrderBulkStatusUpdateSerializer
+from ..utils import check_sufficient_balance, is_valid_order_transition, apply_order_transitions
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all()
@@ -20,11 +20,47 @@ class OrderViewSet(viewsets.ModelViewSet):
     def update_status(self, request, pk=None):
         order = self.get_object()
         new_status = request.data.get('status')
-        if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
-            return Response({'status': 'updated'})
-        return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+        if new_status not in dict(Order.STATUS_CHOICES):
+            return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+        if not is_valid_order_transition(order.status, new_status):
+            return Response(
+                {'error': f'Cannot transition from {order.status} to {new_status}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Conditional update so a concurrent change is not silently overwritten
+        result = apply_order_transitions([order.id], new_status)
+        if not result['updated']:
+            return Response({'error': 'Order status changed concurrently'}, status=status.HTTP_409_CONFLICT)
+        return Response({'status': 'updated'})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        serializer = OrderBulkStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        # Staff may only move orders of restaurants they hold an active role in
+        restaurant_ids = set(
+            UserRole.objects.filter(
+                user=request.user,
+                is_active=True,
+                restaurant__isnull=False
+            ).values_list('restaurant_id', flat=True)
+        )
+        restaurant_id = serializer.validated_data.get('restaurant_id')
+        if restaurant_id:
+            if restaurant_id not in restaurant_ids:
+                return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+            restaurant_ids = {restaurant_id}
+        if not restaurant_ids:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        result = apply_order_transitions(
+            serializer.validated_data['order_ids'],
+            serializer.validated_data['status'],
+            restaurant_ids=restaurant_ids
+        )
+        return Response(result)
     
     @action(detail=True, methods=['post'])
     def add_billing(self, request, pk=None):
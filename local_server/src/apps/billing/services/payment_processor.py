@@ -104,17 +104,16 @@ class PaymentProcessorService:
         """
         Sync payment status from Supabase DB
         """
-        try:
-            # Query Supabase for latest payment status
-            response = supabase_client.client.table('payments')\
-                .select('*')\
-                .eq('id', str(payment.id))\
-                .single()\
-                .execute()
+        self._apply_remote_payments([payment], supabase_client.get_payments([str(payment.id)]))
+    
+    def _apply_remote_payments(self, payments, remote_payments: Dict[str, Dict]):
+        """Copy Supabase payment rows onto the local payment records"""
+        for payment in payments:
+            supabase_payment = remote_payments.get(str(payment.id))
+            if not supabase_payment:
+                continue
             
-            if response.data:
-                supabase_payment = response.data
-                
+            try:
                 # Update local payment record
                 payment.status = supabase_payment.get('status', payment.status).upper()
                 payment.gateway_reference = supabase_payment.get('gateway_reference', '')
@@ -129,37 +128,58 @@ class PaymentProcessorService:
                 
                 logger.info(f"Payment status synced: {payment.id} -> {payment.status}")
                 
-        except Exception as e:
-            logger.error(f"Failed to sync payment status: {str(e)}", exc_info=True)
+            except Exception as e:
+                logger.error(f"Failed to sync payment status: {str(e)}", exc_info=True)
     
     def check_payment_status(self, payment: Payment) -> Dict:
         """
         Check payment status from MTN MoMo
         Called periodically to verify payment completion
         """
+        return self.check_payment_statuses([payment]).get(str(payment.id), {})
+    
+    def check_payment_statuses(self, payments) -> Dict[str, Dict]:
+        """
+        Check several payments at once: the status edge function is called
+        concurrently over the pooled Supabase connection, then the refreshed
+        rows are read back in a single query
+        """
+        payments = list(payments)
+        if not payments:
+            return {}
+        
+        payment_ids = [str(payment.id) for payment in payments]
+        results = {}
+        
+        if supabase_client.circuit_open():
+            return {payment_id: {'error': 'Supabase unreachable'} for payment_id in payment_ids}
+        
         try:
-            # Call edge function to check status
-            response = requests.post(
-                f"{self.edge_function_url}/check-payment-status",
-                json={'payment_id': str(payment.id)},
-                headers={
-                    'Authorization': f'Bearer {self.supabase_key}',
-                    'Content-Type': 'application/json'
-                },
-                timeout=10
-            )
+            checks = supabase_client.check_payment_statuses(payment_ids)
             
-            response.raise_for_status()
-            result = response.json()
-            
-            # Update local payment
-            self._sync_payment_status(payment)
+            for payment_id in payment_ids:
+                result = checks.get(payment_id)
+                if isinstance(result, Exception) or result is None:
+                    error = str(result) if result is not None else 'Supabase unavailable'
+                    logger.error(f"Status check failed for {payment_id}: {error}")
+                    results[payment_id] = {'error': error}
+                else:
+                    results[payment_id] = result
             
-            return result
+            # Update local payments
+            checked = [payment for payment in payments if 'error' not in results[str(payment.id)]]
+            if checked:
+                self._apply_remote_payments(
+                    checked,
+                    supabase_client.get_payments([str(payment.id) for payment in checked])
+                )
             
         except Exception as e:
             logger.error(f"Status check failed: {str(e)}", exc_info=True)
-            return {'error': str(e)}
+            for payment_id in payment_ids:
+                results.setdefault(payment_id, {'error': str(e)})
+        
+        return results
 
 
 class CryptoPaymentProcessor:
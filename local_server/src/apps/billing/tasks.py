@@ -27,10 +27,8 @@ def monitor_pending_payments():
             created_at__gte=timezone.now() - timedelta(hours=1)
         )
         
-        momo_count = 0
-        for payment in momo_payments:
-            payment_processor.check_payment_status(payment)
-            momo_count += 1
+        # Checked concurrently, one edge call per payment over pooled connections
+        momo_count = len(payment_processor.check_payment_statuses(momo_payments))
         
         # Get pending crypto payments
         blockchain_service = BlockchainPaymentService()
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = 'apps.core'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from apps.core.models import Restaurant
+        from apps.core.services.restaurant_cache import invalidate_restaurant
+
+        # Authentication caches drop a restaurant as soon as its row changes
+        post_save.connect(invalidate_restaurant, sender=Restaurant, dispatch_uid='restaurant_cache_save')
+        post_delete.connect(invalidate_restaurant, sender=Restaurant, dispatch_uid='restaurant_cache_delete')
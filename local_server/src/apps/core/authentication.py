@@ -5,7 +5,8 @@ import logging
 from django.conf import settings
 from rest_framework import authentication
 from rest_framework.exceptions import AuthenticationFailed
-from apps.core.models import Restaurant
+from apps.core.services.restaurant_cache import restaurant_cache
+from apps.core.services.token_cache import token_claims_cache
 
 logger = logging.getLogger('dineswift')
 
@@ -21,13 +22,16 @@ class SupabaseAuthentication(authentication.BaseAuthentication):
         token = auth_header.split(' ')[1]
         
         try:
-            # Decode JWT token
-            payload = jwt.decode(
-                token,
-                settings.SUPABASE_CONFIG['jwt_secret'],
-                algorithms=['HS256'],
-                audience='authenticated',
-            )
+            # Decode JWT token (verified claims are reused until it expires)
+            payload = token_claims_cache.get(token)
+            if payload is None:
+                payload = jwt.decode(
+                    token,
+                    settings.SUPABASE_CONFIG['jwt_secret'],
+                    algorithms=['HS256'],
+                    audience='authenticated',
+                )
+                token_claims_cache.set(token, payload)
             
             # Extract user info
             user_id = payload.get('sub')
@@ -38,13 +42,9 @@ class SupabaseAuthentication(authentication.BaseAuthentication):
             if not user_id or not restaurant_id:
                 raise AuthenticationFailed('Invalid token payload')
             
-            # Verify restaurant exists in local DB
-            try:
-                restaurant = Restaurant.objects.get(
-                    supabase_restaurant_id=restaurant_id,
-                    is_active=True
-                )
-            except Restaurant.DoesNotExist:
+            # Verify restaurant exists in local DB (cached per process)
+            restaurant = restaurant_cache.get(restaurant_id)
+            if restaurant is None:
                 raise AuthenticationFailed('Restaurant not found or inactive')
             
             # Create user object with claims
@@ -0,0 +1,109 @@
+"""
+Prometheus Metrics
+Request, database, menu cache and sync queue metrics behind one /metrics endpoint
+"""
+import logging
+import os
+
+from django.db.models import Count, Min
+from django.http import HttpResponse
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger('dineswift')
+
+# Most API calls finish in a few ms; menu refills and sync pushes take longer
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+QUERY_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Requests are labelled with the URL route template, never the raw path
+request_count = Counter(
+    'dineswift_requests_total', 'Total requests', ['method', 'endpoint', 'status']
+)
+request_duration = Histogram(
+    'dineswift_request_duration_seconds', 'Request duration', ['method', 'endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+request_db_queries = Histogram(
+    'dineswift_request_db_queries', 'Database queries per request', ['endpoint'],
+    buckets=QUERY_COUNT_BUCKETS
+)
+request_db_duration = Histogram(
+    'dineswift_request_db_duration_seconds', 'Database time per request', ['endpoint'],
+    buckets=QUERY_TIME_BUCKETS
+)
+
+# tier: local (process memory), shared (Redis) or miss (refilled from the database)
+menu_cache_lookups = Counter(
+    'dineswift_menu_cache_lookups_total', 'Menu cache lookups by outcome', ['tier']
+)
+
+SYNC_ACTIVE_STATUSES = ('PENDING', 'PROCESSING', 'FAILED', 'CONFLICT')
+
+
+def multiprocess_enabled() -> bool:
+    """Workers share metrics through files when PROMETHEUS_MULTIPROC_DIR is set"""
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir'))
+
+
+class SyncQueueCollector:
+    """
+    Sync queue depth and lag, read from the database at scrape time.
+
+    Computed on scrape rather than kept as gauges so every worker reports
+    the same numbers and multiprocess mode needs no gauge aggregation.
+    Finished rows are not counted.
+    """
+
+    def collect(self):
+        from apps.core.models import SyncQueue
+
+        depth = GaugeMetricFamily(
+            'dineswift_sync_queue_depth', 'Unfinished sync queue items', labels=['status']
+        )
+        lag = GaugeMetricFamily(
+            'dineswift_sync_queue_lag_seconds', 'Age of the oldest item waiting to sync'
+        )
+
+        try:
+            counts = dict(
+                SyncQueue.objects.filter(status__in=SYNC_ACTIVE_STATUSES)
+                .order_by()
+                .values_list('status')
+                .annotate(count=Count('id'))
+            )
+            oldest = SyncQueue.objects.filter(
+                status__in=('PENDING', 'FAILED')
+            ).aggregate(oldest=Min('created_at'))['oldest']
+        except Exception as e:
+            logger.warning(f"Sync queue metrics unavailable: {str(e)}")
+            return
+
+        for status in SYNC_ACTIVE_STATUSES:
+            depth.add_metric([status], counts.get(status, 0))
+        lag.add_metric([], (timezone.now() - oldest).total_seconds() if oldest else 0)
+
+        yield depth
+        yield lag
+
+
+sync_registry = CollectorRegistry(auto_describe=False)
+sync_registry.register(SyncQueueCollector())
+
+
+def metrics_view(request):
+    """Prometheus exposition for this process, or for every worker in multiprocess mode"""
+    if multiprocess_enabled():
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    output = generate_latest(registry) + generate_latest(sync_registry)
+    return HttpResponse(output, content_type=CONTENT_TYPE_LATEST)
@@ -3,15 +3,12 @@
 import time
 import uuid
 import logging
+from django.db import connection
 from django.utils.deprecation import MiddlewareMixin
-from prometheus_client import Counter, Histogram
+from apps.core.metrics import request_count, request_db_duration, request_db_queries, request_duration
 
 logger = logging.getLogger('dineswift')
 
-# Prometheus metrics
-request_count = Counter('dineswift_requests_total', 'Total requests', ['method', 'endpoint', 'status'])
-request_duration = Histogram('dineswift_request_duration_seconds', 'Request duration', ['method', 'endpoint'])
-
 class LoggingMiddleware(MiddlewareMixin):
     #Add correlation ID and structured logging
     
@@ -70,20 +67,56 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
 
 class MetricsMiddleware(MiddlewareMixin):
     #Collect Prometheus metrics
-    
+    #
+    # Requests are labelled with their URL route template (e.g.
+    # api/orders/<uuid:order_id>/), so ids in paths do not create series.
+    # Queries run while handling the request are counted and timed.
+    # The hooks run on the request's thread under WSGI and ASGI alike, so
+    # the observer sits on the connection the view uses.
     
     def process_request(self, request):
-        request._metrics_start_time = time.time()
+        request.query_observer = QueryObserver()
+        connection.execute_wrappers.append(request.query_observer)
+        request.metrics_start_time = time.perf_counter()
     
     def process_response(self, request, response):
-        if hasattr(request, '_metrics_start_time'):
-            duration = time.time() - request._metrics_start_time
-            
-            endpoint = request.path
-            method = request.method
-            status = response.status_code
-            
-            request_count.labels(method=method, endpoint=endpoint, status=status).inc()
-            request_duration.labels(method=method, endpoint=endpoint).observe(duration)
+        queries = getattr(request, 'query_observer', None)
+        if queries is None:
+            return response
+        
+        duration = time.perf_counter() - request.metrics_start_time
+        if queries in connection.execute_wrappers:
+            connection.execute_wrappers.remove(queries)
+        
+        endpoint = self.get_endpoint(request)
+        method = request.method
+        status = response.status_code
+        
+        request_count.labels(method=method, endpoint=endpoint, status=status).inc()
+        request_duration.labels(method=method, endpoint=endpoint).observe(duration)
+        request_db_queries.labels(endpoint=endpoint).observe(queries.count)
+        request_db_duration.labels(endpoint=endpoint).observe(queries.duration)
         
-        return response
\ No newline at end of file
+        return response
+    
+    @staticmethod
+    def get_endpoint(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '<unmatched>'  # 404s and requests rejected before routing
+        return match.route or match.view_name or '<unnamed>'
+
+class QueryObserver:
+    #Database execute wrapper that counts and times queries
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        start_time = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start_time
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncqueue',
+            name='coalesce_key',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='syncqueue',
+            index=models.Index(fields=['coalesce_key', 'status'], name='sync_queue_coalesc_e47961_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_syncqueue_coalesce_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncqueue',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='syncqueue',
+            name='leased_by',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='syncqueue',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='sync_queue_status_e3d6f0_idx'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.db.models import JSONField  # FIXED: Modern import
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
@@ -82,6 +82,99 @@ class ActivityLog(TimeStampedModel):
     def __str__(self):
         return f"{self.get_level_display()} - {self.module} - {self.action}"
 
+class SyncQueueManager(models.Manager):
+    """Lease-based claiming so several workers can drain the queue at once"""
+    
+    def claim(self, worker_id: str, batch_size: int, lease_seconds: int = 300,
+              sync_types=None, retry: bool = False) -> list:
+        """
+        Lease up to `batch_size` items to `worker_id`.
+        
+        Rows are picked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+        claimers never receive the same item. With `retry`, FAILED items
+        whose backoff has elapsed are claimed instead of PENDING ones.
+        """
+        from datetime import timedelta
+        
+        now = timezone.now()
+        
+        if retry:
+            queryset = self.filter(
+                status='FAILED',
+                next_retry__lte=now,
+                retry_count__lt=models.F('max_retries')
+            )
+        else:
+            queryset = self.filter(status='PENDING')
+        
+        if sync_types:
+            queryset = queryset.filter(sync_type__in=sync_types)
+        
+        with transaction.atomic():
+            claimed_ids = list(
+                queryset.order_by('priority', 'created_at')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            
+            if not claimed_ids:
+                return []
+            
+            self.filter(id__in=claimed_ids).update(
+                status='PROCESSING',
+                leased_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                updated_at=now
+            )
+        
+        return list(self.filter(id__in=claimed_ids).order_by('priority', 'created_at'))
+    
+    def held_leases(self, items) -> set:
+        """
+        Ids of `items` still leased to the worker that claimed them.
+        
+        Locks those rows, so call it inside a transaction. Items that were
+        never leased are not fenced and always count as held.
+        """
+        by_holder = {}
+        for item in items:
+            by_holder.setdefault(item.leased_by, []).append(item.id)
+        
+        held = set(by_holder.pop('', []))
+        for leased_by, ids in by_holder.items():
+            held.update(
+                self.filter(id__in=ids, leased_by=leased_by, status='PROCESSING')
+                .select_for_update()
+                .values_list('id', flat=True)
+            )
+        return held
+    
+    def renew_leases(self, items, lease_seconds: int) -> set:
+        """Extend the leases still held on `items`; returns the ids still held"""
+        from datetime import timedelta
+        
+        now = timezone.now()
+        with transaction.atomic():
+            held = self.held_leases(items)
+            renewable = [item.id for item in items if item.id in held and item.leased_by]
+            if renewable:
+                self.filter(id__in=renewable).update(
+                    lease_expires_at=now + timedelta(seconds=lease_seconds)
+                )
+        return held
+    
+    def release_expired_leases(self) -> int:
+        """Return items whose lease ran out (crashed worker) to PENDING"""
+        return self.filter(
+            status='PROCESSING',
+            lease_expires_at__lt=timezone.now()
+        ).update(
+            status='PENDING',
+            leased_by='',
+            lease_expires_at=None,
+            updated_at=timezone.now()
+        )
+
 class SyncQueue(TimeStampedModel):
     SYNC_TYPES = [
         ('ORDER_CREATE', 'Order Create'),
@@ -119,6 +212,11 @@ class SyncQueue(TimeStampedModel):
     next_retry = models.DateTimeField(null=True, blank=True, db_index=True)
     error_message = models.TextField(blank=True)
     conflict_data = JSONField(null=True, blank=True)
+    coalesce_key = models.CharField(max_length=100, null=True, blank=True)  # e.g. order:<id>
+    leased_by = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = SyncQueueManager()
     
     class Meta:
         db_table = 'sync_queue'
@@ -126,6 +224,8 @@ class SyncQueue(TimeStampedModel):
             models.Index(fields=['restaurant', 'status', 'priority', 'created_at']),
             models.Index(fields=['status', 'next_retry']),
             models.Index(fields=['idempotency_key']),
+            models.Index(fields=['coalesce_key', 'status']),
+            models.Index(fields=['status', 'lease_expires_at']),
         ]
         ordering = ['priority', 'created_at']
     
@@ -135,17 +235,42 @@ class SyncQueue(TimeStampedModel):
     def can_retry(self):
         return self.retry_count < self.max_retries and self.status == 'FAILED'
     
-    def mark_retry(self, error_msg=''):
+    def mark_retry(self, error_msg='') -> bool:
+        """Schedule a retry; False if the lease was lost and nothing was written"""
         from datetime import timedelta
-        self.retry_count += 1
-        self.last_retry = timezone.now()
+        now = timezone.now()
+        retry_count = self.retry_count + 1
         # Exponential backoff
-        delay = min(2 ** self.retry_count * 60, 3600)  # Max 1 hour
-        self.next_retry = timezone.now() + timedelta(seconds=delay)
-        self.error_message = error_msg[:1000]
-        if not self.can_retry():
-            self.status = 'FAILED'
-        self.save()
+        delay = min(2 ** retry_count * 60, 3600)  # Max 1 hour
+        status = self.status
+        if not (retry_count < self.max_retries and status == 'FAILED'):
+            status = 'FAILED'
+        return self.update_leased(
+            retry_count=retry_count,
+            last_retry=now,
+            next_retry=now + timedelta(seconds=delay),
+            error_message=error_msg[:1000],
+            status=status
+        )
+    
+    def update_leased(self, release: bool = True, **fields) -> bool:
+        """
+        Write `fields` only while this worker still holds the item's lease.
+        
+        A worker that overran its lease may find the item reaped or claimed
+        by another worker; then nothing is written and False is returned.
+        The lease is released with the write unless `release` is False.
+        """
+        if release:
+            fields.update(leased_by='', lease_expires_at=None)
+        fields['updated_at'] = timezone.now()
+        
+        if not SyncQueue.objects.filter(id=self.id, leased_by=self.leased_by).update(**fields):
+            return False
+        
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return True
 
 class HealthCheck(models.Model):
     COMPONENT_CHOICES = [
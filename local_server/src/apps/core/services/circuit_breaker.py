@@ -0,0 +1,288 @@
+"""
+Circuit Breaker
+Error-rate and latency circuit breaker with state shared through the cache
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+
+logger = logging.getLogger('dineswift')
+
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one remote dependency.
+
+    Calls and failures are counted in per-second buckets. Calls slower than
+    `slow_call_seconds` count as failures. Once the failure rate over
+    `window_seconds` crosses `failure_rate` (with at least `min_calls`
+    calls) the breaker opens and callers fail fast. After `open_seconds` a
+    single caller wins the probe slot; its success closes the breaker, its
+    failure re-opens it.
+
+    allow_request() and record_*() are called from the transport's event
+    loop, so they only touch process memory. A background thread flushes
+    the counters and state changes to the shared cache (Redis in
+    production) every `state_ttl` seconds, or as soon as the state changes,
+    and reads back the totals of every worker, the shared state and the
+    probe slot. A state_ttl of 0 starts no thread; call sync() directly.
+    If the cache itself is down the breaker keeps working on the calls
+    this process has seen.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5,
+                 window_seconds: int = 30, open_seconds: int = 10,
+                 slow_call_seconds: float = 5.0, state_ttl: float = 1.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.state_ttl = state_ttl
+
+        self._local = {}
+        # second -> [calls, failures]: totals last read from the cache, and
+        # this process's counts not yet flushed to it
+        self._shared: Dict[int, List[int]] = {}
+        self._pending: Dict[int, List[int]] = {}
+        # State to write on the next sync; {} clears it
+        self._pending_state: Optional[dict] = None
+        self._probe_granted = False
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    # ------------------------------------------------------------------
+    # Public API (memory only, safe on an event loop)
+    # ------------------------------------------------------------------
+
+    @property
+    def state(self) -> str:
+        self._ensure_thread()
+        return self._local.get('state', CLOSED)
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (open, or half-open with a probe in flight)"""
+        return self.state != CLOSED
+
+    def allow_request(self) -> bool:
+        """Return whether a call may proceed; uses up the probe slot when this process holds it"""
+        self._ensure_thread()
+        with self._lock:
+            if self._local.get('state', CLOSED) == CLOSED:
+                return True
+            if self._probe_granted:
+                self._probe_granted = False
+                return True
+            return False
+
+    def record_success(self, duration: float = 0.0):
+        if duration >= self.slow_call_seconds:
+            self.record_failure(reason=f'slow call ({duration:.1f}s)')
+            return
+
+        self._ensure_thread()
+        with self._lock:
+            if self._local.get('state', CLOSED) != CLOSED:
+                self._set_state({})
+                logger.info(f"Circuit {self.name} closed")
+                return
+            self._add(failed=False)
+
+    def record_failure(self, reason: str = ''):
+        self._ensure_thread()
+        with self._lock:
+            state = self._local.get('state', CLOSED)
+
+            if state == HALF_OPEN:
+                self._trip(f'probe failed: {reason}')
+                return
+            if state == OPEN:
+                return
+
+            self._add(failed=True)
+            calls, failures = self._window_counts(self._shared, self._pending)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._trip(f'{failures}/{calls} calls failed in {self.window_seconds}s: {reason}')
+
+    def reset(self):
+        with self._lock:
+            self._set_state({})
+
+    # ------------------------------------------------------------------
+    # In-process state (call with the lock held)
+    # ------------------------------------------------------------------
+
+    def _add(self, failed: bool):
+        bucket = self._pending.setdefault(int(time.time()), [0, 0])
+        bucket[0] += 1
+        if failed:
+            bucket[1] += 1
+
+    def _set_state(self, data: dict):
+        self._local = data
+        self._pending_state = data
+        self._probe_granted = False
+        if not data:
+            self._shared = {}
+            self._pending = {}
+        # Other workers should learn about the change now, not on the next tick
+        self._wake.set()
+
+    def _trip(self, reason: str):
+        self._set_state({'state': OPEN, 'opened_at': time.time()})
+        logger.warning(f"Circuit {self.name} opened ({reason})")
+
+    def _window_counts(self, *sources) -> Tuple[int, int]:
+        oldest = int(time.time()) - self.window_seconds
+        calls = failures = 0
+        for buckets in sources:
+            for second, (bucket_calls, bucket_failures) in buckets.items():
+                if second > oldest:
+                    calls += bucket_calls
+                    failures += bucket_failures
+        return calls, failures
+
+    # ------------------------------------------------------------------
+    # Shared state (background thread or sync callers only)
+    # ------------------------------------------------------------------
+
+    def _key(self, suffix) -> str:
+        return f"circuit_{self.name}_{suffix}"
+
+    def _ensure_thread(self):
+        if self.state_ttl <= 0 or (self._thread is not None and self._pid == os.getpid()):
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Rebuilt after a fork; the parent's thread does not survive it
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=f'circuit-{self.name}', daemon=True
+            )
+            self._thread.start()
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Sync callers see the shared state on first use
+            self.sync()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.state_ttl)
+            self._wake.clear()
+            self.sync()
+
+    def sync(self):
+        """Flush this process's counts and state changes, then read back the shared view"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            written = self._pending_state
+            self._pending_state = None
+            probe_wanted = not self._probe_granted
+
+        now = time.time()
+        granted = False
+        try:
+            for second, (calls, failures) in pending.items():
+                self._incr(self._key(f'calls_{second}'), calls)
+                if failures:
+                    self._incr(self._key(f'failures_{second}'), failures)
+
+            if written is not None:
+                if written:
+                    cache.set(self._key('state'), written, None)
+                else:
+                    cache.delete(self._key('state'))
+                    cache.delete_many(self._bucket_keys(now))
+                self._release_probe()
+
+            data = cache.get(self._key('state')) or {}
+            shared = self._read_buckets(now)
+            state = data.get('state', CLOSED)
+
+            if state == CLOSED:
+                calls, failures = self._window_counts(shared)
+                if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                    data = {'state': OPEN, 'opened_at': now}
+                    cache.set(self._key('state'), data, None)
+                    logger.warning(
+                        f"Circuit {self.name} opened ({failures}/{calls} calls failed "
+                        f"in {self.window_seconds}s across workers)"
+                    )
+            elif probe_wanted and now - data.get('opened_at', 0) >= self.open_seconds:
+                # Open period over: exactly one worker gets to probe
+                granted = self._claim_probe()
+                if granted:
+                    data = {'state': HALF_OPEN, 'opened_at': data.get('opened_at', 0)}
+                    cache.set(self._key('state'), data, None)
+                    logger.info(f"Circuit {self.name} half-open, probing")
+
+        except Exception as e:
+            logger.debug(f"Circuit {self.name} sync failed: {str(e)}")
+            with self._lock:
+                # Keep the counts for the next attempt and fall back to what this process saw
+                for second, (calls, failures) in pending.items():
+                    bucket = self._pending.setdefault(second, [0, 0])
+                    bucket[0] += calls
+                    bucket[1] += failures
+                if written is not None and self._pending_state is None:
+                    self._pending_state = written
+                state = self._local.get('state', CLOSED)
+                if (state != CLOSED and probe_wanted
+                        and now - self._local.get('opened_at', 0) >= self.open_seconds):
+                    self._probe_granted = True
+            return
+
+        with self._lock:
+            self._shared = shared
+            # A change made while this sync ran wins until it is flushed
+            if self._pending_state is None:
+                self._local = data
+                if granted:
+                    self._probe_granted = True
+
+    def _claim_probe(self) -> bool:
+        return cache.add(self._key('probe'), 1, max(self.open_seconds, int(self.slow_call_seconds) + 1))
+
+    def _release_probe(self):
+        try:
+            cache.delete(self._key('probe'))
+        except Exception:
+            pass
+
+    def _bucket_keys(self, now: Optional[float] = None):
+        second = int(now or time.time())
+        keys = []
+        for offset in range(self.window_seconds):
+            keys.append(self._key(f'calls_{second - offset}'))
+            keys.append(self._key(f'failures_{second - offset}'))
+        return keys
+
+    def _read_buckets(self, now: float) -> Dict[int, List[int]]:
+        buckets = {}
+        for key, value in cache.get_many(self._bucket_keys(now)).items():
+            kind, second = key.rsplit('_', 2)[-2:]
+            bucket = buckets.setdefault(int(second), [0, 0])
+            bucket[0 if kind == 'calls' else 1] += value
+        return buckets
+
+    def _incr(self, key: str, amount: int) -> None:
+        # add() seeds the bucket with an expiry; incr() is atomic in Redis
+        if not cache.add(key, amount, self.window_seconds + 1):
+            cache.incr(key, amount)
@@ -0,0 +1,134 @@
+"""
+Restaurant Cache
+Process-local lookup of active restaurants by their Supabase id
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.models import Restaurant
+
+logger = logging.getLogger('dineswift')
+
+
+class RestaurantCache:
+    """
+    Active restaurants keyed by supabase_restaurant_id.
+
+    Every authenticated request resolves the restaurant named in its token,
+    so lookups are served from memory for `ttl` seconds. The TTL bounds how
+    long a change that bypasses the model signals (a queryset update, or a
+    lost generation bump while the shared cache is down) can go unseen. Misses are cached
+    too (a token naming an inactive restaurant stays rejected without a
+    query). Saving or deleting a Restaurant drops the entry in this process
+    and bumps a generation number in the shared cache; other processes
+    compare it at most every `check_interval` seconds and start over when it
+    moved.
+    """
+
+    GENERATION_KEY = 'restaurant_cache_generation'
+
+    def __init__(self, ttl: int = 300, check_interval: float = 5.0):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._entries: Dict[str, Tuple[Optional[Restaurant], float]] = {}
+        self._default: Optional[Tuple[Optional[str], float]] = None
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0.0
+
+    def get(self, supabase_restaurant_id) -> Optional[Restaurant]:
+        """Active restaurant for a Supabase id, or None"""
+        self._check_generation()
+
+        key = str(supabase_restaurant_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        restaurant = Restaurant.objects.filter(
+            supabase_restaurant_id=key,
+            is_active=True
+        ).first()
+        self._entries[key] = (restaurant, time.monotonic() + self.ttl)
+        return restaurant
+
+    def default_id(self) -> Optional[str]:
+        """Id of the only active restaurant on a single-outlet server, else None"""
+        self._check_generation()
+
+        default = self._default
+        if default is not None and default[1] > time.monotonic():
+            return default[0]
+
+        restaurant_ids = list(
+            Restaurant.objects.filter(is_active=True).values_list('id', flat=True)[:2]
+        )
+        # No outlet or several: cached too, so callers without a restaurant do not query each time
+        restaurant_id = str(restaurant_ids[0]) if len(restaurant_ids) == 1 else None
+        self._default = (restaurant_id, time.monotonic() + self.ttl)
+        return restaurant_id
+
+    def warm(self) -> int:
+        """Load every active restaurant; returns the number loaded"""
+        self._check_generation()
+
+        expires = time.monotonic() + self.ttl
+        entries = {
+            str(restaurant.supabase_restaurant_id): (restaurant, expires)
+            for restaurant in Restaurant.objects.filter(is_active=True)
+        }
+        with self._lock:
+            self._entries = entries
+        return len(entries)
+
+    def invalidate(self, supabase_restaurant_id=None):
+        with self._lock:
+            # Any change can alter which restaurants are active
+            self._default = None
+            if supabase_restaurant_id is None:
+                self._entries = {}
+            else:
+                self._entries.pop(str(supabase_restaurant_id), None)
+
+    def changed(self, supabase_restaurant_id):
+        """A restaurant row changed: drop it here and tell other processes"""
+        self.invalidate(supabase_restaurant_id)
+        try:
+            if not cache.add(self.GENERATION_KEY, 1, None):
+                cache.incr(self.GENERATION_KEY)
+            self._generation = cache.get(self.GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"Restaurant cache generation bump failed: {str(e)}")
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        try:
+            generation = cache.get(self.GENERATION_KEY)
+        except Exception:
+            return  # Entries still expire after their TTL
+
+        if generation != self._generation:
+            if self._generation is not None:
+                self.invalidate()
+            self._generation = generation
+
+
+# Cache instance
+restaurant_cache = RestaurantCache(
+    ttl=settings.AUTH_CACHE_CONFIG['restaurant_ttl'],
+    check_interval=settings.AUTH_CACHE_CONFIG['restaurant_check_interval']
+)
+
+
+def invalidate_restaurant(sender, instance, **kwargs):
+    """post_save / post_delete receiver for Restaurant, connected in CoreConfig.ready()"""
+    restaurant_cache.changed(instance.supabase_restaurant_id)
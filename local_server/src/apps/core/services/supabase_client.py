@@ -4,7 +4,7 @@ Handles all interactions with Supabase
 """
 import os
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any
 
 logger = logging.getLogger('dineswift')
 
@@ -18,180 +18,403 @@ except ImportError:
 
 from django.conf import settings
 
+from .circuit_breaker import CircuitBreaker
+from .supabase_transport import (
+    HTTPX_AVAILABLE, CircuitOpenError, SupabaseTransport, TransportError, in_filter
+)
+
 
 class SupabaseClient:
-    """Singleton Supabase client"""
+    """
+    Singleton Supabase client.
+
+    Order, menu and payment calls go through a pooled async transport.
+    Each operation has an async form (`*_async`, plus `get_menu`) for use
+    inside event loops and a blocking facade of the same name for Celery
+    tasks and views; both share one connection pool per process.
+
+    Every request passes through a circuit breaker whose state is shared
+    by all workers, so during an uplink outage calls fail immediately
+    instead of waiting for their timeouts.
+    """
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SupabaseClient, cls).__new__(cls)
             cls._instance._initialize()
         return cls._instance
-    
+
     def _initialize(self):
-        """Initialize Supabase clients with different permission levels"""
+        """Initialize the pooled transport and the supabase-py clients"""
         self.client = None
         self.service_client = None
-        
+        self.transport = None
+        self.breaker = None
+        self.service_headers = {}
+
+        supabase_url = settings.SUPABASE_CONFIG.get('url')
+        anon_key = settings.SUPABASE_CONFIG.get('anon_key')
+        service_key = settings.SUPABASE_CONFIG.get('service_key')
+
+        if not supabase_url or not anon_key:
+            logger.warning("Supabase credentials not configured - running in offline mode")
+            return
+
+        if service_key:
+            self.service_headers = {
+                'apikey': service_key,
+                'Authorization': f'Bearer {service_key}',
+            }
+
+        if HTTPX_AVAILABLE:
+            breaker_config = getattr(settings, 'CIRCUIT_BREAKER_CONFIG', {})
+            self.breaker = CircuitBreaker(
+                'supabase',
+                failure_rate=breaker_config.get('failure_rate', 0.5),
+                min_calls=breaker_config.get('min_calls', 5),
+                window_seconds=breaker_config.get('window_seconds', 30),
+                open_seconds=breaker_config.get('open_seconds', 10),
+                slow_call_seconds=breaker_config.get('slow_call_seconds', 5.0)
+            )
+            self.transport = SupabaseTransport(
+                supabase_url,
+                anon_key,
+                max_connections=settings.SUPABASE_CONFIG.get('max_connections', 10),
+                max_keepalive=settings.SUPABASE_CONFIG.get('max_keepalive', 5),
+                timeout=settings.SUPABASE_CONFIG.get('timeout', 10),
+                http2=settings.SUPABASE_CONFIG.get('http2', True),
+                breaker=self.breaker
+            )
+
         if not SUPABASE_AVAILABLE:
-            logger.warning("Supabase not available - running in offline mode")
+            logger.warning("Supabase SDK not available - using HTTP transport only")
             return
-        
+
         try:
-            supabase_url = settings.SUPABASE_CONFIG.get('url')
-            anon_key = settings.SUPABASE_CONFIG.get('anon_key')
-            service_key = settings.SUPABASE_CONFIG.get('service_key')
-            
-            if not supabase_url or not anon_key:
-                logger.warning("Supabase credentials not configured - running in offline mode")
-                return
-            
             # Client for local server operations (uses RLS)
             self.client: Client = create_client(supabase_url, anon_key)
-            
+
             # Service client for administrative operations
             if service_key:
                 self.service_client: Client = create_client(supabase_url, service_key)
-            
+
             logger.info("Supabase clients initialized successfully")
-            
+
         except Exception as e:
             logger.error(f"Failed to initialize Supabase clients: {str(e)}")
             self.client = None
             self.service_client = None
-    
+
     def is_available(self) -> bool:
         """Check if Supabase is available and configured"""
-        return self.client is not None
-    
-    def set_restaurant_context(self, restaurant_id: str):
-        """Set restaurant context for RLS policies"""
-        if not self.is_available():
-            return
-        
+        return self.transport is not None
+
+    def circuit_open(self) -> bool:
+        """True while the breaker is rejecting calls to Supabase"""
+        return self.breaker is not None and self.breaker.is_open()
+
+    def ensure_available(self) -> bool:
+        """
+        Return False while the breaker is open. Once the open period is
+        over this sends the single recovery probe (only one worker gets to)
+        and reports whether it closed the breaker.
+        """
+        if not self.circuit_open():
+            return True
+
+        # Claim the probe slot now rather than on the breaker's next tick
+        self.breaker.sync()
+        self.health_check()
+        return not self.circuit_open()
+
+    def _headers(self, restaurant_id: Optional[str]) -> Dict:
+        # Sent on every request; RLS policies read it. Passed per call
+        # because the client is a process-wide singleton
+        return {'x-restaurant-id': str(restaurant_id)} if restaurant_id else {}
+
+    def _log_failure(self, action: str, error: Exception):
+        # Fast-failed calls during an outage are expected; keep them quiet
+        if isinstance(error, CircuitOpenError):
+            logger.debug(f"Failed to {action}: {str(error)}")
+        else:
+            logger.error(f"Failed to {action}: {str(error)}")
+
+    def _run(self, coro, default=None):
+        """Blocking facade over a transport coroutine"""
         try:
-            # This header will be used by Supabase RLS policies
-            self.client.postgrest.session.headers.update({
-                'x-restaurant-id': restaurant_id
-            })
+            return self.transport.run(coro)
         except Exception as e:
-            logger.error(f"Failed to set restaurant context: {str(e)}")
-    
+            self._log_failure('complete Supabase request', e)
+            return default
+
+    def run_concurrently(self, coros: Iterable) -> List:
+        """Run several `*_async` calls at once from sync code"""
+        if not self.is_available():
+            for coro in coros:
+                coro.close()
+            return []
+        return self._run(self.transport.gather(coros), default=[])
+
     # ========================================================================
     # MENU OPERATIONS
     # ========================================================================
-    
-    def get_menu(self, restaurant_id: str) -> Optional[Dict]:
-        """Get menu data from Supabase"""
+
+    async def get_menu(self, restaurant_id: str, version: Optional[int] = None,
+                       checksum: Optional[str] = None,
+                       category_checksums: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Get menu data from Supabase.
+
+        Without a checksum this returns the active menu row. With the local
+        checksum the menu-sync edge function answers {'status': 'not_modified'},
+        a JSON-Patch ({'status': 'patch', 'base_checksum', 'checksum', 'patch'})
+        or a gzip-compressed document ({'status': 'full', 'encoding', 'menu'}).
+        """
         if not self.is_available():
             logger.warning("Supabase not available - cannot fetch menu")
             return None
-        
+
+        return await self.transport.call(
+            self._get_menu(restaurant_id, version, checksum, category_checksums)
+        )
+
+    async def _get_menu(self, restaurant_id: str, version: Optional[int] = None,
+                        checksum: Optional[str] = None,
+                        category_checksums: Optional[List[str]] = None) -> Optional[Dict]:
         try:
-            response = self.client.table('menus')\
-                .select('*')\
-                .eq('restaurant_id', restaurant_id)\
-                .eq('is_active', True)\
-                .execute()
-            
-            return response.data[0] if response.data else None
-            
+            if checksum:
+                try:
+                    return await self.transport.invoke(
+                        'menu-sync',
+                        {
+                            'restaurant_id': str(restaurant_id),
+                            'version': version,
+                            'checksum': checksum,
+                            'category_checksums': category_checksums or [],
+                            'accept': ['patch', 'gzip'],
+                        },
+                        headers=self._headers(restaurant_id)
+                    )
+                except TransportError as e:
+                    # Function not deployed: fall back to reading the table
+                    if e.status_code != 404:
+                        raise
+
+            rows = await self.transport.select(
+                'menus',
+                {'restaurant_id': f'eq.{restaurant_id}', 'is_active': 'eq.true'},
+                # Per-call header: several restaurants may sync at once
+                headers=self._headers(restaurant_id)
+            )
+            return rows[0] if rows else None
+
         except Exception as e:
-            logger.error(f"Failed to fetch menu: {str(e)}")
+            self._log_failure('fetch menu', e)
             return None
-    
+
     # ========================================================================
     # ORDER OPERATIONS
     # ========================================================================
-    
+
     def sync_order(self, order_data: Dict) -> Optional[str]:
         """Sync order to Supabase with conflict resolution"""
         if not self.is_available():
             logger.warning("Supabase not available - order queued for later sync")
             return None
-        
+        return self._run(self._sync_order(order_data))
+
+    async def sync_order_async(self, order_data: Dict) -> Optional[str]:
+        if not self.is_available():
+            return None
+        return await self.transport.call(self._sync_order(order_data))
+
+    async def _sync_order(self, order_data: Dict) -> Optional[str]:
         try:
-            response = self.client.table('orders')\
-                .upsert(order_data, on_conflict='local_order_id')\
-                .execute()
-            
-            if response.data:
-                return response.data[0]['id']
+            rows = await self.transport.upsert(
+                'orders', order_data, on_conflict='local_order_id',
+                headers=self._headers(order_data.get('restaurant_id'))
+            )
+
+            if rows:
+                return rows[0]['id']
             return None
-            
+
         except Exception as e:
-            logger.error(f"Failed to sync order: {str(e)}")
+            self._log_failure('sync order', e)
             return None
-    
-    def update_order(self, supabase_order_id: str, updates: Dict) -> bool:
+
+    def update_order(self, restaurant_id: str, supabase_order_id: str, updates: Dict) -> bool:
         """Update order in Supabase"""
         if not self.is_available():
             logger.warning("Supabase not available - update queued for later sync")
             return False
-        
+        return self._run(self._update_order(restaurant_id, supabase_order_id, updates), default=False)
+
+    async def update_order_async(self, restaurant_id: str, supabase_order_id: str, updates: Dict) -> bool:
+        if not self.is_available():
+            return False
+        return await self.transport.call(self._update_order(restaurant_id, supabase_order_id, updates))
+
+    async def _update_order(self, restaurant_id: str, supabase_order_id: str, updates: Dict) -> bool:
         try:
-            response = self.client.table('orders')\
-                .update(updates)\
-                .eq('id', supabase_order_id)\
-                .execute()
-            
-            return len(response.data) > 0
-            
+            rows = await self.transport.update(
+                'orders', {'id': f'eq.{supabase_order_id}'}, updates,
+                headers=self._headers(restaurant_id)
+            )
+            return len(rows) > 0
+
         except Exception as e:
-            logger.error(f"Failed to update order: {str(e)}")
+            self._log_failure('update order', e)
             return False
-    
-    def get_order(self, supabase_order_id: str) -> Optional[Dict]:
+
+    def get_order(self, restaurant_id: str, supabase_order_id: str) -> Optional[Dict]:
         """Get order from Supabase"""
         if not self.is_available():
             return None
-        
+        return self._run(self._get_order(restaurant_id, supabase_order_id))
+
+    async def get_order_async(self, restaurant_id: str, supabase_order_id: str) -> Optional[Dict]:
+        if not self.is_available():
+            return None
+        return await self.transport.call(self._get_order(restaurant_id, supabase_order_id))
+
+    async def _get_order(self, restaurant_id: str, supabase_order_id: str) -> Optional[Dict]:
         try:
-            response = self.client.table('orders')\
-                .select('*')\
-                .eq('id', supabase_order_id)\
-                .execute()
-            
-            return response.data[0] if response.data else None
-            
+            rows = await self.transport.select(
+                'orders', {'id': f'eq.{supabase_order_id}'},
+                headers=self._headers(restaurant_id)
+            )
+            return rows[0] if rows else None
+
         except Exception as e:
-            logger.error(f"Failed to get order: {str(e)}")
+            self._log_failure('get order', e)
             return None
-    
-    def batch_sync_orders(self, orders: List[Dict]) -> List[Dict]:
+
+    def batch_sync_orders(self, restaurant_id: str, orders: List[Dict]) -> List[Dict]:
         """Batch sync multiple orders"""
         if not self.is_available():
             logger.warning("Supabase not available - orders queued for later sync")
             return []
-        
+        return self._run(self._batch_sync_orders(restaurant_id, orders), default=[])
+
+    async def batch_sync_orders_async(self, restaurant_id: str, orders: List[Dict]) -> List[Dict]:
+        if not self.is_available():
+            return []
+        return await self.transport.call(self._batch_sync_orders(restaurant_id, orders))
+
+    async def _batch_sync_orders(self, restaurant_id: str, orders: List[Dict]) -> List[Dict]:
         try:
-            response = self.client.table('orders')\
-                .upsert(orders, on_conflict='local_order_id')\
-                .execute()
-            
-            return response.data
-            
+            return await self.transport.upsert(
+                'orders', orders, on_conflict='local_order_id',
+                headers=self._headers(restaurant_id)
+            )
+
         except Exception as e:
-            logger.error(f"Failed to batch sync orders: {str(e)}")
+            self._log_failure('batch sync orders', e)
             return []
-    
+
+    # ========================================================================
+    # PULL REPLICATION
+    # ========================================================================
+
+    def fetch_changes(self, table: str, restaurant_id: str, updated_after: Optional[str] = None,
+                      after_id: Optional[str] = None, limit: int = 500) -> Optional[List[Dict]]:
+        """
+        Rows of `table` changed after the (updated_at, id) cursor, oldest
+        first. Returns None (not []) when the request failed.
+        """
+        if not self.is_available():
+            return None
+        return self._run(self._fetch_changes(table, restaurant_id, updated_after, after_id, limit))
+
+    async def _fetch_changes(self, table: str, restaurant_id: str, updated_after: Optional[str],
+                             after_id: Optional[str], limit: int) -> Optional[List[Dict]]:
+        filters = {
+            'restaurant_id': f'eq.{restaurant_id}',
+            'order': 'updated_at.asc,id.asc',
+        }
+        if updated_after:
+            # Keyset on (updated_at, id) so rows sharing a timestamp are not skipped
+            filters['or'] = (
+                f'(updated_at.gt.{updated_after},'
+                f'and(updated_at.eq.{updated_after},id.gt.{after_id or ""}))'
+            )
+
+        try:
+            return await self.transport.select(
+                table, filters, limit=limit, headers=self.service_headers
+            )
+        except Exception as e:
+            self._log_failure(f'fetch {table} changes', e)
+            return None
+
+    # ========================================================================
+    # PAYMENT OPERATIONS
+    # ========================================================================
+
+    def get_payments(self, payment_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch several payments in one request, keyed by id"""
+        if not self.is_available() or not payment_ids:
+            return {}
+        return self._run(self._get_payments(payment_ids), default={})
+
+    async def _get_payments(self, payment_ids: List[str]) -> Dict[str, Dict]:
+        try:
+            rows = await self.transport.select(
+                'payments', {'id': in_filter(payment_ids)},
+                headers=self.service_headers
+            )
+            return {str(row['id']): row for row in rows}
+
+        except Exception as e:
+            self._log_failure('fetch payments', e)
+            return {}
+
+    async def check_payment_status_async(self, payment_id: str) -> Optional[Dict]:
+        """Ask the check-payment-status edge function to refresh a payment"""
+        if not self.is_available():
+            return None
+        return await self.transport.call(self._check_payment_status(payment_id))
+
+    async def _check_payment_status(self, payment_id: str) -> Optional[Dict]:
+        return await self.transport.invoke(
+            'check-payment-status', {'payment_id': str(payment_id)},
+            headers=self.service_headers
+        )
+
+    def check_payment_statuses(self, payment_ids: List[str]) -> Dict[str, Any]:
+        """Call the status edge function for several payments concurrently"""
+        if not self.is_available() or not payment_ids:
+            return {}
+        results = self.run_concurrently(
+            self._check_payment_status(payment_id) for payment_id in payment_ids
+        )
+        return dict(zip((str(payment_id) for payment_id in payment_ids), results))
+
     # ========================================================================
     # HEALTH CHECK
     # ========================================================================
-    
+
     def health_check(self) -> bool:
         """Check if Supabase is reachable"""
         if not self.is_available():
             return False
-        
+        return self._run(self._health_check(), default=False)
+
+    async def health_check_async(self) -> bool:
+        if not self.is_available():
+            return False
+        return await self.transport.call(self._health_check())
+
+    async def _health_check(self) -> bool:
         try:
-            response = self.client.table('restaurants').select('id').limit(1).execute()
+            await self.transport.select('restaurants', {}, columns='id', limit=1, timeout=5)
             return True
         except Exception as e:
-            logger.error(f"Supabase health check failed: {str(e)}")
+            self._log_failure('reach Supabase', e)
             return False
 
 
 # Singleton instance
-supabase_client = SupabaseClient()
\ No newline at end of file
+supabase_client = SupabaseClient()
@@ -0,0 +1,250 @@
+"""
+Supabase Transport
+Asyncio HTTP transport for PostgREST and Edge Functions over a pooled client
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger('dineswift')
+
+# httpx ships with supabase-py; h2 is needed for HTTP/2
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    logger.warning("httpx package not installed. Supabase transport will be disabled.")
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class TransportError(Exception):
+    """Raised when a Supabase request fails or returns an error status"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(TransportError):
+    """Raised without touching the network while the circuit breaker is open"""
+
+
+class SupabaseTransport:
+    """
+    Pooled async HTTP client for one Supabase project.
+
+    All requests run on a private event loop thread owning a single
+    httpx.AsyncClient, so sync callers (Celery tasks, views) and async
+    callers (menu sync) share the same keep-alive pool. Over HTTP/2 the
+    concurrent requests are multiplexed on a few connections. The loop and
+    client are created lazily and rebuilt after a fork, so Celery prefork
+    children never reuse the parent's sockets.
+    """
+
+    def __init__(self, base_url: str, api_key: str, max_connections: int = 10,
+                 max_keepalive: int = 5, timeout: float = 10.0, http2: bool = True,
+                 breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.breaker = breaker
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Event loop
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name='supabase-transport',
+                    daemon=True
+                )
+                thread.start()
+                self._client = None
+                self._pid = os.getpid()
+                self._loop = loop
+        return self._loop
+
+    def _get_client(self):
+        # Only called on the transport loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive
+                ),
+                headers={
+                    'apikey': self.api_key,
+                    'Authorization': f'Bearer {self.api_key}',
+                }
+            )
+        return self._client
+
+    def submit(self, coro):
+        """Schedule a coroutine on the transport loop, returning a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Sync facade: run a coroutine on the transport loop and wait for it"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout or self.timeout * 3)
+        except Exception:
+            future.cancel()
+            raise
+
+    async def call(self, coro):
+        """Await a coroutine on the transport loop from any other event loop"""
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    # ------------------------------------------------------------------
+    # Requests (run on the transport loop)
+    # ------------------------------------------------------------------
+
+    async def request(self, method: str, path: str, params: Optional[Dict] = None,
+                      json: Any = None, headers: Optional[Dict] = None,
+                      timeout: Optional[float] = None) -> Any:
+        """Issue one request and return the decoded JSON body (or None)"""
+        if self.breaker is not None and not self.breaker.allow_request():
+            raise CircuitOpenError(f"{method} {path} skipped: circuit open")
+
+        client = self._get_client()
+        started = time.monotonic()
+        try:
+            response = await client.request(
+                method,
+                path,
+                params=params,
+                json=json,
+                headers=headers,
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+            )
+        except httpx.TimeoutException as e:
+            self._record_failure('timeout')
+            raise TransportError(f"{method} {path} timed out") from e
+        except httpx.HTTPError as e:
+            self._record_failure(type(e).__name__)
+            raise TransportError(f"{method} {path} failed: {str(e)}") from e
+
+        # Client errors are our fault, not an outage
+        if response.status_code >= 500 or response.status_code == 429:
+            self._record_failure(f'HTTP {response.status_code}')
+        elif self.breaker is not None:
+            self.breaker.record_success(time.monotonic() - started)
+
+        if response.status_code >= 400:
+            raise TransportError(
+                f"{method} {path} returned {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code
+            )
+
+        if not response.content:
+            return None
+        return response.json()
+
+    def _record_failure(self, reason: str):
+        if self.breaker is not None:
+            self.breaker.record_failure(reason)
+
+    async def select(self, table: str, filters: Dict[str, str], columns: str = '*',
+                     limit: Optional[int] = None, headers: Optional[Dict] = None,
+                     timeout: Optional[float] = None) -> List[Dict]:
+        """PostgREST select; `filters` are raw operators, e.g. {'id': 'eq.<uuid>'}"""
+        params = {'select': columns, **filters}
+        if limit is not None:
+            params['limit'] = str(limit)
+        return await self.request('GET', f'/rest/v1/{table}', params=params,
+                                  headers=headers, timeout=timeout) or []
+
+    async def upsert(self, table: str, rows: Any, on_conflict: str,
+                     headers: Optional[Dict] = None, timeout: Optional[float] = None) -> List[Dict]:
+        return await self.request(
+            'POST',
+            f'/rest/v1/{table}',
+            params={'on_conflict': on_conflict},
+            json=rows,
+            headers={
+                **(headers or {}),
+                'Prefer': 'resolution=merge-duplicates,return=representation',
+            },
+            timeout=timeout
+        ) or []
+
+    async def insert(self, table: str, rows: Any, headers: Optional[Dict] = None,
+                     timeout: Optional[float] = None) -> List[Dict]:
+        return await self.request(
+            'POST',
+            f'/rest/v1/{table}',
+            json=rows,
+            headers={**(headers or {}), 'Prefer': 'return=representation'},
+            timeout=timeout
+        ) or []
+
+    async def update(self, table: str, filters: Dict[str, str], values: Dict,
+                     headers: Optional[Dict] = None, timeout: Optional[float] = None) -> List[Dict]:
+        return await self.request(
+            'PATCH',
+            f'/rest/v1/{table}',
+            params=filters,
+            json=values,
+            headers={**(headers or {}), 'Prefer': 'return=representation'},
+            timeout=timeout
+        ) or []
+
+    async def invoke(self, function: str, payload: Dict, headers: Optional[Dict] = None,
+                     timeout: Optional[float] = None) -> Any:
+        """Call a Supabase Edge Function"""
+        return await self.request('POST', f'/functions/v1/{function}', json=payload,
+                                  headers=headers, timeout=timeout)
+
+    async def gather(self, coros: Iterable, return_exceptions: bool = True) -> List:
+        """Run several requests concurrently over the shared pool"""
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """Close pooled connections (the loop thread stays available)"""
+        if self._loop is not None and self._pid == os.getpid():
+            self.run(self.aclose())
+
+
+def in_filter(values: Iterable) -> str:
+    """PostgREST `in` operator for a list of values"""
+    return 'in.(' + ','.join(str(value) for value in values) + ')'
@@ -0,0 +1,70 @@
+"""
+Token Claims Cache
+Verified Supabase JWT claims reused until the token expires
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+
+
+class TokenClaimsCache:
+    """
+    Bounded LRU of verified JWT claims keyed by a SHA-256 digest of the token.
+
+    An entry lives until the token's `exp` (never past `max_ttl` seconds),
+    so an expired token is decoded again and rejected exactly as before.
+    Only successfully verified tokens are stored, and the raw token is never
+    kept as a key.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def set(self, token: str, claims: dict):
+        now = time.time()
+        expires_at = now + self.max_ttl
+        if claims.get('exp') is not None:
+            expires_at = min(expires_at, float(claims['exp']))
+        if expires_at <= now:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache instance
+token_claims_cache = TokenClaimsCache(
+    max_entries=settings.AUTH_CACHE_CONFIG['token_max_entries'],
+    max_ttl=settings.AUTH_CACHE_CONFIG['token_max_ttl']
+)
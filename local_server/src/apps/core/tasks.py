@@ -94,11 +94,18 @@ def perform_health_check():
         supabase_healthy = False
         logger.error(f'Supabase health check failed: {str(e)}')
     
+    if supabase_healthy:
+        supabase_error = ''
+    elif supabase_client.circuit_open():
+        supabase_error = f'Circuit {supabase_client.breaker.state}'
+    else:
+        supabase_error = 'Connection failed'
+    
     HealthCheck.objects.update_or_create(
         component='SUPABASE',
         defaults={
             'is_healthy': supabase_healthy,
-            'error_message': '' if supabase_healthy else 'Connection failed'
+            'error_message': supabase_error
         }
     )
     results['supabase'] = supabase_healthy
@@ -0,0 +1,14 @@
+import pytest
+import uuid
+from apps.core.models import Restaurant
+
+
+@pytest.fixture
+def test_restaurant(db):
+    return Restaurant.objects.create(
+        supabase_restaurant_id=str(uuid.uuid4()),
+        name='Test Restaurant',
+        address={'street': '123 Test St'},
+        contact_info={'phone': '555-0100'},
+        is_active=True
+    )
@@ -0,0 +1,123 @@
+#Core Authentication Tests
+import time
+import uuid
+import jwt
+import pytest
+from unittest.mock import patch
+from django.conf import settings
+from django.test import RequestFactory
+from apps.core.authentication import SupabaseAuthentication
+from apps.core.services.restaurant_cache import RestaurantCache, restaurant_cache
+from apps.core.services.token_cache import TokenClaimsCache
+
+
+@pytest.mark.django_db
+class TestRestaurantCache:
+    """Restaurant resolution for authenticated requests"""
+
+    @pytest.fixture(autouse=True)
+    def shared_cache(self, settings):
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'restaurant-cache-tests',
+            }
+        }
+        from django.core.cache import cache
+        cache.clear()
+        restaurant_cache.invalidate()
+
+    def _token(self, restaurant, **claims):
+        return jwt.encode(
+            {
+                'sub': 'user-1',
+                'email': 'staff@example.com',
+                'restaurant_id': str(restaurant.supabase_restaurant_id),
+                'aud': 'authenticated',
+                **claims,
+            },
+            settings.SUPABASE_CONFIG['jwt_secret'],
+            algorithm='HS256'
+        )
+
+    def test_lookup_is_cached(self, test_restaurant, django_assert_num_queries):
+        cache = RestaurantCache(ttl=60)
+        cache.get(test_restaurant.supabase_restaurant_id)
+
+        with django_assert_num_queries(0):
+            assert cache.get(test_restaurant.supabase_restaurant_id).id == test_restaurant.id
+
+    def test_saving_restaurant_drops_entry(self, test_restaurant):
+        restaurant_cache.get(test_restaurant.supabase_restaurant_id)
+
+        test_restaurant.is_active = False
+        test_restaurant.save()
+
+        assert restaurant_cache.get(test_restaurant.supabase_restaurant_id) is None
+
+    def test_authenticate_uses_warm_cache(self, test_restaurant, django_assert_num_queries):
+        restaurant_cache.warm()
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self._token(test_restaurant)}')
+
+        with django_assert_num_queries(0):
+            user, _ = SupabaseAuthentication().authenticate(request)
+
+        assert user.restaurant_id == test_restaurant.id
+
+    def test_repeat_requests_skip_verification(self, test_restaurant, django_assert_num_queries):
+        token = self._token(test_restaurant, exp=int(time.time()) + 600)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        SupabaseAuthentication().authenticate(request)
+
+        with patch('apps.core.authentication.jwt.decode') as mock_decode:
+            with django_assert_num_queries(0):
+                user, _ = SupabaseAuthentication().authenticate(request)
+
+        mock_decode.assert_not_called()
+        assert user.restaurant_id == test_restaurant.id
+
+    def test_claims_expire_with_token(self):
+        cache = TokenClaimsCache(max_ttl=300)
+        cache.set('expired', {'sub': 'user-1', 'exp': time.time() - 1})
+        cache.set('short', {'sub': 'user-1', 'exp': time.time() + 0.05})
+
+        assert cache.get('expired') is None
+        assert cache.get('short')['sub'] == 'user-1'
+        time.sleep(0.1)
+        assert cache.get('short') is None
+
+    def test_claims_cache_is_bounded(self):
+        cache = TokenClaimsCache(max_entries=2)
+        for index in range(3):
+            cache.set(f'token-{index}', {'sub': str(index)})
+
+        assert cache.get('token-0') is None
+        assert cache.get('token-2') == {'sub': '2'}
+
+    def test_change_in_other_process_drops_entries(self, test_restaurant):
+        """Workers that did not save the row notice the shared generation move"""
+        worker = RestaurantCache(ttl=3600, check_interval=0)
+        assert worker.get(test_restaurant.supabase_restaurant_id).name == test_restaurant.name
+
+        type(test_restaurant).objects.filter(id=test_restaurant.id).update(name='Renamed')
+        RestaurantCache().changed(test_restaurant.supabase_restaurant_id)
+
+        assert worker.get(test_restaurant.supabase_restaurant_id).name == 'Renamed'
+
+    def test_default_restaurant_follows_changes(self, test_restaurant, django_assert_num_queries):
+        type(test_restaurant).objects.exclude(id=test_restaurant.id).update(is_active=False)
+        restaurant_cache.invalidate()
+        assert restaurant_cache.default_id() == str(test_restaurant.id)
+
+        with django_assert_num_queries(0):
+            assert restaurant_cache.default_id() == str(test_restaurant.id)
+
+        second = type(test_restaurant).objects.create(supabase_restaurant_id=str(uuid.uuid4()), name='Second')
+        assert restaurant_cache.default_id() is None
+
+        # With two outlets the missing default is cached as well
+        with django_assert_num_queries(0):
+            assert restaurant_cache.default_id() is None
+
+        second.delete()
+        assert restaurant_cache.default_id() == str(test_restaurant.id)
@@ -0,0 +1,75 @@
+#Core Metrics Tests
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+from prometheus_client import REGISTRY
+from apps.core.metrics import metrics_view
+from apps.core.middleware import MetricsMiddleware
+from apps.core.models import Restaurant, SyncQueue
+
+ROUTE = 'api/payments/status/<uuid:payment_id>/'
+PATH = '/api/payments/status/00000000-0000-0000-0000-000000000001/'
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+class TestMetricsMiddleware:
+    """Route-template request metrics from the sync and async middleware paths"""
+
+    def _view(self, request):
+        request.resolver_match = resolve(request.path)
+        Restaurant.objects.count()
+        return HttpResponse('ok')
+
+    def test_requests_labelled_by_route_template(self):
+        before = sample('dineswift_requests_total', method='GET', endpoint=ROUTE, status='200')
+        queries = sample('dineswift_request_db_queries_sum', endpoint=ROUTE)
+        middleware = MetricsMiddleware(self._view)
+
+        middleware(RequestFactory().get(PATH))
+        middleware(RequestFactory().get(PATH))
+
+        assert sample('dineswift_requests_total', method='GET', endpoint=ROUTE, status='200') == before + 2
+        assert sample('dineswift_request_db_queries_sum', endpoint=ROUTE) == queries + 2
+        assert sample('dineswift_requests_total', method='GET', endpoint=PATH, status='200') == 0
+
+    def test_async_requests_are_measured(self):
+        before = sample('dineswift_requests_total', method='GET', endpoint=ROUTE, status='200')
+        queries = sample('dineswift_request_db_queries_sum', endpoint=ROUTE)
+
+        async def view(request):
+            return await sync_to_async(self._view)(request)
+
+        middleware = MetricsMiddleware(view)
+        response = async_to_sync(middleware)(RequestFactory().get(PATH))
+
+        assert response.status_code == 200
+        assert sample('dineswift_requests_total', method='GET', endpoint=ROUTE, status='200') == before + 1
+        assert sample('dineswift_request_db_queries_sum', endpoint=ROUTE) == queries + 1
+
+    def test_observer_removed_after_response(self):
+        from django.db import connection
+
+        MetricsMiddleware(self._view)(RequestFactory().get(PATH))
+
+        assert connection.execute_wrappers == []
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    """Prometheus exposition including the sync queue collector"""
+
+    def test_reports_sync_queue(self, test_restaurant):
+        SyncQueue.objects.create(restaurant=test_restaurant, sync_type='ORDER_CREATE', payload={})
+
+        response = metrics_view(RequestFactory().get('/metrics/'))
+        body = response.content.decode()
+
+        assert response.status_code == 200
+        assert 'dineswift_sync_queue_depth{status="PENDING"} 1.0' in body
+        assert 'dineswift_sync_queue_lag_seconds' in body
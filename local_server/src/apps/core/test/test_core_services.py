@@ -0,0 +1,134 @@
+#Core Service Tests
+import pytest
+
+
+@pytest.mark.django_db
+class TestSupabaseCircuitBreaker:
+    """Tests for the shared Supabase circuit breaker"""
+    
+    @pytest.fixture(autouse=True)
+    def breaker_cache(self, settings):
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'circuit-breaker-tests',
+            }
+        }
+        from django.core.cache import cache
+        cache.clear()
+    
+    def _breaker(self, **kwargs):
+        from apps.core.services.circuit_breaker import CircuitBreaker
+        return CircuitBreaker('test', min_calls=4, state_ttl=0, **kwargs)
+    
+    def test_opens_on_failure_rate(self):
+        breaker = self._breaker(failure_rate=0.5)
+        breaker.record_success(0.1)
+        breaker.record_success(0.1)
+        breaker.record_failure('timeout')
+        assert breaker.state == 'CLOSED'
+        
+        breaker.record_failure('timeout')
+        
+        assert breaker.state == 'OPEN'
+        assert breaker.allow_request() is False
+    
+    def test_slow_calls_count_as_failures(self):
+        breaker = self._breaker(slow_call_seconds=1.0)
+        for _ in range(4):
+            breaker.record_success(2.5)
+        
+        assert breaker.state == 'OPEN'
+    
+    def test_state_shared_between_instances(self):
+        first = self._breaker()
+        second = self._breaker()
+        for _ in range(4):
+            first.record_failure('HTTP 503')
+        first.sync()
+        second.sync()
+        
+        assert second.is_open()
+    
+    def test_counts_combine_across_workers(self):
+        first = self._breaker()
+        second = self._breaker()
+        for breaker in (first, second):
+            breaker.record_failure('timeout')
+            breaker.record_failure('timeout')
+        first.sync()
+        assert first.state == 'CLOSED'
+        
+        second.sync()
+        first.sync()
+        
+        assert first.state == 'OPEN'
+    
+    def test_calls_do_not_touch_the_cache(self):
+        from unittest.mock import patch
+        breaker = self._breaker()
+        
+        with patch('apps.core.services.circuit_breaker.cache') as mock_cache:
+            assert breaker.allow_request() is True
+            breaker.record_success(0.1)
+            for _ in range(4):
+                breaker.record_failure('timeout')
+            assert breaker.allow_request() is False
+        
+        assert mock_cache.method_calls == []
+    
+    def test_single_probe_recovers(self):
+        breaker = self._breaker(open_seconds=0)
+        other_worker = self._breaker(open_seconds=0)
+        for _ in range(4):
+            breaker.record_failure('timeout')
+        breaker.sync()
+        other_worker.sync()
+        
+        assert breaker.allow_request() is True
+        assert other_worker.allow_request() is False
+        assert breaker.state == 'HALF_OPEN'
+        
+        breaker.record_success(0.1)
+        breaker.sync()
+        other_worker.sync()
+        
+        assert other_worker.state == 'CLOSED'
+        assert other_worker.allow_request() is True
+    
+    def test_failed_probe_reopens(self):
+        breaker = self._breaker(open_seconds=0)
+        for _ in range(4):
+            breaker.record_failure('timeout')
+        breaker.sync()
+        assert breaker.allow_request() is True
+        
+        breaker.record_failure('timeout')
+        
+        assert breaker.state == 'OPEN'
+
+
+class TestSupabaseClientHeaders:
+    """Restaurant headers are passed per call, never held on the singleton"""
+    
+    def test_concurrent_calls_keep_their_restaurant(self):
+        import asyncio
+        from unittest.mock import AsyncMock, patch
+        from apps.core.services.supabase_client import supabase_client
+        
+        transport = AsyncMock()
+        transport.update.return_value = [{'id': 'order'}]
+        transport.upsert.return_value = []
+        
+        async def push_both():
+            await asyncio.gather(
+                supabase_client._update_order('restaurant-a', 'order-1', {'status': 'READY'}),
+                supabase_client._batch_sync_orders('restaurant-b', [{'local_order_id': 'order-2'}]),
+            )
+        
+        with patch.object(supabase_client, 'transport', transport):
+            asyncio.run(push_both())
+        
+        assert transport.update.call_args.kwargs['headers'] == {'x-restaurant-id': 'restaurant-a'}
+        assert transport.upsert.call_args.kwargs['headers'] == {'x-restaurant-id': 'restaurant-b'}
+        assert not hasattr(supabase_client, 'restaurant_id')
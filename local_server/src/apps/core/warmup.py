@@ -0,0 +1,130 @@
+"""
+Cache Warmup
+Preloads hot caches when a server or worker process starts and reports readiness
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('dineswift')
+
+
+def warm_restaurants() -> int:
+    from apps.core.services.restaurant_cache import restaurant_cache
+    return restaurant_cache.warm()
+
+
+def warm_menus() -> int:
+    # Also loads each restaurant's price index
+    from apps.menu_cache.services import MenuCacheService
+    return MenuCacheService().warm()
+
+
+def warm_active_orders() -> int:
+    from apps.core.models import Restaurant
+    from apps.order_processing.board import active_order_board
+
+    orders = 0
+    for restaurant_id in Restaurant.objects.filter(is_active=True).values_list('id', flat=True):
+        orders += len(active_order_board.get_board(str(restaurant_id))['orders'])
+    return orders
+
+
+class CacheWarmup:
+    """
+    Runs the warmup steps once per process, in a background thread.
+
+    Steps that fail are logged and reported but do not keep the process out
+    of service: every cache still fills itself lazily on a miss. The
+    process reports ready once all steps have run.
+    """
+
+    STEPS: List[Tuple[str, Callable[[], int]]] = [
+        ('restaurants', warm_restaurants),
+        ('menus', warm_menus),
+        ('active_orders', warm_active_orders),
+    ]
+
+    def __init__(self):
+        self.state = 'cold'  # cold -> warming -> ready
+        self.steps: Dict[str, dict] = {}
+        self.duration_ms = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def reset(self):
+        """Forget warmup progress (a forked child starts with cold caches)"""
+        self.state = 'cold'
+        self.steps = {}
+        self.duration_ms = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def start(self, source: str = 'server') -> bool:
+        """Warm caches in the background; returns False if already started"""
+        with self._lock:
+            if self.state != 'cold':
+                return False
+
+            if not settings.WARMUP_CONFIG['enabled']:
+                self.state = 'ready'
+                return False
+
+            self.state = 'warming'
+            self._thread = threading.Thread(
+                target=self._run_in_background,
+                args=(source,),
+                name='cache-warmup',
+                daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def run(self, source: str = 'server'):
+        """Run every step in the calling thread"""
+        self.state = 'warming'
+        started = time.monotonic()
+
+        for name, step in self.STEPS:
+            step_started = time.monotonic()
+            try:
+                count = step()
+                self.steps[name] = {'success': True, 'count': count}
+            except Exception as e:
+                logger.error(f"Cache warmup step {name} failed: {str(e)}", exc_info=True)
+                self.steps[name] = {'success': False, 'error': str(e)}
+            self.steps[name]['duration_ms'] = int((time.monotonic() - step_started) * 1000)
+
+        self.duration_ms = int((time.monotonic() - started) * 1000)
+        self.state = 'ready'
+        logger.info(f"Cache warmup finished for {source} in {self.duration_ms}ms: {self.steps}")
+
+    def _run_in_background(self, source: str):
+        try:
+            self.run(source)
+        finally:
+            # Nothing else uses this thread's database connection
+            connection.close()
+
+    def status(self) -> dict:
+        return {
+            'status': self.state,
+            'steps': self.steps,
+            'duration_ms': self.duration_ms,
+        }
+
+
+# Warmup instance
+cache_warmup = CacheWarmup()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=cache_warmup.reset)
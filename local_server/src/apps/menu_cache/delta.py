@@ -0,0 +1,187 @@
+"""
+Menu Delta
+Content checksums, JSON-Patch application and payload decoding for menu sync
+"""
+import base64
+import gzip
+import hashlib
+import json
+from typing import Any, List, Optional, Set
+
+
+class PatchError(ValueError):
+    """Raised when a JSON-Patch operation cannot be applied"""
+
+
+# ----------------------------------------------------------------------
+# Checksums
+# ----------------------------------------------------------------------
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+    ).hexdigest()
+
+
+def category_digests(menu_data: dict, previous: Optional[List[str]] = None,
+                     changed: Optional[Set[int]] = None) -> List[str]:
+    """
+    SHA-256 of each category, by position.
+
+    With `previous` digests and the set of `changed` positions only those
+    categories are re-serialized; `changed=None` rehashes everything.
+    """
+    categories = menu_data.get('categories') if isinstance(menu_data, dict) else None
+    if not isinstance(categories, list):
+        return []
+
+    previous = previous or []
+    digests = []
+    for position, category in enumerate(categories):
+        if changed is not None and position not in changed and position < len(previous):
+            digests.append(previous[position])
+        else:
+            digests.append(_digest(category))
+    return digests
+
+
+def menu_checksum(menu_data: dict, digests: Optional[List[str]] = None) -> str:
+    """
+    Content address of a menu document.
+
+    Categories contribute their digests rather than their content, so after
+    an edit only the touched categories need hashing again. Documents
+    without a category list are hashed whole. The cloud computes the same
+    value, which is what makes "not modified" answers possible.
+    """
+    if not isinstance(menu_data, dict) or not isinstance(menu_data.get('categories'), list):
+        return _digest(menu_data)
+
+    if digests is None:
+        digests = category_digests(menu_data)
+    return _digest({**menu_data, 'categories': digests})
+
+
+# ----------------------------------------------------------------------
+# JSON-Patch (RFC 6902)
+# ----------------------------------------------------------------------
+
+def _tokens(pointer: str) -> List[str]:
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith('0')):
+        raise PatchError(f"Invalid list index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"List index out of range: {index}")
+    return index
+
+
+def _resolve(document, tokens: List[str]):
+    target = document
+    for token in tokens:
+        try:
+            target = target[_index(target, token)] if isinstance(target, list) else target[token]
+        except (KeyError, TypeError):
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return target
+
+
+def _add(document, tokens: List[str], value):
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[key] = value
+    else:
+        raise PatchError(f"Cannot add to /{'/'.join(tokens)}")
+
+
+def _remove(document, tokens: List[str]):
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    try:
+        if isinstance(parent, list):
+            return parent.pop(_index(parent, key))
+        return parent.pop(key)
+    except (KeyError, AttributeError):
+        raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def apply_patch(document: dict, operations: List[dict]) -> Optional[Set[int]]:
+    """
+    Apply JSON-Patch operations to `document` in place.
+
+    Returns the positions of the categories whose content changed, or None
+    when categories were added, removed or reordered (positions shifted).
+    The root itself cannot be replaced.
+    """
+    changed: Optional[Set[int]] = set()
+
+    for operation in operations:
+        op = operation.get('op')
+        tokens = _tokens(operation.get('path', ''))
+        if not tokens:
+            raise PatchError("Patching the document root is not supported")
+
+        if op == 'add':
+            _add(document, tokens, operation['value'])
+        elif op == 'remove':
+            _remove(document, tokens)
+        elif op == 'replace':
+            _remove(document, tokens)
+            _add(document, tokens, operation['value'])
+        elif op in ('move', 'copy'):
+            source = _tokens(operation['from'])
+            value = _remove(document, source) if op == 'move' else json.loads(
+                json.dumps(_resolve(document, source))
+            )
+            _add(document, tokens, value)
+            if op == 'move':
+                changed = _touch(changed, op, source)
+        elif op == 'test':
+            if _resolve(document, tokens) != operation.get('value'):
+                raise PatchError(f"Test failed at {operation['path']}")
+            continue
+        else:
+            raise PatchError(f"Unsupported operation: {op!r}")
+
+        changed = _touch(changed, op, tokens)
+
+    return changed
+
+
+def _touch(changed: Optional[Set[int]], op: str, tokens: List[str]) -> Optional[Set[int]]:
+    if changed is None or tokens[0] != 'categories':
+        return changed
+    if len(tokens) == 1 or (len(tokens) == 2 and op != 'replace'):
+        return None
+    if not tokens[1].isdigit():
+        return None
+    changed.add(int(tokens[1]))
+    return changed
+
+
+# ----------------------------------------------------------------------
+# Payloads
+# ----------------------------------------------------------------------
+
+def decode_document(payload: dict) -> dict:
+    """Menu document from a full sync response (plain or gzip + base64)"""
+    menu = payload.get('menu')
+    encoding = payload.get('encoding')
+
+    if encoding == 'gzip':
+        return json.loads(gzip.decompress(base64.b64decode(menu)))
+    if encoding not in (None, 'identity'):
+        raise PatchError(f"Unsupported menu encoding: {encoding!r}")
+    return menu
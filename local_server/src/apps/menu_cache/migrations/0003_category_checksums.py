@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_cache', '0002_alter_menucache_restaurant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menucache',
+            name='category_checksums',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
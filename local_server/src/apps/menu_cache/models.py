@@ -3,11 +3,10 @@ Menu Cache Models
 Handles local caching of restaurant menus
 """
 import uuid
-import hashlib
-import json
 from django.db import models
 from django.db.models import JSONField
 from apps.core.models import TimeStampedModel, Restaurant
+from .delta import category_digests, menu_checksum
 
 
 class MenuCache(TimeStampedModel):
@@ -19,6 +18,8 @@ class MenuCache(TimeStampedModel):
     menu_data = JSONField()
     version = models.IntegerField(default=1)
     checksum = models.CharField(max_length=64)  # SHA-256
+    # SHA-256 per category, by position; lets edits rehash only what changed
+    category_checksums = JSONField(default=list, blank=True)
     is_active = models.BooleanField(default=True)
     last_synced = models.DateTimeField(auto_now=True)
     
@@ -30,15 +31,28 @@ class MenuCache(TimeStampedModel):
         ]
         unique_together = ['restaurant', 'version']
     
+    @property
+    def changed_categories(self):
+        """Positions of categories edited since `category_checksums` was computed (None = unknown)"""
+        return getattr(self, '_changed_categories', None)
+    
+    @changed_categories.setter
+    def changed_categories(self, positions):
+        self._changed_categories = set(positions) if positions is not None else None
+    
     def calculate_checksum(self):
         """Calculate SHA-256 checksum for data integrity"""
-        menu_string = json.dumps(self.menu_data, sort_keys=True)
-        return hashlib.sha256(menu_string.encode()).hexdigest()
+        return menu_checksum(self.menu_data)
     
     def save(self, *args, **kwargs):
-        # ALWAYS recalculate checksum for data integrity
+        # ALWAYS recalculate checksum for data integrity; categories are only
+        # rehashed when they may have changed
         if self.menu_data:
-            self.checksum = self.calculate_checksum()
+            self.category_checksums = category_digests(
+                self.menu_data, self.category_checksums, self.changed_categories
+            )
+            self.checksum = menu_checksum(self.menu_data, self.category_checksums)
+            self.changed_categories = None
         super().save(*args, **kwargs)
     
     def __str__(self):
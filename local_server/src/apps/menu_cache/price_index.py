@@ -0,0 +1,226 @@
+"""
+Menu Price Index
+In-memory lookup of menu item and modifier prices keyed by id
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from apps.order_processing.pricing import to_cents
+from .models import MenuCache
+
+logger = logging.getLogger('dineswift')
+
+
+class MenuEntry:
+    """Compact record for a priced menu item or modifier"""
+    __slots__ = ('name', 'price_cents', 'is_available', 'preparation_time', 'department')
+
+    def __init__(self, name, price_cents, is_available, preparation_time, department):
+        self.name = name
+        self.price_cents = price_cents
+        self.is_available = is_available
+        self.preparation_time = preparation_time
+        self.department = department
+
+
+class MenuPriceIndex:
+    """Item and modifier entries for one version of a restaurant menu"""
+    __slots__ = ('restaurant_id', 'version', 'checksum', 'items', 'modifiers', 'sections')
+
+    def __init__(self, restaurant_id: str, version: int, checksum: str,
+                 items: Dict[str, MenuEntry], modifiers: Dict[str, MenuEntry],
+                 sections: Dict[str, Tuple[str, dict, dict]]):
+        self.restaurant_id = restaurant_id
+        self.version = version
+        self.checksum = checksum
+        self.items = items
+        self.modifiers = modifiers
+        # Per-category digests and entries, reused by the next rebuild
+        self.sections = sections
+
+    def get_item(self, item_id) -> Optional[MenuEntry]:
+        return self.items.get(str(item_id))
+
+    def get_modifier(self, modifier_id) -> Optional[MenuEntry]:
+        return self.modifiers.get(str(modifier_id))
+
+
+class MenuPriceIndexService:
+    """
+    Keeps one MenuPriceIndex per restaurant in process memory, for at most
+    `max_restaurants` restaurants (least recently used are dropped).
+
+    The active MenuCache checksum is re-read at most every `check_interval`
+    seconds; when it changes the index is rebuilt, reusing the entries of
+    categories whose content is unchanged.
+    """
+
+    def __init__(self, check_interval: int = 30, max_restaurants: int = 64):
+        self.check_interval = check_interval
+        self.max_restaurants = max_restaurants
+        self._indexes: Dict[str, Optional[MenuPriceIndex]] = OrderedDict()
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, restaurant_id) -> Optional[MenuPriceIndex]:
+        """Return the price index for a restaurant's active menu, if any"""
+        if not restaurant_id:
+            return None
+
+        restaurant_id = str(restaurant_id)
+        index = self._indexes.get(restaurant_id)
+        checked_at = self._checked_at.get(restaurant_id, 0)
+
+        # Restaurants without a cached menu are remembered as None
+        if restaurant_id in self._indexes and time.monotonic() - checked_at < self.check_interval:
+            with self._lock:
+                if restaurant_id in self._indexes:
+                    self._indexes.move_to_end(restaurant_id)
+            return index
+
+        try:
+            current = MenuCache.objects.filter(
+                restaurant_id=restaurant_id,
+                is_active=True
+            ).order_by('-version').values_list('checksum', flat=True).first()
+        except Exception as e:
+            logger.warning(f"Menu price index check failed for restaurant {restaurant_id}: {str(e)}")
+            return index
+
+        self._checked_at[restaurant_id] = time.monotonic()
+
+        if current is None:
+            with self._lock:
+                self._remember(restaurant_id, None)
+            return None
+
+        if index is not None and index.checksum == current:
+            return index
+
+        menu_cache = MenuCache.objects.filter(
+            restaurant_id=restaurant_id,
+            is_active=True
+        ).order_by('-version').first()
+
+        return self.load(menu_cache) if menu_cache else None
+
+    def load(self, menu_cache: MenuCache) -> MenuPriceIndex:
+        """Index a loaded menu version (no-op if its checksum is already indexed)"""
+        restaurant_id = str(menu_cache.restaurant_id)
+
+        with self._lock:
+            previous = self._indexes.get(restaurant_id)
+            if previous is not None and previous.checksum == menu_cache.checksum:
+                self._checked_at[restaurant_id] = time.monotonic()
+                return previous
+
+            index = self._build(restaurant_id, menu_cache, previous)
+            self._remember(restaurant_id, index)
+
+        logger.info(
+            f"Menu price index built for restaurant {restaurant_id}: "
+            f"v{index.version}, {len(index.items)} items, {len(index.modifiers)} modifiers"
+        )
+        return index
+
+    def _remember(self, restaurant_id: str, index: Optional[MenuPriceIndex]):
+        # Caller holds the lock
+        self._indexes[restaurant_id] = index
+        self._indexes.move_to_end(restaurant_id)
+        self._checked_at[restaurant_id] = time.monotonic()
+        while len(self._indexes) > self.max_restaurants:
+            evicted, _ = self._indexes.popitem(last=False)
+            self._checked_at.pop(evicted, None)
+
+    def invalidate(self, restaurant_id=None):
+        """Force the next lookup to re-check the active menu"""
+        with self._lock:
+            if restaurant_id is None:
+                self._checked_at.clear()
+            else:
+                self._checked_at.pop(str(restaurant_id), None)
+
+    def _build(self, restaurant_id: str, menu_cache: MenuCache,
+               previous: Optional[MenuPriceIndex]) -> MenuPriceIndex:
+        menu_data = menu_cache.menu_data or {}
+        previous_sections = previous.sections if previous else {}
+
+        sections = {}
+        items: Dict[str, MenuEntry] = {}
+        modifiers: Dict[str, MenuEntry] = {}
+
+        categories = list(menu_data.get('categories') or [])
+        if menu_data.get('items'):
+            categories.append({'id': '_uncategorized', 'items': menu_data['items']})
+
+        for position, category in enumerate(categories):
+            key = str(category.get('id') or category.get('name') or position)
+            digest = hashlib.sha1(
+                json.dumps(category, sort_keys=True, separators=(',', ':'), default=str).encode()
+            ).hexdigest()
+
+            section = previous_sections.get(key)
+            if section is None or section[0] != digest:
+                section_items, section_modifiers = self._index_category(category)
+                section = (digest, section_items, section_modifiers)
+
+            sections[key] = section
+            items.update(section[1])
+            modifiers.update(section[2])
+
+        return MenuPriceIndex(
+            restaurant_id=restaurant_id,
+            version=menu_cache.version,
+            checksum=menu_cache.checksum,
+            items=items,
+            modifiers=modifiers,
+            sections=sections
+        )
+
+    def _index_category(self, category: dict) -> Tuple[dict, dict]:
+        items = {}
+        modifiers = {}
+        department = category.get('department') or category.get('name')
+
+        for item in category.get('items') or []:
+            entry = self._make_entry(item, department)
+            if entry is None:
+                continue
+            items[str(item['id'])] = entry
+
+            for modifier in item.get('modifiers') or []:
+                modifier_entry = self._make_entry(modifier, entry.department, entry.preparation_time)
+                if modifier_entry is not None:
+                    modifiers[str(modifier['id'])] = modifier_entry
+
+        return items, modifiers
+
+    def _make_entry(self, data: dict, department=None, preparation_time=None) -> Optional[MenuEntry]:
+        if not data.get('id'):
+            return None
+        try:
+            price_cents = to_cents(data.get('price', data.get('sales_price', 0)))
+        except ValueError:
+            logger.warning(f"Skipping menu entry {data.get('id')} with invalid price")
+            return None
+
+        return MenuEntry(
+            name=data.get('name', ''),
+            price_cents=price_cents,
+            is_available=bool(data.get('is_available', data.get('available', True))),
+            preparation_time=data.get('preparation_time', preparation_time),
+            department=data.get('department') or data.get('category') or department
+        )
+
+
+# Service instance (bounded like the menu store)
+menu_price_index = MenuPriceIndexService(
+    max_restaurants=getattr(settings, 'MENU_CACHE_CONFIG', {}).get('max_entries', 64)
+)
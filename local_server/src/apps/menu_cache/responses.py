@@ -0,0 +1,117 @@
+"""
+Menu Responses
+Pre-rendered, pre-compressed menu bodies with strong ETags and conditional GET
+"""
+import gzip
+import json
+import logging
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from .store import CachedMenu
+
+logger = logging.getLogger('dineswift')
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+_render_lock = threading.Lock()
+
+
+def accepted_encoding(request) -> str:
+    """Best content encoding the client accepts: 'br', 'gzip' or 'identity'"""
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    if BROTLI_AVAILABLE and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return 'identity'
+
+
+def etag(entry: CachedMenu, encoding: str = 'identity') -> str:
+    """Strong ETag per menu version and content encoding"""
+    suffix = '' if encoding == 'identity' else f'-{encoding}'
+    return f'"{entry.checksum}{suffix}"'
+
+
+def _matches(request, entry: CachedMenu) -> bool:
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+
+    # Any encoding of the same version is the same menu
+    current = {etag(entry, encoding) for encoding in ('identity', 'gzip', 'br')}
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag in current:
+            return True
+    return False
+
+
+def render(entry: CachedMenu, encoding: str) -> bytes:
+    """Response body for a menu version, rendered and compressed once per process"""
+    body = entry.rendered.get(encoding)
+    if body is not None:
+        return body
+
+    with _render_lock:
+        body = entry.rendered.get(encoding)
+        if body is not None:
+            return body
+
+        identity = entry.rendered.get('identity')
+        if identity is None:
+            identity = json.dumps(
+                {'menu': entry.menu, 'cached': True},
+                cls=DjangoJSONEncoder,
+                separators=(',', ':')
+            ).encode()
+            entry.rendered['identity'] = identity
+
+        if encoding == 'gzip':
+            body = gzip.compress(identity, compresslevel=9, mtime=0)
+        elif encoding == 'br':
+            body = brotli.compress(identity, quality=11)
+        else:
+            body = identity
+        entry.rendered[encoding] = body
+        return body
+
+
+def menu_response(request, entry: CachedMenu) -> HttpResponse:
+    """200 with the pre-rendered body, or 304 when the client already has this version"""
+    encoding = accepted_encoding(request)
+
+    if _matches(request, entry):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(render(entry, encoding), content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag(entry, encoding)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    # Clients may keep the body but must revalidate each time
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -1,89 +1,119 @@
+import asyncio
 import logging
-import hashlib
-import json
+import time
 import uuid
-from typing import Dict, Optional
-from django.core.cache import cache
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 from asgiref.sync import sync_to_async
 from apps.core.models import ActivityLog
+from apps.core.services.restaurant_cache import restaurant_cache
 from apps.core.services.supabase_client import supabase_client
+from .delta import PatchError, apply_patch, category_digests, decode_document, menu_checksum
 from .models import MenuCache, Restaurant
+from .price_index import menu_price_index
+from .store import CachedMenu, MenuStore
     
 logger = logging.getLogger('dineswift')
 
+# Shared by every service instance in the process
+menu_store = MenuStore.from_settings(prefix="restaurant_menu")
+
+
 class MenuCacheService:
     """
-    High-performance menu caching service for single 
+    High-performance menu caching service for one or many restaurants
     
     Service for managing menu caching operations
     UC-LOCAL-ORDER-101: Cache Menu Data
+    
+    Every cache tier is keyed by restaurant, so a food-court server hosting
+    several outlets serves each of them like a single-restaurant one.
     """
       
     
     def __init__(self):
-        self.cache_timeout = 3600  # 1 hour
-        self.cache_key = "current_menu"  # Single cache key for the restaurant
-        self._restaurant_id = None
-        self._redis_available = True  # Start optimistic
-    
-    def get_restaurant_id(self):
-        """Get and cache the single restaurant ID"""
-        if self._restaurant_id is None:
-            restaurant = Restaurant.objects.filter(is_active=True).first()
-            print(restaurant)
-            self._restaurant_id = str(restaurant.id) if restaurant else None
-        return self._restaurant_id
-    
-    def get_current_menu(self) -> Optional[Dict]:
+        self.store = menu_store
+        self.cache_timeout = menu_store.timeout
+        self.cache_prefix = menu_store.prefix
+    
+    def get_restaurant_id(self, restaurant_id=None) -> Optional[str]:
+        """
+        Restaurant to serve: the one requested or, on a single-outlet
+        server, the only active restaurant (refreshed when restaurants change)
+        """
+        if restaurant_id:
+            return str(restaurant_id)
+        return restaurant_cache.default_id()
+    
+    def get_current_menu(self, restaurant_id=None) -> Optional[Dict]:
         """
         Get current menu - optimized for high traffic
-        Uses cache-first approach with single key
+        Served from process memory; Redis and the database only on a miss
         """
-        # Try cache first
-        if self._redis_available:
-            try:
-                cached_menu = cache.get(self.cache_key)
-                if cached_menu:
-                    return cached_menu
-            except Exception as e:
-                logger.warning(f"Cache read error: {str(e)}")
-                self._redis_available = False
-            
-        # Cache miss - get from database
-        restaurant_id = self.get_restaurant_id()
+        entry = self.get_current_menu_entry(restaurant_id)
+        return entry.menu if entry else None
+    
+    def get_current_menu_entry(self, restaurant_id=None) -> Optional[CachedMenu]:
+        """Current menu version with its checksum and rendered bodies"""
+        restaurant_id = self.get_restaurant_id(restaurant_id)
         if not restaurant_id:
-            logger.error("No active restaurant found")
+            logger.warning("No restaurant given and no single active restaurant to default to")
             return None
+        return self.get_menu_entry(restaurant_id)
+    
+    def get_menu_entry(self, restaurant_id: str) -> Optional[CachedMenu]:
+        return self.store.get(restaurant_id, lambda: self._load_active_menu(restaurant_id))
+    
+    def get_cached_menu(self, restaurant_id: str) -> Optional[Dict]:
+        """Get the active menu document for a restaurant"""
+        entry = self.get_menu_entry(restaurant_id)
+        return entry.menu if entry else None
+    
+    def _load_active_menu(self, restaurant_id: str) -> Optional[CachedMenu]:
         try:
             menu_cache = MenuCache.objects.filter(
                 restaurant_id=restaurant_id,
                 is_active=True
-            ).select_related('restaurant').first()
-            
-            if menu_cache and menu_cache.menu_data:
-                # Cache the result
-                if self._redis_available:
-                    try:
-                        cache.set(self.cache_key, menu_cache.menu_data, self.cache_timeout)
-                    except Exception as e:
-                        logger.warning(f"Cache write error: {str(e)}")
-                
-                return menu_cache.menu_data
-        
+            ).first()
         except Exception as e:
             logger.error(f"Database error getting menu: {str(e)}")
+            return None
+        
+        if not (menu_cache and menu_cache.menu_data):
+            return None
+        
+        # Keep the order pricing index on this menu version
+        menu_price_index.load(menu_cache)
+        return self._cached_menu(menu_cache)
+    
+    def warm(self, restaurant_ids=None) -> int:
+        """Load active menus and price indexes into this process; returns the number warmed"""
+        if restaurant_ids is None:
+            restaurant_ids = Restaurant.objects.filter(is_active=True).values_list('id', flat=True)
         
-        return None
+        warmed = 0
+        for restaurant_id in restaurant_ids:
+            restaurant_id = str(restaurant_id)
+            if self.get_menu_entry(restaurant_id) is not None:
+                menu_price_index.get(restaurant_id)
+                warmed += 1
+        return warmed
     
+    def _cached_menu(self, menu_cache: MenuCache) -> CachedMenu:
+        return CachedMenu(
+            str(menu_cache.restaurant_id),
+            menu_cache.version,
+            menu_cache.checksum,
+            menu_cache.menu_data
+        )
     
-    def calculate_checksum(self, menu_data: Dict) -> str:
+    def calculate_checksum(self, menu_data: Dict, digests: Optional[List[str]] = None) -> str:
         """Calculate SHA-256 checksum for menu data integrity"""
         try:
-            # Sort keys to ensure consistent hashing
-            menu_string = json.dumps(menu_data, sort_keys=True, separators=(',', ':'))
-            return hashlib.sha256(menu_string.encode()).hexdigest()
+            # Same content address the cloud uses for conditional sync
+            return menu_checksum(menu_data, digests)
         except Exception as e:
             logger.error(f"Checksum calculation failed: {str(e)}")
             return ""
@@ -92,47 +122,112 @@ class MenuCacheService:
         """
         UC-LOCAL-ORDER-101: Sync menu from Supabase to local cache
         """
+        return await self.sync_menu(restaurant_id) != 'failed'
+
+    async def sync_menus(self, restaurant_ids: List[str], concurrency: Optional[int] = None,
+                         timeout: Optional[float] = None) -> Dict:
+        """
+        Sync several restaurants' menus concurrently on the running event loop.
+
+        At most `concurrency` syncs are in flight and each is cancelled after
+        `timeout` seconds, so one slow restaurant cannot hold up the rest.
+        Restaurants whose checksum is unchanged are counted as skipped.
+        """
+        concurrency = concurrency or settings.SYNC_CONFIG['menu_concurrency']
+        timeout = timeout or settings.SYNC_CONFIG['menu_timeout']
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def sync_one(restaurant_id: str) -> str:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self.sync_menu(restaurant_id), timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Menu sync timed out after {timeout}s for restaurant {restaurant_id}")
+                    return 'timed_out'
+                except Exception as e:
+                    logger.error(f"Menu sync crashed for restaurant {restaurant_id}: {str(e)}", exc_info=True)
+                    return 'failed'
+
+        started = time.monotonic()
+        restaurant_ids = [str(restaurant_id) for restaurant_id in restaurant_ids]
+        outcomes = await asyncio.gather(*(sync_one(restaurant_id) for restaurant_id in restaurant_ids))
+
+        summary = {
+            'total': len(restaurant_ids),
+            'synced': sum(1 for outcome in outcomes if outcome in ('updated', 'unchanged')),
+            'updated': outcomes.count('updated'),
+            'skipped': outcomes.count('unchanged'),
+            'failed': sum(1 for outcome in outcomes if outcome in ('failed', 'timed_out')),
+            'timed_out': outcomes.count('timed_out'),
+            'failed_restaurants': [
+                restaurant_id for restaurant_id, outcome in zip(restaurant_ids, outcomes)
+                if outcome in ('failed', 'timed_out')
+            ],
+            'duration_ms': int((time.monotonic() - started) * 1000),
+        }
+        return summary
+
+    async def sync_menu(self, restaurant_id: str) -> str:
+        """
+        Sync one restaurant's menu; returns 'updated', 'unchanged' or 'failed'.
         
+        The active version's checksum is sent along, so an unchanged menu
+        costs one small round trip and a changed one usually arrives as a
+        JSON-Patch applied to the cached document.
+        """
         try:
-            print(f"\n[DEBUG] Starting sync for restaurant_id: {restaurant_id}")
-            
             # Convert string ID to UUID for database query
             try:
                 restaurant_uuid = uuid.UUID(restaurant_id)
-                print(f"[DEBUG] Converted to UUID: {restaurant_uuid}")
             except ValueError as e:
                 logger.error(f"Invalid restaurant ID format: {restaurant_id} - {e}")
-                return False
+                return 'failed'
             
-            # Get restaurant with sync_to_async
-            print(f"[DEBUG] Querying database for restaurant...")
             restaurant = await sync_to_async(
                 Restaurant.objects.filter(id=restaurant_uuid).first
             )()
-            
-            print(f"[DEBUG] Restaurant query result: {restaurant}")
-            
             if not restaurant:
                 logger.error(f"Restaurant not found: {restaurant_id}")
-                print(f"[DEBUG] RESTAURANT NOT FOUND! UUID used: {restaurant_uuid}")
-                
-                # Let's check what restaurants exist
-                all_restaurants = await sync_to_async(list)(Restaurant.objects.all())
-                print(f"[DEBUG] All restaurants in DB: {[str(r.id) for r in all_restaurants]}")
-                
-                return False
+                return 'failed'
             
-            print(f"[DEBUG] Restaurant found: {restaurant.name}")
+            current = await sync_to_async(
+                MenuCache.objects.filter(restaurant=restaurant, is_active=True).first
+            )()
             
-            # Rest of the method remains the same...
-            supabase_client.set_restaurant_context(str(restaurant.supabase_restaurant_id))
+            fetched = await self._fetch_menu(restaurant, current)
+            if fetched is None:
+                logger.warning(f"No active menu found in Supabase for restaurant {restaurant_id}")
+                return 'failed'
             
-            # Fetch latest menu from Supabase
-            supabase_menu = await supabase_client.get_menu(str(restaurant.supabase_restaurant_id))
+            mode, menu_data, digests = fetched
+            if mode == 'not_modified':
+                await sync_to_async(self._touch_menu)(current)
+                return 'unchanged'
             
-            if not supabase_menu:
-                logger.warning(f"No active menu found in Supabase for restaurant {restaurant_id}")
-                return False
+            checksum = self.calculate_checksum(menu_data, digests)
+            if not checksum:
+                logger.error(f"Menu checksum failed for restaurant {restaurant_id}")
+                return 'failed'
+            
+            if current and current.checksum == checksum:
+                await sync_to_async(self._touch_menu)(current)
+                return 'unchanged'
+            
+            menu_cache = await sync_to_async(self._store_menu_version)(
+                restaurant, current, menu_data, digests
+            )
+            self.invalidate_cache(restaurant_id)
+            self.store.put(self._cached_menu(menu_cache))
+            
+            await sync_to_async(ActivityLog.objects.create)(
+                restaurant_id=restaurant_uuid,
+                level='INFO',
+                module='MENU_CACHE',
+                action='MENU_SYNCED',
+                details={'version': menu_cache.version, 'checksum': menu_cache.checksum, 'mode': mode}
+            )
+            logger.info(f"Menu v{menu_cache.version} cached for restaurant {restaurant_id} ({mode})")
+            return 'updated'
                         
         except Exception as e:
             # Log error with sync_to_async
@@ -154,16 +249,97 @@ class MenuCacheService:
                 extra={'restaurant_id': restaurant_id},
                 exc_info=True
             )
-            return False
+            return 'failed'
+    
+    async def _fetch_menu(self, restaurant, current: Optional[MenuCache]) -> Optional[Tuple]:
+        """
+        Fetch the menu conditionally.
+        
+        Returns (mode, menu_data, category digests) where mode is
+        'not_modified', 'patch' or 'full', or None if there is no menu.
+        """
+        supabase_restaurant_id = str(restaurant.supabase_restaurant_id)
+        
+        if not (current and current.menu_data):
+            response = await supabase_client.get_menu(supabase_restaurant_id)
+        else:
+            response = await supabase_client.get_menu(
+                supabase_restaurant_id,
+                version=current.version,
+                checksum=current.checksum,
+                category_checksums=current.category_checksums
+            )
+            status = response.get('status') if isinstance(response, dict) else None
+            
+            if status == 'not_modified':
+                return 'not_modified', None, None
+            
+            if status == 'patch':
+                patched = self._apply_menu_patch(current, response)
+                if patched is not None:
+                    return ('patch', *patched)
+                response = await supabase_client.get_menu(supabase_restaurant_id)
+        
+        if not response:
+            return None
+        
+        # The plain table read returns the document itself
+        menu_data = decode_document(response) if response.get('status') == 'full' else response
+        if not menu_data:
+            return None
+        return 'full', menu_data, category_digests(menu_data)
+    
+    def _apply_menu_patch(self, current: MenuCache, response: Dict) -> Optional[Tuple]:
+        """Patch the cached document in place; None if it cannot be trusted"""
+        if response.get('base_checksum') not in (None, current.checksum):
+            logger.warning("Menu patch is based on a different version, fetching full menu")
+            return None
+        
+        menu_data = current.menu_data
+        try:
+            changed = apply_patch(menu_data, response.get('patch') or [])
+        except (PatchError, KeyError) as e:
+            logger.warning(f"Menu patch could not be applied ({str(e)}), fetching full menu")
+            return None
+        
+        digests = category_digests(menu_data, current.category_checksums, changed)
+        expected = response.get('checksum')
+        if expected and menu_checksum(menu_data, digests) != expected:
+            logger.warning("Patched menu checksum mismatch, fetching full menu")
+            return None
+        
+        return menu_data, digests
+    
+    def _store_menu_version(self, restaurant, current: Optional[MenuCache], menu_data: Dict,
+                            digests: List[str]) -> MenuCache:
+        """Activate a new menu version, deactivating the previous one"""
+        with transaction.atomic():
+            MenuCache.objects.filter(restaurant=restaurant, is_active=True).update(is_active=False)
+            
+            # Digests were computed (incrementally for patches) while
+            # fetching, so the model does not rehash any category
+            menu_cache = MenuCache.objects.create(
+                restaurant=restaurant,
+                menu_data=menu_data,
+                version=(current.version + 1) if current else 1,
+                category_checksums=digests,
+                changed_categories=set(),
+                is_active=True
+            )
+        
+        menu_price_index.load(menu_cache)
+        return menu_cache
+    
+    def _touch_menu(self, menu_cache: MenuCache):
+        """Record that an unchanged menu was confirmed against the cloud"""
+        MenuCache.objects.filter(id=menu_cache.id).update(last_synced=timezone.now())
     
     def invalidate_cache(self, restaurant_id: str):
         """Invalidate cache for a restaurant"""
-        cache_key = f"{self.cache_prefix}_{restaurant_id}"
-        try:
-            cache.delete(cache_key)
-            logger.info(f"Menu cache invalidated for restaurant {restaurant_id}")
-        except Exception as e:
-            logger.warning(f"Cache invalidation error for restaurant {restaurant_id}: {str(e)}")
+        menu_price_index.invalidate(restaurant_id)
+        # Also tells every other worker process through the invalidation channel
+        self.store.invalidate(restaurant_id)
+        logger.info(f"Menu cache invalidated for restaurant {restaurant_id}")
     
     def get_menu_version(self, restaurant_id: str) -> Optional[Dict]:
         """Get current menu version info"""
@@ -0,0 +1,328 @@
+"""
+Menu Store
+Two-tier menu cache: an in-process LRU in front of Redis, keyed by menu version
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.metrics import menu_cache_lookups
+
+logger = logging.getLogger('dineswift')
+
+
+class CachedMenu:
+    """One deserialized menu version, shared by every request in the process"""
+    __slots__ = ('restaurant_id', 'version', 'checksum', 'menu', 'rendered')
+
+    def __init__(self, restaurant_id: str, version: int, checksum: str, menu: dict):
+        self.restaurant_id = restaurant_id
+        self.version = version
+        self.checksum = checksum
+        self.menu = menu
+        # Response bodies by content encoding, rendered once per version
+        self.rendered: Dict[str, bytes] = {}
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Hashable], bool]):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MenuStore:
+    """
+    Menu reads from process memory, Redis, then the database.
+
+    L1 is an LRU of CachedMenu keyed by (restaurant_id, version) plus a
+    pointer per restaurant to its current version. A pointer is trusted for
+    `pointer_ttl` seconds while this process is subscribed to the
+    invalidation channel, `unsubscribed_pointer_ttl` otherwise, so a hot
+    read touches neither Redis nor the JSON decoder.
+
+    L2 is Redis: the menu under a versioned key and a small current-version
+    pointer. A miss is refilled by one caller per restaurant: threads in a
+    process wait on a lock, other processes wait for the winner of a Redis
+    lock to publish the entry (up to `lock_wait`, then read the database
+    themselves).
+
+    Redis errors back off exponentially up to `backoff_max` seconds instead
+    of disabling Redis for the life of the process; reads fall through to
+    the database meanwhile.
+    """
+
+    def __init__(self, prefix: str = 'restaurant_menu', max_entries: int = 64,
+                 pointer_ttl: float = 60.0, unsubscribed_pointer_ttl: float = 5.0,
+                 timeout: int = 3600, lock_timeout: int = 10, lock_wait: float = 2.0,
+                 backoff_max: float = 60.0, channel: str = 'dineswift:menu_invalidation'):
+        self.prefix = prefix
+        self.pointer_ttl = pointer_ttl
+        self.unsubscribed_pointer_ttl = unsubscribed_pointer_ttl
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.backoff_max = backoff_max
+        self.channel = channel
+
+        self.menus = LRUCache(max_entries)
+        self._pointers: Dict[str, Tuple[int, float]] = {}
+        self._refill_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        self._redis_failures = 0
+        self._redis_retry_at = 0.0
+
+        self._subscriber: Optional[threading.Thread] = None
+        self._subscriber_pid = None
+        self._subscribed = False
+        self._subscribe_retry_at = 0.0
+
+    @classmethod
+    def from_settings(cls, prefix: str) -> 'MenuStore':
+        config = getattr(settings, 'MENU_CACHE_CONFIG', {})
+        return cls(prefix=prefix, **config)
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    def menu_key(self, restaurant_id: str, version: int) -> str:
+        return f"{self.prefix}_{restaurant_id}_v{version}"
+
+    def pointer_key(self, restaurant_id: str) -> str:
+        return f"{self.prefix}_{restaurant_id}_current"
+
+    def lock_key(self, restaurant_id: str) -> str:
+        return f"{self.prefix}_{restaurant_id}_lock"
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, restaurant_id, loader: Callable[[], Optional[CachedMenu]]) -> Optional[CachedMenu]:
+        """Return the current menu, refilling through `loader` (a database read) on a miss"""
+        restaurant_id = str(restaurant_id)
+        self._ensure_subscriber()
+
+        entry = self._get_local(restaurant_id)
+        if entry is not None:
+            menu_cache_lookups.labels(tier='local').inc()
+            return entry
+
+        entry = self._get_shared(restaurant_id)
+        if entry is not None:
+            menu_cache_lookups.labels(tier='shared').inc()
+            return entry
+
+        menu_cache_lookups.labels(tier='miss').inc()
+        return self._refill(restaurant_id, loader)
+
+    def _get_local(self, restaurant_id: str) -> Optional[CachedMenu]:
+        pointer = self._pointers.get(restaurant_id)
+        if pointer is None or pointer[1] < time.monotonic():
+            return None
+        return self.menus.get((restaurant_id, pointer[0]))
+
+    def _get_shared(self, restaurant_id: str) -> Optional[CachedMenu]:
+        pointer = self._redis(cache.get, self.pointer_key(restaurant_id))
+        if not pointer:
+            return None
+
+        version = pointer['version']
+        entry = self.menus.get((restaurant_id, version))
+        if entry is None:
+            menu = self._redis(cache.get, self.menu_key(restaurant_id, version))
+            if menu is None:
+                return None
+            entry = CachedMenu(restaurant_id, version, pointer['checksum'], menu)
+
+        self._remember(entry)
+        return entry
+
+    def _refill(self, restaurant_id: str, loader) -> Optional[CachedMenu]:
+        with self._lock:
+            refill_lock = self._refill_locks.setdefault(restaurant_id, threading.Lock())
+
+        with refill_lock:
+            # Another thread may have refilled while we waited
+            entry = self._get_local(restaurant_id) or self._get_shared(restaurant_id)
+            if entry is not None:
+                return entry
+
+            won = self._redis(cache.add, self.lock_key(restaurant_id), os.getpid(), self.lock_timeout)
+            if won is False:
+                entry = self._wait_for_refill(restaurant_id)
+                if entry is not None:
+                    return entry
+
+            try:
+                entry = loader()
+                if entry is not None:
+                    self.put(entry)
+                return entry
+            finally:
+                if won:
+                    self._redis(cache.delete, self.lock_key(restaurant_id))
+
+    def _wait_for_refill(self, restaurant_id: str) -> Optional[CachedMenu]:
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self._get_shared(restaurant_id)
+            if entry is not None:
+                return entry
+        return None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def put(self, entry: CachedMenu):
+        """Store a menu version in both tiers and point the restaurant at it"""
+        self._remember(entry)
+        self._redis(cache.set_many, {
+            self.menu_key(entry.restaurant_id, entry.version): entry.menu,
+            self.pointer_key(entry.restaurant_id): {'version': entry.version, 'checksum': entry.checksum},
+        }, self.timeout)
+
+    def _remember(self, entry: CachedMenu):
+        ttl = self.pointer_ttl if self._subscribed else self.unsubscribed_pointer_ttl
+        self.menus.set((entry.restaurant_id, entry.version), entry)
+        self._pointers[entry.restaurant_id] = (entry.version, time.monotonic() + ttl)
+
+    def invalidate(self, restaurant_id=None):
+        """Drop a restaurant's menu (or all menus) here and in every other process"""
+        self._forget(restaurant_id)
+        if restaurant_id is not None:
+            self._redis(cache.delete, self.pointer_key(str(restaurant_id)))
+        self._publish(restaurant_id)
+
+    def _forget(self, restaurant_id=None):
+        if restaurant_id is None:
+            self._pointers.clear()
+            self.menus.clear()
+            return
+        restaurant_id = str(restaurant_id)
+        self._pointers.pop(restaurant_id, None)
+        self.menus.discard(lambda key: key[0] == restaurant_id)
+
+    # ------------------------------------------------------------------
+    # Redis health
+    # ------------------------------------------------------------------
+
+    def _redis(self, operation, *args):
+        """Run a cache operation unless Redis is backing off; None on failure"""
+        if self._redis_failures and time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            result = operation(*args)
+        except Exception as e:
+            self._redis_failures += 1
+            delay = min(self.backoff_max, 2 ** (self._redis_failures - 1))
+            self._redis_retry_at = time.monotonic() + delay
+            logger.warning(f"Menu cache Redis error, retrying in {delay}s: {str(e)}")
+            return None
+
+        if self._redis_failures:
+            logger.info("Menu cache Redis recovered")
+            self._redis_failures = 0
+        return result
+
+    # ------------------------------------------------------------------
+    # Invalidation channel
+    # ------------------------------------------------------------------
+
+    def _redis_connection(self):
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except (ImportError, NotImplementedError):
+            return None  # Not a Redis cache (tests, local memory)
+
+    def _publish(self, restaurant_id=None):
+        connection = self._redis_connection()
+        if connection is None:
+            return
+        message = json.dumps({'restaurant_id': str(restaurant_id) if restaurant_id else None})
+        self._redis(connection.publish, self.channel, message)
+
+    def _ensure_subscriber(self):
+        subscriber = self._subscriber
+        if subscriber is not None and subscriber.is_alive() and self._subscriber_pid == os.getpid():
+            return
+        if time.monotonic() < self._subscribe_retry_at:
+            return
+
+        with self._lock:
+            if self._subscriber is not None and self._subscriber.is_alive() \
+                    and self._subscriber_pid == os.getpid():
+                return
+            self._subscribed = False
+            connection = self._redis_connection()
+            if connection is None:
+                self._subscribe_retry_at = float('inf')
+                return
+
+            self._subscribe_retry_at = time.monotonic() + self.backoff_max
+            self._subscriber_pid = os.getpid()
+            self._subscriber = threading.Thread(
+                target=self._listen,
+                args=(connection,),
+                name='menu-invalidation',
+                daemon=True
+            )
+            self._subscriber.start()
+
+    def _listen(self, connection):
+        try:
+            pubsub = connection.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.channel)
+            self._subscribed = True
+            for message in pubsub.listen():
+                try:
+                    restaurant_id = json.loads(message['data']).get('restaurant_id')
+                except (TypeError, ValueError):
+                    continue
+                self._forget(restaurant_id)
+        except Exception as e:
+            logger.warning(f"Menu invalidation subscriber stopped: {str(e)}")
+        finally:
+            # Pointers fall back to the short TTL until we resubscribe
+            self._subscribed = False
+            self._pointers.clear()
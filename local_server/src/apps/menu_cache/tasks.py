@@ -1,6 +1,7 @@
 #MENU SYNC TASKS
 
 import logging
+from asgiref.sync import async_to_sync
 from celery import shared_task
 from apps.core.models import Restaurant
 from .services import MenuCacheService
@@ -13,30 +14,20 @@ def sync_all_restaurant_menus():
     
     try:
         menu_service = MenuCacheService()
-        restaurants = Restaurant.objects.filter(is_active=True)
+        restaurant_ids = [
+            str(restaurant_id) for restaurant_id in
+            Restaurant.objects.filter(is_active=True).values_list('id', flat=True)
+        ]
         
-        synced_count = 0
-        failed_count = 0
-        
-        for restaurant in restaurants:
-            try:
-                success = menu_service.sync_menu_from_supabase(str(restaurant.id))
-                if success:
-                    synced_count += 1
-                else:
-                    failed_count += 1
-            except Exception as e:
-                logger.error(
-                    f'Failed to sync menu for restaurant {restaurant.id}: {str(e)}',
-                    exc_info=True
-                )
-                failed_count += 1
+        # One event loop for every restaurant; network waits overlap
+        summary = async_to_sync(menu_service.sync_menus)(restaurant_ids)
         
         logger.info(
-            f'Menu sync completed: {synced_count} synced, {failed_count} failed'
+            f"Menu sync completed: {summary['updated']} updated, {summary['skipped']} unchanged, "
+            f"{summary['failed']} failed ({summary['timed_out']} timed out) in {summary['duration_ms']}ms"
         )
         
-        return {'synced': synced_count, 'failed': failed_count}
+        return summary
         
     except Exception as e:
         logger.error(f'Menu sync task failed: {str(e)}', exc_info=True)
@@ -48,7 +39,7 @@ def sync_single_restaurant_menu(restaurant_id: str):
    
     try:
         menu_service = MenuCacheService()
-        success = menu_service.sync_menu_from_supabase(restaurant_id)
+        success = async_to_sync(menu_service.sync_menu_from_supabase)(restaurant_id)
         
         return {'success': success, 'restaurant_id': restaurant_id}
         
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import patch
+from django.conf import settings
+from django.test import RequestFactory
+from apps.core.warmup import CacheWarmup
+from apps.menu_cache.services import MenuCacheService
+from config.urls import readiness_check
+
+
+@pytest.mark.django_db
+class TestCacheWarmup:
+    """Startup warmup and the readiness endpoint"""
+
+    def test_run_warms_every_cache(self, menu_cache, sample_menu_data):
+        warmup = CacheWarmup()
+        MenuCacheService().store.invalidate()
+
+        warmup.run()
+
+        assert warmup.ready
+        assert all(step['success'] for step in warmup.steps.values())
+        assert warmup.steps['menus']['count'] >= 1
+        assert warmup.steps['restaurants']['count'] >= 1
+
+    def test_failed_step_does_not_block_readiness(self, test_restaurant):
+        warmup = CacheWarmup()
+
+        def warm_menus():
+            raise RuntimeError('menus down')
+
+        with patch.object(CacheWarmup, 'STEPS', [('menus', warm_menus)]):
+            warmup.run()
+
+        assert warmup.ready
+        assert warmup.steps['menus']['success'] is False
+        assert 'menus down' in warmup.steps['menus']['error']
+
+    def test_readiness_reports_503_until_warm(self):
+        warmup = CacheWarmup()
+        request = RequestFactory().get('/api/ready/')
+
+        with patch('apps.core.warmup.cache_warmup', warmup), patch.object(warmup, 'start'):
+            assert readiness_check(request).status_code == 503
+            warmup.state = 'ready'
+            assert readiness_check(request).status_code == 200
+
+    def test_disabled_warmup_is_ready(self):
+        warmup = CacheWarmup()
+
+        with patch.dict(settings.WARMUP_CONFIG, {'enabled': False}):
+            assert warmup.start() is False
+
+        assert warmup.ready
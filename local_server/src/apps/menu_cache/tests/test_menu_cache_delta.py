@@ -0,0 +1,121 @@
+import base64
+import copy
+import gzip
+import json
+import pytest
+from unittest.mock import patch, AsyncMock
+from asgiref.sync import async_to_sync
+from apps.core.services.supabase_client import supabase_client
+from apps.menu_cache.delta import PatchError, apply_patch, category_digests, menu_checksum
+from apps.menu_cache.models import MenuCache
+from apps.menu_cache.services import MenuCacheService
+
+
+class TestMenuDelta:
+    """Unit tests for menu checksums and JSON-Patch application"""
+
+    def test_incremental_digests_match_full_rehash(self, sample_menu_data):
+        """Reusing unchanged category digests gives the full checksum"""
+        digests = category_digests(sample_menu_data)
+        menu_data = copy.deepcopy(sample_menu_data)
+        menu_data['categories'][1]['items'][0]['price'] = '13.99'
+
+        incremental = category_digests(menu_data, digests, changed={1})
+
+        assert incremental[0] == digests[0]
+        assert incremental[1] != digests[1]
+        assert menu_checksum(menu_data, incremental) == menu_checksum(menu_data)
+
+    def test_apply_patch_in_place(self, sample_menu_data):
+        """Operations edit the document in place and report touched categories"""
+        menu_data = copy.deepcopy(sample_menu_data)
+
+        changed = apply_patch(menu_data, [
+            {'op': 'replace', 'path': '/categories/1/items/0/price', 'value': '13.99'},
+            {'op': 'add', 'path': '/categories/0/items/-', 'value': {'id': 'new-item', 'price': '4.00'}},
+            {'op': 'test', 'path': '/categories/0/name', 'value': 'Appetizers'},
+        ])
+
+        assert changed == {0, 1}
+        assert menu_data['categories'][1]['items'][0]['price'] == '13.99'
+        assert menu_data['categories'][0]['items'][-1]['id'] == 'new-item'
+
+    def test_apply_patch_structural_change(self, sample_menu_data):
+        """Adding or removing a category shifts positions, so everything is rehashed"""
+        menu_data = copy.deepcopy(sample_menu_data)
+
+        changed = apply_patch(menu_data, [{'op': 'remove', 'path': '/categories/0'}])
+
+        assert changed is None
+        assert len(menu_data['categories']) == 1
+
+    def test_apply_patch_invalid_path(self, sample_menu_data):
+        with pytest.raises(PatchError):
+            apply_patch(copy.deepcopy(sample_menu_data), [
+                {'op': 'replace', 'path': '/categories/5/name', 'value': 'Missing'}
+            ])
+
+
+@pytest.mark.django_db
+class TestConditionalMenuSync:
+    """Menu sync against not-modified, patch and compressed full responses"""
+
+    def _sync(self, service, restaurant, response):
+        with patch.object(supabase_client, 'get_menu', new_callable=AsyncMock) as mock_get_menu:
+            mock_get_menu.side_effect = response if isinstance(response, list) else [response]
+            result = async_to_sync(service.sync_menu_from_supabase)(str(restaurant.id))
+        return result, mock_get_menu
+
+    def test_sends_local_checksum(self, menu_cache):
+        """An unchanged menu is confirmed without a new version"""
+        service = MenuCacheService()
+
+        result, mock_get_menu = self._sync(service, menu_cache.restaurant, {'status': 'not_modified'})
+
+        assert result is True
+        kwargs = mock_get_menu.call_args.kwargs
+        assert kwargs['checksum'] == menu_cache.checksum
+        assert kwargs['category_checksums'] == menu_cache.category_checksums
+        assert MenuCache.objects.filter(restaurant=menu_cache.restaurant).count() == 1
+
+    def test_patch_creates_new_version(self, menu_cache, sample_menu_data):
+        """A JSON-Patch is applied to the cached menu and stored as the next version"""
+        service = MenuCacheService()
+        expected = copy.deepcopy(sample_menu_data)
+        expected['categories'][1]['items'][0]['price'] = '13.99'
+
+        result, _ = self._sync(service, menu_cache.restaurant, {
+            'status': 'patch',
+            'base_checksum': menu_cache.checksum,
+            'checksum': menu_checksum(expected),
+            'patch': [{'op': 'replace', 'path': '/categories/1/items/0/price', 'value': '13.99'}],
+        })
+
+        assert result is True
+        active = MenuCache.objects.get(restaurant=menu_cache.restaurant, is_active=True)
+        assert active.version == 2
+        assert active.menu_data == expected
+        assert active.checksum == active.calculate_checksum()
+        assert active.category_checksums[0] == menu_cache.category_checksums[0]
+
+    def test_patch_checksum_mismatch_fetches_full_menu(self, menu_cache, sample_menu_data):
+        """A patch that does not reproduce the cloud checksum is discarded"""
+        service = MenuCacheService()
+        full_menu = copy.deepcopy(sample_menu_data)
+        full_menu['categories'][0]['name'] = 'Starters'
+        compressed = base64.b64encode(gzip.compress(json.dumps(full_menu).encode())).decode()
+
+        result, mock_get_menu = self._sync(service, menu_cache.restaurant, [
+            {
+                'status': 'patch',
+                'base_checksum': menu_cache.checksum,
+                'checksum': 'not-the-patched-checksum',
+                'patch': [{'op': 'replace', 'path': '/categories/1/name', 'value': 'Mains'}],
+            },
+            {'status': 'full', 'encoding': 'gzip', 'menu': compressed},
+        ])
+
+        assert result is True
+        assert mock_get_menu.call_count == 2
+        active = MenuCache.objects.get(restaurant=menu_cache.restaurant, is_active=True)
+        assert active.menu_data == full_menu
@@ -55,49 +55,48 @@ class TestMenuCacheIntegration:
                   new_callable=AsyncMock) as mock_get_menu:
             mock_get_menu.return_value = sample_supabase_menu
             
-            with patch('apps.core.services.supabase_client.supabase_client.set_restaurant_context'):
-                # First sync
-                result1 = await service.sync_menu_from_supabase(str(test_restaurant.id))
-                assert result1 is True
-                
-                # Verify cache creation
-                cache1 = await sync_to_async(
-                    MenuCache.objects.filter(restaurant=test_restaurant, is_active=True).first
-                )()
-                assert cache1 is not None
-                assert cache1.version == 1
-                
-                # Second sync with same data (should not create new version)
-                result2 = await service.sync_menu_from_supabase(str(test_restaurant.id))
-                assert result2 is True
-                
-                # Verify no new cache was created
-                cache2 = await sync_to_async(
-                    MenuCache.objects.filter(restaurant=test_restaurant, is_active=True).first
-                )()
-                assert cache2.id == cache1.id
-                assert cache2.version == 1
-                
-                # Third sync with different data
-                different_menu = sample_supabase_menu.copy()
-                different_menu['categories'][0]['items'][0]['price'] = "18.99"
-                different_menu['categories'][0]['items'][0]['name'] = "Updated Integration Item"
-                mock_get_menu.return_value = different_menu
-                
-                result3 = await service.sync_menu_from_supabase(str(test_restaurant.id))
-                assert result3 is True
-                
-                # Verify new cache was created and old one deactivated
-                cache3 = await sync_to_async(
-                    MenuCache.objects.filter(restaurant=test_restaurant, is_active=True).first
-                )()
-                assert cache3 is not None
-                assert cache3.version == 2
-                assert cache3.id != cache1.id
-                
-                # Verify old cache is deactivated
-                await sync_to_async(cache1.refresh_from_db)()
-                assert cache1.is_active is False
+            # First sync
+            result1 = await service.sync_menu_from_supabase(str(test_restaurant.id))
+            assert result1 is True
+            
+            # Verify cache creation
+            cache1 = await sync_to_async(
+                MenuCache.objects.filter(restaurant=test_restaurant, is_active=True).first
+            )()
+            assert cache1 is not None
+            assert cache1.version == 1
+            
+            # Second sync with same data (should not create new version)
+            result2 = await service.sync_menu_from_supabase(str(test_restaurant.id))
+            assert result2 is True
+            
+            # Verify no new cache was created
+            cache2 = await sync_to_async(
+                MenuCache.objects.filter(restaurant=test_restaurant, is_active=True).first
+            )()
+            assert cache2.id == cache1.id
+            assert cache2.version == 1
+            
+            # Third sync with different data
+            different_menu = sample_supabase_menu.copy()
+            different_menu['categories'][0]['items'][0]['price'] = "18.99"
+            different_menu['categories'][0]['items'][0]['name'] = "Updated Integration Item"
+            mock_get_menu.return_value = different_menu
+            
+            result3 = await service.sync_menu_from_supabase(str(test_restaurant.id))
+            assert result3 is True
+            
+            # Verify new cache was created and old one deactivated
+            cache3 = await sync_to_async(
+                MenuCache.objects.filter(restaurant=test_restaurant, is_active=True).first
+            )()
+            assert cache3 is not None
+            assert cache3.version == 2
+            assert cache3.id != cache1.id
+            
+            # Verify old cache is deactivated
+            await sync_to_async(cache1.refresh_from_db)()
+            assert cache1.is_active is False
     
     def test_cache_hierarchy_redis_to_database(self, menu_cache):
         """Test cache hierarchy (Redis -> Database)"""
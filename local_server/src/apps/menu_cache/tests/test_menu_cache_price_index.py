@@ -0,0 +1,75 @@
+import copy
+import uuid
+import pytest
+from apps.menu_cache.models import MenuCache
+from apps.menu_cache.price_index import MenuPriceIndexService
+
+@pytest.mark.django_db
+class TestMenuPriceIndex:
+    """Unit tests for the in-memory menu price index"""
+
+    def test_index_built_from_active_menu(self, menu_cache, sample_menu_data):
+        """Items are indexed by id with price in cents"""
+        service = MenuPriceIndexService()
+
+        index = service.get(menu_cache.restaurant_id)
+
+        item = sample_menu_data['categories'][0]['items'][0]
+        entry = index.get_item(item['id'])
+        assert index.checksum == menu_cache.checksum
+        assert len(index.items) == 2
+        assert entry.price_cents == 599
+        assert entry.preparation_time == 10
+        assert entry.department == 'Appetizers'
+
+    def test_index_indexes_modifiers(self, test_restaurant, sample_menu_data):
+        """Item modifiers are indexed by their own id"""
+        menu_data = copy.deepcopy(sample_menu_data)
+        menu_data['categories'][1]['items'][0]['modifiers'] = [
+            {'id': 'mod-cheese', 'name': 'Extra Cheese', 'price': '1.50'}
+        ]
+        MenuCache.objects.create(restaurant=test_restaurant, menu_data=menu_data, version=1)
+
+        index = MenuPriceIndexService().get(test_restaurant.id)
+
+        assert index.get_modifier('mod-cheese').price_cents == 150
+
+    def test_index_rebuilds_on_checksum_change(self, menu_cache, sample_menu_data):
+        """Changed categories are re-indexed and unchanged ones reused"""
+        service = MenuPriceIndexService(check_interval=0)
+        first = service.get(menu_cache.restaurant_id)
+
+        menu_data = copy.deepcopy(sample_menu_data)
+        menu_data['categories'][1]['items'][0]['price'] = '14.50'
+        menu_cache.menu_data = menu_data
+        menu_cache.save()
+
+        second = service.get(menu_cache.restaurant_id)
+
+        appetizer_id = str(sample_menu_data['categories'][0]['items'][0]['id'])
+        pizza_id = str(sample_menu_data['categories'][1]['items'][0]['id'])
+        assert second is not first
+        assert second.get_item(pizza_id).price_cents == 1450
+        assert second.get_item(appetizer_id) is first.get_item(appetizer_id)
+
+    def test_no_index_without_menu(self, test_restaurant):
+        """Restaurants without a cached menu have no index"""
+        assert MenuPriceIndexService().get(test_restaurant.id) is None
+
+    def test_registry_is_bounded(self, menu_cache, test_restaurant, sample_menu_data):
+        """Least recently used restaurants are dropped beyond the limit"""
+        from apps.core.models import Restaurant
+        other = Restaurant.objects.create(
+            supabase_restaurant_id=str(uuid.uuid4()),
+            name='Other Outlet',
+            address={},
+            contact_info={},
+            is_active=True
+        )
+        MenuCache.objects.create(restaurant=other, menu_data=sample_menu_data, version=1)
+        service = MenuPriceIndexService(max_restaurants=1)
+
+        service.get(test_restaurant.id)
+        service.get(other.id)
+
+        assert list(service._indexes) == [str(other.id)]
@@ -0,0 +1,126 @@
+import threading
+import time
+import uuid
+import pytest
+from unittest.mock import patch
+from django.core.cache import cache
+from apps.menu_cache.services import MenuCacheService
+from apps.menu_cache.store import CachedMenu, LRUCache, MenuStore
+
+
+def make_loader(calls, version=1, delay=0):
+    def loader():
+        calls.append(version)
+        time.sleep(delay)
+        return CachedMenu('r1', version, f'checksum-{version}', {'categories': [], 'version': version})
+    return loader
+
+
+def unique_prefix(name):
+    # Redis may be shared with other test runs, so keys must not repeat
+    return f'{name}_{uuid.uuid4().hex[:8]}'
+
+
+class TestMenuStore:
+    """Unit tests for the two-tier menu cache"""
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUCache(max_entries=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        assert lru.get('a') == 1
+        assert lru.get('b') is None
+        assert len(lru) == 2
+
+    def test_local_hit_skips_redis(self):
+        """Once loaded, reads are served from process memory"""
+        store = MenuStore(prefix=unique_prefix('test_menu_local'))
+        calls = []
+        store.get('r1', make_loader(calls))
+
+        with patch.object(cache, 'get', side_effect=AssertionError('Redis read')):
+            entry = store.get('r1', make_loader(calls))
+
+        assert entry.version == 1
+        assert calls == [1]
+
+    def test_shared_tier_fills_other_processes(self):
+        """A second process finds the menu in Redis without loading it"""
+        prefix = unique_prefix('test_menu_shared')
+        calls = []
+        MenuStore(prefix=prefix).get('r1', make_loader(calls))
+
+        entry = MenuStore(prefix=prefix).get('r1', make_loader(calls))
+
+        assert entry.checksum == 'checksum-1'
+        assert calls == [1]
+
+    def test_concurrent_misses_load_once(self):
+        """Threads missing together wait for a single refill"""
+        store = MenuStore(prefix=unique_prefix('test_menu_flight'))
+        calls = []
+        results = []
+        loader = make_loader(calls, delay=0.1)
+
+        threads = [
+            threading.Thread(target=lambda: results.append(store.get('r1', loader)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert all(entry.version == 1 for entry in results)
+
+    def test_invalidate_loads_new_version(self):
+        store = MenuStore(prefix=unique_prefix('test_menu_invalidate'))
+        store.get('r1', make_loader([]))
+
+        store.invalidate('r1')
+        entry = store.get('r1', make_loader([], version=2))
+
+        assert entry.version == 2
+
+    def test_redis_errors_back_off_and_recover(self):
+        """Redis failures pause Redis use instead of disabling it for good"""
+        store = MenuStore(prefix=unique_prefix('test_menu_backoff'), backoff_max=1)
+        key = f'{store.prefix}_key'
+
+        with patch.object(cache, 'get', side_effect=ConnectionError('down')) as mock_get:
+            assert store._redis(cache.get, key) is None
+            assert store._redis(cache.get, key) is None
+        assert mock_get.call_count == 1
+
+        store._redis_retry_at = 0
+        cache.set(key, 'value')
+        assert store._redis(cache.get, key) == 'value'
+        assert store._redis_failures == 0
+
+
+@pytest.mark.django_db
+class TestMenuCacheServiceStore:
+    """Menu reads through MenuCacheService"""
+
+    def test_sync_invalidation_replaces_cached_version(self, menu_cache, sample_menu_data):
+        service = MenuCacheService()
+        restaurant_id = str(menu_cache.restaurant_id)
+        assert service.get_cached_menu(restaurant_id) == sample_menu_data
+
+        menu_cache.is_active = False
+        menu_cache.save()
+        service.invalidate_cache(restaurant_id)
+
+        assert service.get_cached_menu(restaurant_id) is None
+
+    def test_warm_loads_every_active_restaurant(self, menu_cache, sample_menu_data):
+        service = MenuCacheService()
+        service.store.invalidate()
+
+        assert service.warm() >= 1
+        with patch.object(cache, 'get', side_effect=AssertionError('Redis read')):
+            assert service.get_cached_menu(str(menu_cache.restaurant_id)) == sample_menu_data
@@ -1,5 +1,8 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
+from asgiref.sync import async_to_sync
+from apps.menu_cache.services import MenuCacheService
 from apps.menu_cache.tasks import sync_all_restaurant_menus, sync_single_restaurant_menu
 import uuid
 
@@ -7,12 +10,15 @@ import uuid
 class TestMenuCacheTasks:
     """Unit tests for Menu Cache Celery tasks"""
     
-    @patch('apps.menu_cache.tasks.MenuCacheService')
-    def test_sync_all_restaurant_menus_success(self, mock_service_class, test_restaurant):
+    def _only_active(self, *restaurants):
+        """Deactivate restaurants left behind by other tests so counts cover ours alone"""
+        from apps.core.models import Restaurant
+        Restaurant.objects.exclude(id__in=[r.id for r in restaurants]).update(is_active=False)
+    
+    @patch.object(MenuCacheService, 'sync_menu', new_callable=AsyncMock)
+    def test_sync_all_restaurant_menus_success(self, mock_sync_menu, test_restaurant):
         """Test successful sync of all restaurant menus"""
-        mock_service = MagicMock()
-        mock_service_class.return_value = mock_service
-        mock_service.sync_menu_from_supabase.return_value = True
+        mock_sync_menu.return_value = 'updated'
         
         # Create multiple restaurants
         from apps.core.models import Restaurant
@@ -21,19 +27,18 @@ class TestMenuCacheTasks:
             name='Test Restaurant 2',
             is_active=True
         )
+        self._only_active(test_restaurant, restaurant2)
         
         result = sync_all_restaurant_menus()
         
         assert result['synced'] == 2
         assert result['failed'] == 0
-        assert mock_service.sync_menu_from_supabase.call_count == 2
+        assert mock_sync_menu.await_count == 2
     
-    @patch('apps.menu_cache.tasks.MenuCacheService')
-    def test_sync_all_restaurant_menus_partial_failure(self, mock_service_class, test_restaurant):
+    @patch.object(MenuCacheService, 'sync_menu', new_callable=AsyncMock)
+    def test_sync_all_restaurant_menus_partial_failure(self, mock_sync_menu, test_restaurant):
         """Test sync with partial failures"""
-        mock_service = MagicMock()
-        mock_service_class.return_value = mock_service
-        mock_service.sync_menu_from_supabase.side_effect = [True, False]
+        mock_sync_menu.side_effect = ['updated', 'failed']
         
         # Create multiple restaurants
         from apps.core.models import Restaurant
@@ -42,11 +47,13 @@ class TestMenuCacheTasks:
             name='Test Restaurant 2',
             is_active=True
         )
+        self._only_active(test_restaurant, restaurant2)
         
         result = sync_all_restaurant_menus()
         
         assert result['synced'] == 1
         assert result['failed'] == 1
+        assert len(result['failed_restaurants']) == 1
     
     @patch('apps.menu_cache.tasks.MenuCacheService')
     def test_sync_all_restaurant_menus_exception(self, mock_service_class):
@@ -63,20 +70,20 @@ class TestMenuCacheTasks:
         """Test successful sync of single restaurant menu"""
         mock_service = MagicMock()
         mock_service_class.return_value = mock_service
-        mock_service.sync_menu_from_supabase.return_value = True
+        mock_service.sync_menu_from_supabase = AsyncMock(return_value=True)
         
         result = sync_single_restaurant_menu(str(test_restaurant.id))
         
         assert result['success'] is True
         assert result['restaurant_id'] == str(test_restaurant.id)
-        mock_service.sync_menu_from_supabase.assert_called_once_with(str(test_restaurant.id))
+        mock_service.sync_menu_from_supabase.assert_awaited_once_with(str(test_restaurant.id))
     
     @patch('apps.menu_cache.tasks.MenuCacheService')
     def test_sync_single_restaurant_menu_failure(self, mock_service_class, test_restaurant):
         """Test failed sync of single restaurant menu"""
         mock_service = MagicMock()
         mock_service_class.return_value = mock_service
-        mock_service.sync_menu_from_supabase.return_value = False
+        mock_service.sync_menu_from_supabase = AsyncMock(return_value=False)
         
         result = sync_single_restaurant_menu(str(test_restaurant.id))
         
@@ -88,10 +95,64 @@ class TestMenuCacheTasks:
         """Test sync when exception occurs"""
         mock_service = MagicMock()
         mock_service_class.return_value = mock_service
-        mock_service.sync_menu_from_supabase.side_effect = Exception("Sync failed")
+        mock_service.sync_menu_from_supabase = AsyncMock(side_effect=Exception("Sync failed"))
         
         result = sync_single_restaurant_menu(str(test_restaurant.id))
         
         assert result['success'] is False
         assert 'error' in result
-        assert 'Sync failed' in result['error']
\ No newline at end of file
+        assert 'Sync failed' in result['error']
+
+
+class TestConcurrentMenuSync:
+    """Fan-out of menu syncs across restaurants"""
+    
+    def test_unchanged_menus_are_skipped(self):
+        service = MenuCacheService()
+        outcomes = {'r1': 'updated', 'r2': 'unchanged', 'r3': 'unchanged'}
+        
+        async def sync_menu(restaurant_id):
+            return outcomes[restaurant_id]
+        
+        with patch.object(service, 'sync_menu', side_effect=sync_menu):
+            result = async_to_sync(service.sync_menus)(['r1', 'r2', 'r3'])
+        
+        assert result['updated'] == 1
+        assert result['skipped'] == 2
+        assert result['synced'] == 3
+        assert result['failed'] == 0
+    
+    def test_slow_restaurant_times_out_alone(self):
+        """One hung sync is cancelled without holding up the others"""
+        service = MenuCacheService()
+        
+        async def sync_menu(restaurant_id):
+            if restaurant_id == 'slow':
+                await asyncio.sleep(10)
+            return 'updated'
+        
+        with patch.object(service, 'sync_menu', side_effect=sync_menu):
+            result = async_to_sync(service.sync_menus)(['slow', 'r1', 'r2'], timeout=0.1)
+        
+        assert result['synced'] == 2
+        assert result['timed_out'] == 1
+        assert result['failed_restaurants'] == ['slow']
+        assert result['duration_ms'] < 5000
+    
+    def test_concurrency_limit(self):
+        service = MenuCacheService()
+        running = []
+        peak = []
+        
+        async def sync_menu(restaurant_id):
+            running.append(restaurant_id)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(restaurant_id)
+            return 'unchanged'
+        
+        with patch.object(service, 'sync_menu', side_effect=sync_menu):
+            result = async_to_sync(service.sync_menus)([f'r{i}' for i in range(10)], concurrency=3)
+        
+        assert result['skipped'] == 10
+        assert max(peak) == 3
@@ -1,4 +1,5 @@
 import pytest
+import uuid
 import json
 from unittest.mock import patch, MagicMock
 from rest_framework import status
@@ -145,4 +146,91 @@ class TestMenuCacheViews:
         response = authenticated_client.post('/api/menu-cache/menus/invalidate/')
         
         assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
-        assert 'error' in response.data
\ No newline at end of file
+        assert 'error' in response.data
+
+@pytest.mark.django_db
+class TestMenuResponses:
+    """Pre-rendered menu responses with ETags"""
+
+    @pytest.fixture(autouse=True)
+    def current_restaurant(self, menu_cache, monkeypatch):
+        from apps.core.services.restaurant_cache import restaurant_cache
+        monkeypatch.setattr(restaurant_cache, 'default_id', lambda: str(menu_cache.restaurant_id))
+
+    def test_current_menu_has_strong_etag(self, api_client, menu_cache):
+        response = api_client.get('/api/menu-cache/current/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] == f'"{menu_cache.checksum}"'
+        assert json.loads(response.content) == {'menu': menu_cache.menu_data, 'cached': True}
+
+    def test_current_menu_not_modified(self, api_client, menu_cache):
+        response = api_client.get(
+            '/api/menu-cache/current/',
+            HTTP_IF_NONE_MATCH=f'"{menu_cache.checksum}-gzip"',
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+    def test_current_menu_gzip(self, api_client, menu_cache):
+        import gzip
+
+        response = api_client.get('/api/menu-cache/current/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert json.loads(gzip.decompress(response.content))['menu'] == menu_cache.menu_data
+
+
+@pytest.mark.django_db
+class TestMultiRestaurantMenus:
+    """Menus for several outlets on one server"""
+
+    def test_menu_per_restaurant_path(self, api_client, menu_cache, sample_menu_data):
+        from apps.core.models import Restaurant
+        other = Restaurant.objects.create(
+            supabase_restaurant_id=str(uuid.uuid4()),
+            name='Other Outlet',
+            address={'street': '1 Court St'},
+            contact_info={'phone': '555-0101'},
+            is_active=True
+        )
+        other_menu = MenuCache.objects.create(
+            restaurant=other,
+            menu_data={'categories': [{'id': 'drinks', 'name': 'Drinks', 'items': []}]},
+            version=1
+        )
+
+        first = api_client.get(f'/api/menu-cache/current/{menu_cache.restaurant_id}/')
+        second = api_client.get('/api/menu-cache/current/', {'restaurant_id': str(other.id)})
+
+        assert json.loads(first.content)['menu'] == sample_menu_data
+        assert json.loads(second.content)['menu'] == other_menu.menu_data
+
+    def test_invalid_restaurant_id(self, api_client):
+        response = api_client.get('/api/menu-cache/current/', {'restaurant_id': 'not-a-uuid'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestMenuMetrics:
+    """Menu cache lookup counters"""
+
+    def _sample(self, name, **labels):
+        from prometheus_client import REGISTRY
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_menu_cache_lookups_by_tier(self, api_client, menu_cache):
+        from apps.menu_cache.services import menu_store
+        menu_store.invalidate()
+        local = self._sample('dineswift_menu_cache_lookups_total', tier='local')
+        miss = self._sample('dineswift_menu_cache_lookups_total', tier='miss')
+
+        api_client.get(f'/api/menu-cache/current/{menu_cache.restaurant_id}/')
+        api_client.get(f'/api/menu-cache/current/{menu_cache.restaurant_id}/')
+
+        assert self._sample('dineswift_menu_cache_lookups_total', tier='miss') == miss + 1
+        assert self._sample('dineswift_menu_cache_lookups_total', tier='local') == local + 1
@@ -9,5 +9,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('sync/', views.sync_menu, name='sync-menu'),
     path('current/', views.get_current_menu, name='current-menu'),
+    path('current/<uuid:restaurant_id>/', views.get_current_menu, name='restaurant-current-menu'),
     path('version/', views.get_menu_version, name='menu-version'),
 ]
\ No newline at end of file
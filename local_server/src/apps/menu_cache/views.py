@@ -1,13 +1,14 @@
 import logging
+import uuid
+from asgiref.sync import async_to_sync
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import AllowAny
 from rest_framework.viewsets import ViewSet
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
+from .responses import menu_response
 from .services import menu_cache_service
 from .serializers import MenuCacheSerializer, MenuSyncSerializer
 from .models import MenuCache
@@ -16,24 +17,31 @@ logger = logging.getLogger('dineswift')
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
-@cache_page(60)  # Cache for 1 minute
-def get_current_menu(request):
-    """Get current cached menu for the restaurant"""
+def get_current_menu(request, restaurant_id=None):
+    """Get current cached menu for the restaurant (path, ?restaurant_id= or the user's)"""
     try:
+        restaurant_id = restaurant_id or request.query_params.get('restaurant_id')
+        if restaurant_id:
+            try:
+                restaurant_id = uuid.UUID(str(restaurant_id))
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid restaurant_id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif request.user.is_authenticated:
+            restaurant_id = getattr(request.user, 'restaurant_id', None)
         
+        entry = menu_cache_service.get_current_menu_entry(restaurant_id)
         
-        menu_data = menu_cache_service.get_current_menu()
-        
-        if not menu_data:
+        if not entry:
             return Response(
                 {'error': 'No menu available. Please sync menu first.'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        return Response({
-            'menu': menu_data,
-            'cached': True
-        })
+        # Pre-rendered bytes; 304 when the phone already has this version
+        return menu_response(request, entry)
         
     except Exception as e:
         logger.error(f"Failed to get current menu: {str(e)}")
@@ -50,7 +58,7 @@ def sync_menu(request):
         restaurant_id = request.user.restaurant_id
         
         # You can add parameters like force_refresh via serializer if needed
-        success = menu_cache_service.sync_menu_from_supabase(restaurant_id)
+        success = async_to_sync(menu_cache_service.sync_menu_from_supabase)(str(restaurant_id))
         
         if success:
             # Return updated menu
@@ -133,7 +141,7 @@ class MenuCacheViewSet(ViewSet):
         try:
             restaurant_id = request.user.restaurant_id
             
-            success = menu_cache_service.sync_menu_from_supabase(restaurant_id)
+            success = async_to_sync(menu_cache_service.sync_menu_from_supabase)(str(restaurant_id))
             
             if success:
                 # Return updated menu
@@ -0,0 +1,49 @@
+"""
+Order Access Cache
+Short-lived WebSocket access decisions per (user restaurant, order)
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+
+
+class OrderAccessCache:
+    """
+    Remembers whether a restaurant's users may follow an order.
+
+    An order never changes restaurant, so a decision stays valid; the TTL
+    only bounds how long a denial for a not-yet-synced order is kept. After
+    a Wi-Fi blip every screen reconnects at once, and cached decisions let
+    them in (or turn them away) without waiting on the database.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, restaurant_id, order_id) -> Optional[bool]:
+        key = (str(restaurant_id), str(order_id))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return entry[0]
+
+    def set(self, restaurant_id, order_id, allowed: bool):
+        key = (str(restaurant_id), str(order_id))
+        self._entries[key] = (allowed, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Cache instance (only touched from the event loop)
+order_access_cache = OrderAccessCache(ttl=settings.WEBSOCKET_CONFIG['access_cache_ttl'])
@@ -0,0 +1,249 @@
+"""
+Active Order Board
+Cached working set of open orders for kitchen and waiter screens
+"""
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import OfflineOrder
+from .state_machine import order_state_machine
+
+logger = logging.getLogger('dineswift')
+
+ACTIVE_STATUSES = ('PENDING', 'CONFIRMED', 'PREPARING', 'READY')
+
+
+class ActiveOrderBoard:
+    """
+    Per-restaurant board of PENDING/CONFIRMED/PREPARING/READY orders.
+
+    The board is a single cache entry holding order summaries plus
+    per-status and per-table id lists, so screens read it with one cache
+    GET. Writes are applied after the order transaction commits, under a
+    short cache lock. If the lock cannot be taken, or a write references an
+    order the board does not know, the entry is dropped and rebuilt from
+    the orders table on the next read.
+    """
+
+    def __init__(self):
+        self.cache_timeout = 86400  # 24 hours
+        self.lock_timeout = 5
+        self.lock_attempts = 50
+
+    def get_board(self, restaurant_id: str) -> dict:
+        """Return the board for a restaurant, rebuilding it if missing"""
+        board = self._load(restaurant_id)
+        if board is None:
+            board = self.rebuild(restaurant_id)
+        return board
+
+    def get_orders(self, restaurant_id: str, status: str = None, table_id: str = None) -> list:
+        """Order summaries, optionally narrowed to one status or table"""
+        return self.filter_orders(self.get_board(restaurant_id), status, table_id)
+
+    def filter_orders(self, board: dict, status: str = None, table_id: str = None) -> list:
+        if status:
+            order_ids = board['statuses'].get(status, [])
+        elif table_id:
+            order_ids = board['tables'].get(str(table_id), [])
+        else:
+            order_ids = board['orders'].keys()
+
+        return [board['orders'][order_id] for order_id in order_ids]
+
+    def rebuild(self, restaurant_id: str) -> dict:
+        """Build the board from the orders table (cold start or recovery)"""
+        restaurant_id = str(restaurant_id)
+
+        # Hold the lock while reading so a concurrent commit is applied on
+        # top of the rebuilt board rather than lost
+        locked = self._acquire(restaurant_id)
+        try:
+            orders = OfflineOrder.objects.filter(
+                restaurant_id=restaurant_id,
+                order_status__in=ACTIVE_STATUSES
+            ).order_by('created_at')
+
+            board = self._empty_board()
+            for order in orders:
+                self._add(board, self.summarize(order))
+
+            if locked:
+                self._store(restaurant_id, board)
+        finally:
+            if locked:
+                self._release(restaurant_id)
+
+        logger.info(f"Active order board rebuilt for restaurant {restaurant_id}: {len(board['orders'])} orders")
+        return board
+
+    def upsert_orders(self, restaurant_id: str, orders: Iterable[OfflineOrder]):
+        """Add or replace orders on the board"""
+        summaries = [self.summarize(order) for order in orders]
+
+        def apply(board):
+            for summary in summaries:
+                self._remove(board, summary['id'])
+                if summary['order_status'] in ACTIVE_STATUSES:
+                    self._add(board, summary)
+            return True
+
+        self._mutate(restaurant_id, apply)
+
+    def on_commit_upsert(self, restaurant_id: str, orders: list):
+        """Upsert orders once the current transaction commits"""
+        transaction.on_commit(lambda: self.upsert_orders(restaurant_id, orders))
+
+    def move_orders(self, restaurant_id: str, order_ids: Iterable[str], new_status: str, current_time=None):
+        """Move orders to a new status, dropping them once they leave the active set"""
+        order_ids = [str(order_id) for order_id in order_ids]
+
+        def apply(board):
+            for order_id in order_ids:
+                summary = self._remove(board, order_id)
+                if new_status not in ACTIVE_STATUSES:
+                    continue
+                if summary is None:
+                    return False  # Unknown order, rebuild instead
+                summary['order_status'] = new_status
+                if new_status == 'PREPARING' and not summary['preparation_started_at'] and current_time:
+                    summary['preparation_started_at'] = current_time.isoformat()
+                self._add(board, summary)
+            return True
+
+        self._mutate(restaurant_id, apply)
+
+    def invalidate(self, restaurant_id: str):
+        try:
+            cache.delete(self._key(restaurant_id))
+        except Exception as e:
+            logger.warning(f"Active order board invalidation failed: {str(e)}")
+
+    def summarize(self, order: OfflineOrder) -> dict:
+        return {
+            'id': str(order.id),
+            'local_order_id': order.local_order_id,
+            'table_id': str(order.table_id) if order.table_id else None,
+            'order_status': order.order_status,
+            'order_items': order.order_items,
+            'special_instructions': order.special_instructions,
+            'estimated_preparation_time': order.estimated_preparation_time,
+            'preparation_started_at': (
+                order.preparation_started_at.isoformat() if order.preparation_started_at else None
+            ),
+            'created_at': order.created_at.isoformat() if order.created_at else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _key(self, restaurant_id) -> str:
+        return f"active_orders_{restaurant_id}"
+
+    def _empty_board(self) -> dict:
+        return {
+            'version': 0,
+            'orders': {},
+            'statuses': {status: [] for status in ACTIVE_STATUSES},
+            'tables': {},
+        }
+
+    def _add(self, board: dict, summary: dict):
+        order_id = summary['id']
+        board['orders'][order_id] = summary
+        board['statuses'].setdefault(summary['order_status'], []).append(order_id)
+        if summary['table_id']:
+            board['tables'].setdefault(summary['table_id'], []).append(order_id)
+
+    def _remove(self, board: dict, order_id: str) -> Optional[dict]:
+        summary = board['orders'].pop(order_id, None)
+        if summary is None:
+            return None
+
+        board['statuses'][summary['order_status']].remove(order_id)
+        table_orders = board['tables'].get(summary['table_id'])
+        if table_orders is not None:
+            table_orders.remove(order_id)
+            if not table_orders:
+                del board['tables'][summary['table_id']]
+        return summary
+
+    def _load(self, restaurant_id: str) -> Optional[Dict]:
+        try:
+            return cache.get(self._key(restaurant_id))
+        except Exception as e:
+            logger.warning(f"Active order board read failed: {str(e)}")
+            return None
+
+    def _store(self, restaurant_id: str, board: dict):
+        try:
+            cache.set(self._key(restaurant_id), board, self.cache_timeout)
+        except Exception as e:
+            logger.warning(f"Active order board write failed: {str(e)}")
+
+    def _acquire(self, restaurant_id: str) -> bool:
+        lock_key = f"{self._key(restaurant_id)}_lock"
+        try:
+            for _ in range(self.lock_attempts):
+                if cache.add(lock_key, 1, self.lock_timeout):
+                    return True
+                time.sleep(0.01)
+        except Exception as e:
+            logger.warning(f"Active order board lock failed: {str(e)}")
+        return False
+
+    def _release(self, restaurant_id: str):
+        try:
+            cache.delete(f"{self._key(restaurant_id)}_lock")
+        except Exception:
+            pass
+
+    def _mutate(self, restaurant_id: str, apply):
+        """Apply a change to the cached board under a short cache lock"""
+        restaurant_id = str(restaurant_id)
+
+        try:
+            if not self._acquire(restaurant_id):
+                logger.warning(f"Active order board busy for restaurant {restaurant_id}, dropping it")
+                self.invalidate(restaurant_id)
+                return
+
+            try:
+                board = self._load(restaurant_id)
+                if board is None:
+                    return  # Rebuilt from the database on next read
+
+                if apply(board):
+                    board['version'] += 1
+                    self._store(restaurant_id, board)
+                else:
+                    self.invalidate(restaurant_id)
+            finally:
+                self._release(restaurant_id)
+
+        except Exception as e:
+            logger.warning(f"Active order board update failed: {str(e)}")
+            self.invalidate(restaurant_id)
+
+
+# Board instance
+active_order_board = ActiveOrderBoard()
+
+
+@order_state_machine.register_hook
+def update_active_board(transitions: list, new_status: str, notes: str, current_time):
+    """Move transitioned orders on the active board after commit"""
+    by_restaurant = {}
+    for order, _ in transitions:
+        by_restaurant.setdefault(order.restaurant_id, []).append(order.id)
+
+    for restaurant_id, order_ids in by_restaurant.items():
+        transaction.on_commit(
+            lambda restaurant_id=restaurant_id, order_ids=order_ids:
+                active_order_board.move_orders(restaurant_id, order_ids, new_status, current_time)
+        )
@@ -0,0 +1,100 @@
+"""
+Order Broadcasts
+Pushes order changes to WebSocket groups once the change has committed
+"""
+import logging
+from typing import List
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .board import active_order_board
+from .state_machine import order_state_machine
+
+logger = logging.getLogger('dineswift')
+
+
+def order_group(order_id) -> str:
+    return f"order_{order_id}"
+
+
+def restaurant_group(restaurant_id) -> str:
+    return f"restaurant_{restaurant_id}_orders"
+
+
+class OrderBroadcaster:
+    """
+    Fans order events out to per-order and per-restaurant channel groups.
+
+    Events are built once, from the rows the writer already holds, and sent
+    only after the transaction commits so no screen sees a change that was
+    rolled back. A restaurant gets one group message per commit carrying
+    every order that changed in it; each order's own group gets its event
+    in the shape OrderStatusConsumer has always sent.
+    """
+
+    def status_event(self, order, previous_status: str, new_status: str, current_time) -> dict:
+        return {
+            'type': 'order_status',
+            'data': {
+                'id': str(order.id),
+                'local_order_id': order.local_order_id,
+                'status': new_status,
+                'previous_status': previous_status,
+                'updated_at': current_time.isoformat(),
+            }
+        }
+
+    def created_event(self, order) -> dict:
+        # Same summary the active order board holds
+        return {'type': 'order_created', 'data': active_order_board.summarize(order)}
+
+    def on_commit_created(self, restaurant_id, orders: list):
+        """Announce new orders once the current transaction commits"""
+        events = [self.created_event(order) for order in orders]
+        transaction.on_commit(lambda: self.publish(restaurant_id, events))
+
+    def on_commit_publish(self, restaurant_id, events: List[dict]):
+        transaction.on_commit(lambda: self.publish(restaurant_id, events))
+
+    def publish(self, restaurant_id, events: List[dict]):
+        """Send events now; delivery failures are logged, never raised to the writer"""
+        channel_layer = get_channel_layer()
+        if channel_layer is None or not events:
+            return
+
+        try:
+            async_to_sync(self._send)(channel_layer, str(restaurant_id), events)
+        except Exception as e:
+            logger.warning(f"Order broadcast failed for restaurant {restaurant_id}: {str(e)}")
+
+    async def _send(self, channel_layer, restaurant_id: str, events: List[dict]):
+        for event in events:
+            if event['type'] == 'order_status':
+                await channel_layer.group_send(
+                    order_group(event['data']['id']),
+                    {'type': 'order_update', 'data': event['data']}
+                )
+
+        await channel_layer.group_send(
+            restaurant_group(restaurant_id),
+            {'type': 'orders_event', 'events': events}
+        )
+
+
+# Broadcaster instance
+order_broadcaster = OrderBroadcaster()
+
+
+@order_state_machine.register_hook
+def broadcast_status_changes(transitions: list, new_status: str, notes: str, current_time):
+    """Publish transitioned orders to their order and restaurant groups after commit"""
+    by_restaurant = {}
+    for order, previous_status in transitions:
+        by_restaurant.setdefault(order.restaurant_id, []).append(
+            order_broadcaster.status_event(order, previous_status, new_status, current_time)
+        )
+
+    for restaurant_id, events in by_restaurant.items():
+        order_broadcaster.on_commit_publish(restaurant_id, events)
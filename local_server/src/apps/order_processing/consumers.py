@@ -4,6 +4,11 @@ import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.core.exceptions import ValidationError
+from apps.order_processing.access import order_access_cache
+from apps.order_processing.board import active_order_board
+from apps.order_processing.broadcast import order_group, restaurant_group
+from apps.order_processing.dispatch import EventDispatcher
 from apps.order_processing.models import OfflineOrder
 
 logger = logging.getLogger('dineswift')
@@ -13,10 +18,24 @@ class OrderStatusConsumer(AsyncWebsocketConsumer):
     
     async def connect(self):
         self.order_id = self.scope['url_route']['kwargs']['order_id']
-        self.room_group_name = f'order_{self.order_id}'
+        self.room_group_name = order_group(self.order_id)
+        # One order: bursts collapse to its latest status, sent unframed
+        self.dispatcher = EventDispatcher(self.send_text, framed=False)
         
-        # Verify user has access to this order
-        has_access = await self.verify_order_access()
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated:
+            await self.close()
+            return
+        
+        # Reconnects within the TTL get their access decision from memory
+        has_access = order_access_cache.get(user.restaurant_id, self.order_id)
+        order_data = None
+        
+        if has_access is None:
+            # One projected read serves the access check and the first frame
+            restaurant_id, order_data = await self.get_order_snapshot()
+            has_access = restaurant_id is not None and restaurant_id == str(user.restaurant_id)
+            order_access_cache.set(user.restaurant_id, self.order_id, has_access)
         
         if not has_access:
             await self.close()
@@ -31,13 +50,16 @@ class OrderStatusConsumer(AsyncWebsocketConsumer):
         await self.accept()
         
         # Send current order status
-        order_data = await self.get_order_data()
+        if order_data is None:
+            _, order_data = await self.get_order_snapshot()
         await self.send(text_data=json.dumps({
             'type': 'order_status',
             'data': order_data
         }))
     
     async def disconnect(self, close_code):
+        self.dispatcher.close()
+        
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -56,37 +78,133 @@ class OrderStatusConsumer(AsyncWebsocketConsumer):
     async def order_update(self, event):
        # Receive order update from channel layer
         
-        await self.send(text_data=json.dumps({
+        self.dispatcher.push({
             'type': 'order_status',
             'data': event['data']
-        }))
+        })
+    
+    async def send_text(self, text):
+        await self.send(text_data=text)
     
     @database_sync_to_async
-    def verify_order_access(self):
-        #Verify user has access to this order
+    def get_order_snapshot(self):
+        #Get the order's restaurant (for the access check) and current data
+        try:
+            order = OfflineOrder.objects.filter(id=self.order_id).values(
+                'id', 'restaurant_id', 'local_order_id', 'order_status',
+                'total_amount', 'estimated_preparation_time', 'created_at'
+            ).first()
+        except (ValidationError, ValueError):
+            return None, None  # Not an order id
+        
+        if order is None:
+            return None, None
+        
+        return str(order['restaurant_id']), {
+            'id': str(order['id']),
+            'local_order_id': order['local_order_id'],
+            'status': order['order_status'],
+            'total_amount': float(order['total_amount']),
+            'estimated_prep_time': order['estimated_preparation_time'],
+            'created_at': order['created_at'].isoformat(),
+        }
+
+class RestaurantOrdersConsumer(AsyncWebsocketConsumer):
+    # One socket per screen for every order of a restaurant
+    #
+    # Order events are buffered briefly and sent as {"type": "batch", "events": [...]};
+    # a client that falls too far behind gets a fresh orders_snapshot instead.
+    #
+    # A new socket follows all of the restaurant's orders. Clients narrow it
+    # with {"type": "subscribe", "order_ids": [...]}, widen it again with
+    # {"type": "subscribe", "all": true}, and drop orders with
+    # {"type": "unsubscribe", "order_ids": [...]} or {"type": "unsubscribe", "all": true}.
+    
+    async def connect(self):
+        self.restaurant_id = self.scope['url_route']['kwargs']['restaurant_id']
+        self.room_group_name = restaurant_group(self.restaurant_id)
+        self.follow_all = True
+        self.order_ids = set()
+        self.dispatcher = EventDispatcher(self.send_text, resync=self.send_snapshot)
+        
+        if not self.has_restaurant_access():
+            await self.close()
+            return
+        
+        await self.channel_layer.group_add(
+            self.room_group_name,
+            self.channel_name
+        )
+        
+        await self.accept()
+        await self.send_snapshot()
+    
+    async def send_snapshot(self):
+        # Current active orders, from the cached board
+        orders = await self.get_active_orders()
+        await self.send(text_data=json.dumps({
+            'type': 'orders_snapshot',
+            'data': orders
+        }))
+    
+    async def send_text(self, text):
+        await self.send(text_data=text)
+    
+    async def disconnect(self, close_code):
+        self.dispatcher.close()
+        await self.channel_layer.group_discard(
+            self.room_group_name,
+            self.channel_name
+        )
+    
+    async def receive(self, text_data):
         try:
-            user = self.scope.get('user')
-            if not user or not user.is_authenticated:
-                return False
-            
-            order = OfflineOrder.objects.get(id=self.order_id)
-            return str(order.restaurant_id) == str(user.restaurant_id)
-            
-        except OfflineOrder.DoesNotExist:
+            data = json.loads(text_data)
+        except ValueError:
+            return
+        
+        message_type = data.get('type')
+        
+        if message_type == 'ping':
+            await self.send(text_data=json.dumps({
+                'type': 'ping'
+            }))
+        elif message_type in ('subscribe', 'unsubscribe'):
+            self.update_subscription(message_type, data)
+            await self.send(text_data=json.dumps({
+                'type': 'subscription',
+                'all': self.follow_all,
+                'order_ids': sorted(self.order_ids)
+            }))
+    
+    def update_subscription(self, message_type, data):
+        order_ids = {str(order_id) for order_id in data.get('order_ids') or []}
+        
+        if message_type == 'subscribe':
+            if data.get('all'):
+                self.follow_all = True
+            elif order_ids:
+                self.follow_all = False
+            self.order_ids |= order_ids
+        elif data.get('all'):
+            self.follow_all = False
+            self.order_ids.clear()
+        else:
+            self.order_ids -= order_ids
+    
+    async def orders_event(self, event):
+        # Receive a commit's order events from the restaurant group
+        
+        for order_event in event['events']:
+            if self.follow_all or order_event['data']['id'] in self.order_ids:
+                self.dispatcher.push(order_event)
+    
+    def has_restaurant_access(self):
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated:
             return False
+        return str(user.restaurant_id) == str(self.restaurant_id)
     
     @database_sync_to_async
-    def get_order_data(self):
-        #Get current order data
-        try:
-            order = OfflineOrder.objects.get(id=self.order_id)
-            return {
-                'id': str(order.id),
-                'local_order_id': order.local_order_id,
-                'status': order.order_status,
-                'total_amount': float(order.total_amount),
-                'estimated_prep_time': order.estimated_preparation_time,
-                'created_at': order.created_at.isoformat(),
-            }
-        except OfflineOrder.DoesNotExist:
-            return None
\ No newline at end of file
+    def get_active_orders(self):
+        return active_order_board.get_orders(self.restaurant_id)
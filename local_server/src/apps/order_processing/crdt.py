@@ -0,0 +1,256 @@
+"""
+Order CRDT
+Delta-state CRDT for orders: LWW registers per field, an OR-set of items
+and per-node vector clocks
+"""
+import json
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from django.conf import settings
+
+# Order fields replicated as last-writer-wins registers
+ORDER_FIELDS = (
+    'order_status',
+    'special_instructions',
+    'table_id',
+    'estimated_preparation_time',
+    'total_amount',
+    'tax_amount',
+)
+
+# Local field name -> Supabase column (fields not listed stay local)
+SUPABASE_COLUMNS = {
+    'order_status': 'status',
+    'special_instructions': 'special_instructions',
+    'table_id': 'table_id',
+    'total_amount': 'total_amount',
+    'tax_amount': 'tax_amount',
+}
+
+
+# ----------------------------------------------------------------------
+# Vector clocks
+# ----------------------------------------------------------------------
+
+def merge_clocks(left: dict, right: dict) -> dict:
+    """Element-wise maximum of two vector clocks"""
+    merged = dict(left or {})
+    for node, counter in (right or {}).items():
+        merged[node] = max(merged.get(node, 0), counter)
+    return merged
+
+
+def compare_clocks(left: dict, right: dict) -> str:
+    """Return 'equal', 'before', 'after' or 'concurrent' for left relative to right"""
+    left = left or {}
+    right = right or {}
+    nodes = left.keys() | right.keys()
+    behind = any(left.get(node, 0) < right.get(node, 0) for node in nodes)
+    ahead = any(left.get(node, 0) > right.get(node, 0) for node in nodes)
+
+    if behind and ahead:
+        return 'concurrent'
+    if behind:
+        return 'before'
+    if ahead:
+        return 'after'
+    return 'equal'
+
+
+def _dot(tag: str) -> Tuple[str, int]:
+    node, _, counter = tag.rpartition(':')
+    return node, int(counter)
+
+
+def _seen(node: str, counter: int, clock: dict) -> bool:
+    return counter <= (clock or {}).get(node, 0)
+
+
+# ----------------------------------------------------------------------
+# State operations (pure functions on JSON-serialisable dicts)
+# ----------------------------------------------------------------------
+
+def empty_state(clock: Optional[dict] = None) -> dict:
+    """A state with no registers or items, optionally seeded with a (legacy) clock"""
+    clock = {node: counter for node, counter in (clock or {}).items() if isinstance(counter, int)}
+    return {'clock': clock, 'fields': {}, 'items': {'adds': {}, 'removes': {}}}
+
+
+def _register_key(register: dict):
+    # Total order: timestamp, then node id, then counter - every replica
+    # picks the same winner regardless of merge order
+    return register['ts'], register['node'], register['counter']
+
+
+def merge_states(left: dict, right: dict) -> dict:
+    """
+    Join two states or deltas. Commutative, associative and idempotent,
+    so deltas can be applied in any order and any number of times.
+    """
+    left = left or empty_state()
+    right = right or empty_state()
+
+    fields = dict(left.get('fields', {}))
+    for name, register in right.get('fields', {}).items():
+        current = fields.get(name)
+        if current is None or _register_key(register) > _register_key(current):
+            fields[name] = register
+
+    left_items = left.get('items', {})
+    right_items = right.get('items', {})
+    adds = {**left_items.get('adds', {}), **right_items.get('adds', {})}
+    removes = dict(left_items.get('removes', {}))
+    for tag, remove_tag in right_items.get('removes', {}).items():
+        if tag not in removes or _dot(remove_tag) > _dot(removes[tag]):
+            removes[tag] = remove_tag
+
+    return {
+        'clock': merge_clocks(left.get('clock'), right.get('clock')),
+        'fields': fields,
+        'items': {'adds': adds, 'removes': removes},
+    }
+
+
+def delta_since(state: dict, clock: dict) -> dict:
+    """The part of `state` a peer that has seen `clock` is missing"""
+    fields = {
+        name: register for name, register in state.get('fields', {}).items()
+        if not _seen(register['node'], register['counter'], clock)
+    }
+    items = state.get('items', {})
+    adds = {
+        tag: item for tag, item in items.get('adds', {}).items()
+        if not _seen(*_dot(tag), clock)
+    }
+    removes = {
+        tag: remove_tag for tag, remove_tag in items.get('removes', {}).items()
+        if not _seen(*_dot(remove_tag), clock)
+    }
+
+    return {
+        'clock': dict(state.get('clock', {})),
+        'fields': fields,
+        'items': {'adds': adds, 'removes': removes},
+    }
+
+
+def is_empty(delta: dict) -> bool:
+    items = delta.get('items', {})
+    return not (delta.get('fields') or items.get('adds') or items.get('removes'))
+
+
+def field_values(state: dict) -> dict:
+    return {name: register['value'] for name, register in state.get('fields', {}).items()}
+
+
+def item_values(state: dict) -> List[dict]:
+    """Items that were added and not removed, in a deterministic order"""
+    items = state.get('items', {})
+    removes = items.get('removes', {})
+    return [
+        item for tag, item in sorted(items.get('adds', {}).items(), key=lambda entry: _dot(entry[0]))
+        if tag not in removes
+    ]
+
+
+def supabase_updates(delta: dict, items: Optional[list] = None) -> dict:
+    """Supabase column updates for the fields (and items) changed in a delta"""
+    updates = {
+        SUPABASE_COLUMNS[name]: value
+        for name, value in field_values(delta).items() if name in SUPABASE_COLUMNS
+    }
+    delta_items = delta.get('items', {})
+    if items is not None and (delta_items.get('adds') or delta_items.get('removes')):
+        updates['items'] = items
+    return updates
+
+
+def _json_value(value):
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+class OrderCRDT:
+    """
+    Mutations on order CRDT states for one replica (node).
+
+    Every mutation takes the next counter of this node's clock entry and
+    returns (new_state, delta); the delta is itself a state and is what gets
+    shipped or merged.
+    """
+
+    def __init__(self, node_id: Optional[str] = None):
+        self._node_id = node_id
+
+    @property
+    def node_id(self) -> str:
+        return self._node_id or settings.SYNC_CONFIG.get('node_id', 'local')
+
+    def _next_dot(self, state: dict) -> Tuple[dict, int]:
+        clock = dict(state.get('clock', {}))
+        counter = clock.get(self.node_id, 0) + 1
+        clock[self.node_id] = counter
+        return clock, counter
+
+    def set_fields(self, state: dict, changes: Dict, timestamp) -> Tuple[dict, dict]:
+        """Write LWW registers for the given fields"""
+        state = state or empty_state()
+        clock, counter = self._next_dot(state)
+        ts = timestamp.isoformat() if hasattr(timestamp, 'isoformat') else str(timestamp)
+
+        delta = empty_state()
+        delta['clock'] = clock
+        for name, value in changes.items():
+            delta['fields'][name] = {
+                'value': _json_value(value),
+                'ts': ts,
+                'node': self.node_id,
+                'counter': counter,
+            }
+        return merge_states(state, delta), delta
+
+    def add_items(self, state: dict, items: Iterable[dict]) -> Tuple[dict, dict]:
+        """Add items to the OR-set, each under a unique tag"""
+        state = state or empty_state()
+        clock = dict(state.get('clock', {}))
+        delta = empty_state()
+
+        for item in items:
+            counter = clock.get(self.node_id, 0) + 1
+            clock[self.node_id] = counter
+            delta['items']['adds'][f'{self.node_id}:{counter}'] = json.loads(
+                json.dumps(item, default=str)
+            )
+
+        delta['clock'] = clock
+        return merge_states(state, delta), delta
+
+    def remove_items(self, state: dict, tags: Iterable[str]) -> Tuple[dict, dict]:
+        """Remove observed items; concurrent re-adds under new tags survive"""
+        state = state or empty_state()
+        clock, counter = self._next_dot(state)
+        remove_tag = f'{self.node_id}:{counter}'
+
+        delta = empty_state()
+        delta['clock'] = clock
+        for tag in tags:
+            if tag in state.get('items', {}).get('adds', {}):
+                delta['items']['removes'][tag] = remove_tag
+        return merge_states(state, delta), delta
+
+    def initial_state(self, order, timestamp) -> dict:
+        """CRDT state for a newly created order"""
+        state, _ = self.add_items(empty_state(), order.order_items or [])
+        state, _ = self.set_fields(
+            state,
+            {field: getattr(order, field) for field in ORDER_FIELDS},
+            timestamp
+        )
+        return state
+
+
+# CRDT instance for this node
+order_crdt = OrderCRDT()
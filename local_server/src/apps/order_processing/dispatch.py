@@ -0,0 +1,143 @@
+"""
+WebSocket Event Dispatch
+Per-connection buffering that coalesces order events and sends them in batches
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger('dineswift')
+
+
+def coalesce(pending: dict, event: dict) -> dict:
+    """Fold a newer event for the same order into the buffered one"""
+    if pending['type'] == 'order_created' and event['type'] == 'order_status':
+        # Still announce the order, in its latest status
+        data = dict(pending['data'], order_status=event['data']['status'])
+        return {'type': 'order_created', 'data': data}
+
+    if pending['type'] == 'order_status' and event['type'] == 'order_status':
+        # Report the whole move, e.g. CONFIRMED -> READY
+        data = dict(event['data'], previous_status=pending['data'].get('previous_status'))
+        return {'type': 'order_status', 'data': data}
+
+    return event
+
+
+class EventDispatcher:
+    """
+    Outbound event buffer for one WebSocket connection.
+
+    Events are held for `window` seconds and sent together; events for the
+    same order in that window collapse into its latest state. Only one send
+    is in flight at a time, so while a slow client is still receiving,
+    further updates keep coalescing instead of queueing.
+
+    Because of that coalescing the buffer size says little about a slow
+    client; it is bounded by the number of active orders. Backlog is
+    measured as the age of the oldest buffered event instead: once it
+    exceeds `max_lag` seconds (or more than `max_pending` orders are
+    buffered) the buffer is discarded and the client is resynced (a fresh
+    snapshot) rather than replayed.
+
+    With `framed` set, each flush is one {"type": "batch", "events": [...]}
+    message; otherwise the coalesced events are sent one by one.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[None]],
+                 resync: Optional[Callable[[], Awaitable[None]]] = None,
+                 window: Optional[float] = None, max_pending: Optional[int] = None,
+                 max_lag: Optional[float] = None, framed: bool = True):
+        config = settings.WEBSOCKET_CONFIG
+        self.send = send
+        self.resync = resync
+        self.window = config['batch_window_ms'] / 1000 if window is None else window
+        self.max_pending = max_pending or config['max_pending_events']
+        self.max_lag = config['max_lag_ms'] / 1000 if max_lag is None else max_lag
+        self.framed = framed
+
+        self._pending: OrderedDict = OrderedDict()
+        self._overflowed = False
+        self._pending_since = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def push(self, event: dict):
+        """Buffer an order event for the next flush"""
+        if self._closed or self._overflowed:
+            return  # A resync is already due and covers this event
+
+        if not self._pending:
+            self._pending_since = time.monotonic()
+
+        key = event['data']['id']
+        pending = self._pending.get(key)
+        self._pending[key] = coalesce(pending, event) if pending else event
+
+        if len(self._pending) > self.max_pending:
+            logger.warning(f"WebSocket client fell {len(self._pending)} orders behind, resyncing")
+            self._overflow()
+        elif self.lag > self.max_lag:
+            logger.warning(f"WebSocket client fell {self.lag:.1f}s behind, resyncing")
+            self._overflow()
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_loop())
+
+    @property
+    def lag(self) -> float:
+        """Seconds the oldest buffered event has waited to be sent"""
+        return time.monotonic() - self._pending_since if self._pending else 0.0
+
+    def _overflow(self):
+        self._pending.clear()
+        self._overflowed = True
+
+    async def _flush_loop(self):
+        try:
+            while self._pending or self._overflowed:
+                await asyncio.sleep(self.window)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"WebSocket event flush failed: {str(e)}")
+        finally:
+            self._flush_task = None
+
+    async def flush(self):
+        """Send everything buffered now"""
+        # Events that waited out a slow send are stale; a snapshot replaces them
+        overflowed = self._overflowed or self.lag > self.max_lag
+        events = list(self._pending.values())
+        self._pending.clear()
+        self._overflowed = False
+
+        if overflowed:
+            if self.resync is not None:
+                await self.resync()
+            else:
+                await self.send(json.dumps({'type': 'resync'}))
+            return
+
+        if not events:
+            return
+
+        if self.framed:
+            await self.send(json.dumps({'type': 'batch', 'events': events}, cls=DjangoJSONEncoder))
+        else:
+            for event in events:
+                await self.send(json.dumps(event, cls=DjangoJSONEncoder))
+
+    def close(self):
+        """Drop buffered events; the connection is going away"""
+        self._closed = True
+        self._pending.clear()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:17
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('order_processing', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSequence',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sync_version', models.IntegerField(default=0)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('business_date', models.DateField()),
+                ('last_value', models.IntegerField(default=0)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.restaurant')),
+            ],
+            options={
+                'db_table': 'order_sequences',
+                'unique_together': {('restaurant', 'business_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('order_processing', '0003_ordersequence'),
+        ('payment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offlineorder',
+            index=models.Index(fields=['restaurant', '-created_at', '-id'], name='offline_ord_restaur_6d0f6b_idx'),
+        ),
+    ]
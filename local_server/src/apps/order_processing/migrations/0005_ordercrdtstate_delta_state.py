@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_processing', '0004_offlineorder_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordercrdtstate',
+            name='acked_clock',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='ordercrdtstate',
+            name='state',
+            field=models.JSONField(default=dict),
+        ),
+    ]
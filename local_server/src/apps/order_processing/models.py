@@ -64,6 +64,7 @@ class OfflineOrder(TimeStampedModel):
             models.Index(fields=['restaurant', 'sync_status']),
             models.Index(fields=['local_order_id']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['restaurant', '-created_at', '-id']),  # Keyset pagination
         ]
     
     def __str__(self):
@@ -74,6 +75,8 @@ class OrderCRDTState(TimeStampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order = models.OneToOneField(OfflineOrder, on_delete=models.CASCADE)
     vector_clock = JSONField()  # {node_id: counter}
+    state = JSONField(default=dict)  # LWW field registers + OR-set of items (see crdt.py)
+    acked_clock = JSONField(default=dict)  # Clock last acknowledged by Supabase
     last_operation = models.CharField(max_length=50)
     operation_timestamp = models.DateTimeField()
     
@@ -81,4 +84,18 @@ class OrderCRDTState(TimeStampedModel):
         db_table = 'order_crdt_states'
         
     def __str__(self):
-        return f"CRDT State for {self.order.local_order_id}"
\ No newline at end of file
+        return f"CRDT State for {self.order.local_order_id}"
+
+class OrderSequence(TimeStampedModel):
+    """Durable per-restaurant, per-day counter behind local order numbers"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    business_date = models.DateField()
+    last_value = models.IntegerField(default=0)  # Highest sequence handed out
+    
+    class Meta:
+        db_table = 'order_sequences'
+        unique_together = ['restaurant', 'business_date']
+    
+    def __str__(self):
+        return f"Sequence {self.business_date} - {self.last_value}"
@@ -0,0 +1,106 @@
+"""
+Order Pagination
+Keyset (cursor) pagination on (created_at, id), newest first
+"""
+import base64
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(created_at: datetime, pk) -> str:
+    """Encode the position after a row as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor into (created_at, id); raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(pk)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(queryset, cursor: str = None, limit: int = 50):
+    """
+    Return one page of rows after `cursor` and the cursor for the next page.
+
+    `queryset` may yield model instances or values() dicts, but must
+    include created_at and id. Rows are ordered by (-created_at, -id), which
+    the (restaurant, created_at, id) index serves without a sort or count.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(last['created_at'], last['id'])
+    return rows, encode_cursor(last.created_at, last.id)
+
+
+class OrderKeysetPagination(BasePagination):
+    """DRF pagination class backed by keyset_page"""
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+
+        try:
+            rows, self.next_cursor = keyset_page(
+                queryset,
+                cursor=request.query_params.get(self.cursor_query_param),
+                limit=self.get_page_size(request)
+            )
+        except ValueError:
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+
+        return rows
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,253 @@
+"""
+Order Pricing Engine
+Parses order items once into integer minor units and prices them in one pass
+"""
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+from typing import List, Optional
+
+_MONEY_PATTERN = re.compile(r'^\s*(-?)(\d+)(?:\.(\d{0,2}))?\s*$')
+_CENT = Decimal('0.01')
+_ONE = Decimal('1')
+
+
+def to_cents(value) -> int:
+    """Convert a money value (str, int, float or Decimal) to integer cents"""
+    if isinstance(value, bool):
+        raise ValueError("Invalid money value")
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, str):
+        # Fast path for the usual '12.50' strings sent by clients
+        match = _MONEY_PATTERN.match(value)
+        if match:
+            sign, units, fraction = match.groups()
+            cents = int(units) * 100 + int((fraction or '').ljust(2, '0'))
+            return -cents if sign else cents
+    try:
+        amount = value if isinstance(value, Decimal) else Decimal(str(value))
+        return int((amount * 100).quantize(_ONE, rounding=ROUND_HALF_EVEN))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Invalid money value: {value!r}")
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convert integer cents back to a 2-place Decimal"""
+    return Decimal(cents).scaleb(-2).quantize(_CENT)
+
+
+class PricingError:
+    """A validation error for one order line, or one of its modifiers"""
+    __slots__ = ('item_index', 'field', 'message', 'modifier_index')
+
+    def __init__(self, item_index: int, field: str, message: str, modifier_index: Optional[int] = None):
+        self.item_index = item_index
+        self.field = field
+        self.message = message
+        self.modifier_index = modifier_index
+
+    def __str__(self) -> str:
+        label = f"Item {self.item_index + 1}"
+        if self.modifier_index is not None:
+            label += f" modifier {self.modifier_index + 1}"
+        return f"{label}: {self.message}"
+
+    def __repr__(self) -> str:
+        return f"PricingError({str(self)!r}, field={self.field!r})"
+
+
+class PricedLine:
+    """A single priced order line in minor units"""
+    __slots__ = (
+        'index', 'quantity', 'unit_cents', 'modifier_cents', 'modifier_prices', 'line_cents',
+        'preparation_time', 'department'
+    )
+
+    def __init__(self, index: int, quantity: int, unit_cents: int, modifier_cents: int,
+                 preparation_time: Optional[int] = None, department: Optional[str] = None,
+                 modifier_prices: Optional[List[int]] = None):
+        self.index = index
+        self.quantity = quantity
+        self.unit_cents = unit_cents
+        self.modifier_cents = modifier_cents  # Per unit
+        self.modifier_prices = modifier_prices or []  # Cents per modifier, in item order
+        self.line_cents = (unit_cents + modifier_cents) * quantity
+        self.preparation_time = preparation_time
+        self.department = department
+
+    @property
+    def line_total(self) -> Decimal:
+        return from_cents(self.line_cents)
+
+
+class PricedOrder:
+    """Result of pricing an order: per-line totals, order totals and errors"""
+    __slots__ = ('lines', 'errors', 'subtotal_cents', 'tax_cents')
+
+    def __init__(self, lines: List[PricedLine], errors: List[PricingError], subtotal_cents: int, tax_cents: int):
+        self.lines = lines
+        self.errors = errors
+        self.subtotal_cents = subtotal_cents
+        self.tax_cents = tax_cents
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.errors
+
+    @property
+    def messages(self) -> List[str]:
+        """Errors as 'Item N: message' strings"""
+        return [str(error) for error in self.errors]
+
+    def apply_prices(self, items: list) -> list:
+        """
+        Write the charged prices back onto the item dicts, so stored and
+        synced lines always add up to the order total (client prices are
+        replaced by menu prices when an index was used)
+        """
+        for line in self.lines:
+            item = items[line.index]
+            item['price'] = from_cents(line.unit_cents)
+            for modifier, cents in zip(item.get('modifiers') or [], line.modifier_prices):
+                modifier['price'] = from_cents(cents)
+        return items
+
+    @property
+    def subtotal(self) -> Decimal:
+        return from_cents(self.subtotal_cents)
+
+    @property
+    def tax_amount(self) -> Decimal:
+        return from_cents(self.tax_cents)
+
+    @property
+    def total_amount(self) -> Decimal:
+        return from_cents(self.subtotal_cents + self.tax_cents)
+
+    @property
+    def preparation_time(self) -> Optional[int]:
+        """Longest menu preparation time among the lines, if known"""
+        times = [line.preparation_time for line in self.lines if line.preparation_time]
+        return max(times) if times else None
+
+
+class PricingEngine:
+    """
+    Validates and prices order items in a single pass.
+
+    Shared by OrderCreateSerializer, OrderValidationService and
+    OrderProcessingService so an order submission is parsed only once.
+    When a menu price index is given, item and modifier prices come from the
+    menu and client-supplied prices are ignored.
+    """
+
+    def __init__(self, tax_rate=Decimal('0.08')):
+        self.tax_rate = Decimal(str(tax_rate))
+
+    def price_order(self, items: list, tax_rate=None, menu_index=None) -> PricedOrder:
+        """Validate items and compute line, subtotal and tax amounts"""
+        errors: List[PricingError] = []
+        lines: List[PricedLine] = []
+        subtotal_cents = 0
+
+        for index, item in enumerate(items or []):
+            line = self.price_line(item, index, errors, menu_index)
+            if line is not None:
+                lines.append(line)
+                subtotal_cents += line.line_cents
+
+        rate = self.tax_rate if tax_rate is None else Decimal(str(tax_rate))
+        tax_cents = self.calculate_tax_cents(subtotal_cents, rate)
+
+        return PricedOrder(lines, errors, subtotal_cents, tax_cents)
+
+    def calculate_tax_cents(self, subtotal_cents: int, tax_rate=None) -> int:
+        if subtotal_cents < 0:
+            raise ValueError("Subtotal cannot be negative")
+        rate = self.tax_rate if tax_rate is None else tax_rate
+        return int((Decimal(subtotal_cents) * rate).quantize(_ONE, rounding=ROUND_HALF_EVEN))
+
+    def price_line(self, item: dict, index: int, errors: List[PricingError],
+                   menu_index=None) -> Optional[PricedLine]:
+        """Validate and price one item, appending any errors; None if invalid"""
+        error_count = len(errors)
+
+        if not item.get('id'):
+            errors.append(PricingError(index, 'id', "Missing ID"))
+        if not item.get('name'):
+            errors.append(PricingError(index, 'name', "Missing name"))
+
+        unit_cents = 0
+        menu_entry = None
+        if menu_index is not None:
+            if item.get('id'):
+                menu_entry = menu_index.get_item(item['id'])
+                if menu_entry is None:
+                    errors.append(PricingError(index, 'id', "Not on the menu"))
+                elif not menu_entry.is_available:
+                    errors.append(PricingError(index, 'id', "Not available"))
+                else:
+                    unit_cents = menu_entry.price_cents
+        elif item.get('price') is None:
+            errors.append(PricingError(index, 'price', "Missing price"))
+        else:
+            try:
+                unit_cents = to_cents(item['price'])
+                if unit_cents < 0:
+                    errors.append(PricingError(index, 'price', "Price cannot be negative"))
+            except ValueError:
+                errors.append(PricingError(index, 'price', "Invalid price format"))
+
+        quantity = 0
+        try:
+            quantity = int(item.get('quantity', 0))
+            if quantity <= 0:
+                errors.append(PricingError(index, 'quantity', "Quantity must be positive"))
+        except (TypeError, ValueError):
+            errors.append(PricingError(index, 'quantity', "Invalid quantity format"))
+
+        modifier_prices = [
+            self.price_modifier(modifier, index, modifier_index, errors, menu_index)
+            for modifier_index, modifier in enumerate(item.get('modifiers') or [])
+        ]
+
+        if len(errors) != error_count:
+            return None
+
+        if menu_entry is not None:
+            return PricedLine(
+                index, quantity, unit_cents, sum(modifier_prices),
+                menu_entry.preparation_time, menu_entry.department, modifier_prices
+            )
+        return PricedLine(index, quantity, unit_cents, sum(modifier_prices), modifier_prices=modifier_prices)
+
+    def price_modifier(self, modifier: dict, item_index: int, modifier_index: int,
+                       errors: List[PricingError], menu_index=None) -> int:
+        """Validate one modifier, appending any errors; returns its price in cents"""
+        def error(message):
+            errors.append(PricingError(item_index, 'modifiers', message, modifier_index))
+
+        if menu_index is not None:
+            modifier_entry = menu_index.get_modifier(modifier['id']) if modifier.get('id') else None
+            if modifier_entry is None:
+                error("Not on the menu")
+            elif not modifier_entry.is_available:
+                error("Not available")
+            else:
+                return modifier_entry.price_cents
+            return 0
+
+        if not modifier.get('name'):
+            error("Missing name")
+        try:
+            price_cents = to_cents(modifier.get('price', 0))
+        except ValueError:
+            error("Invalid price format")
+            return 0
+        if price_cents < 0:
+            error("Price cannot be negative")
+        return price_cents
+
+
+# Engine instance with the default tax rate
+pricing_engine = PricingEngine()
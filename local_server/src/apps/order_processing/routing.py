@@ -7,4 +7,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/orders/(?P<order_id>[0-9a-f-]+)/$', consumers.OrderStatusConsumer.as_asgi()),
+    re_path(r'ws/restaurants/(?P<restaurant_id>[0-9a-f-]+)/orders/$', consumers.RestaurantOrdersConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Order Sequence Allocator
+Hands out per-restaurant, per-day order sequence numbers without table scans
+"""
+import logging
+import threading
+from datetime import date
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OrderSequence
+
+logger = logging.getLogger('dineswift')
+
+
+class OrderSequenceAllocator:
+    """
+    Allocates order sequence numbers from pre-reserved ranges.
+
+    Each worker process reserves a block of numbers at a time and serves
+    them from memory, so allocating an order number is O(1). Blocks come
+    from an atomic cache INCRBY (Redis in production) when available, and
+    from the OrderSequence counter row otherwise. The counter row always
+    holds the durable high-water mark, so a cache flush never reissues a
+    number. Unused numbers in a block are lost on restart, which leaves
+    gaps but never duplicates.
+    """
+
+    def __init__(self):
+        config = settings.ORDER_SEQUENCE_CONFIG
+        self.block_size = max(int(config.get('block_size', 20)), 1)
+        self.use_cache = config.get('use_cache', True)
+        self.cache_timeout = 2 * 86400  # Keys outlive their business day
+        self._blocks: Dict[Tuple[str, date], list] = {}
+        self._lock = threading.Lock()
+
+    def next_value(self, restaurant_id, business_date: date = None) -> int:
+        """Return the next sequence number for a restaurant and day"""
+        return self.next_values(restaurant_id, 1, business_date)[0]
+
+    def next_values(self, restaurant_id, count: int, business_date: date = None) -> list:
+        """Return `count` sequence numbers for a restaurant and day"""
+        business_date = business_date or timezone.now().date()
+        key = (str(restaurant_id), business_date)
+
+        # Inside a caller's transaction a reserved block could be rolled back
+        # underneath us, so take exactly what is needed and keep nothing.
+        if connection.in_atomic_block:
+            high = self._reserve(key, count)
+            return list(range(high - count + 1, high + 1))
+
+        with self._lock:
+            values = []
+            while len(values) < count:
+                block = self._blocks.get(key)
+                if block is None or block[0] > block[1]:
+                    size = max(self.block_size, count - len(values))
+                    high = self._reserve(key, size)
+                    block = [high - size + 1, high]
+                    self._drop_stale_blocks(business_date)
+                    self._blocks[key] = block
+
+                take = min(block[1] - block[0] + 1, count - len(values))
+                values.extend(range(block[0], block[0] + take))
+                block[0] += take
+
+            return values
+
+    def reset(self):
+        """Forget all locally reserved blocks"""
+        with self._lock:
+            self._blocks.clear()
+
+    def _reserve(self, key: Tuple[str, date], count: int) -> int:
+        """Reserve `count` numbers and return the highest one"""
+        if self.use_cache:
+            high = self._reserve_from_cache(key, count)
+            if high is not None:
+                return high
+        return self._reserve_from_database(key, count)
+
+    def _reserve_from_cache(self, key: Tuple[str, date], count: int):
+        """Reserve a block with an atomic cache increment"""
+        restaurant_id, business_date = key
+        cache_key = f"order_seq_{restaurant_id}_{business_date.isoformat()}"
+
+        try:
+            if cache.get(cache_key) is None:
+                # Seed from the durable high-water mark; add() is a no-op
+                # if another worker seeded the key first.
+                cache.add(cache_key, self._get_counter(key).last_value, self.cache_timeout)
+            high = cache.incr(cache_key, count)
+        except Exception as e:
+            logger.debug(f"Order sequence cache unavailable: {str(e)}")
+            return None
+
+        if not self._advance_high_water(key, cache_key, high):
+            return None
+        return high
+
+    def _advance_high_water(self, key: Tuple[str, date], cache_key: str, high: int) -> bool:
+        """Record a cache-issued block in the counter row; False if it is unsafe to use"""
+        restaurant_id, business_date = key
+        counter = OrderSequence.objects.filter(restaurant_id=restaurant_id, business_date=business_date)
+
+        if counter.filter(last_value__lt=high).update(last_value=high):
+            return True
+
+        # Concurrent increments can finish out of order, so a worker holding a
+        # later block may already have moved the row past this one. That is
+        # only a conflict when the row is ahead of the cache itself, i.e. the
+        # database path issued numbers while the cache was unreachable.
+        stored = counter.values_list('last_value', flat=True).first() or 0
+        try:
+            current = cache.get(cache_key)
+        except Exception:
+            current = None
+
+        if current is not None and high < stored <= current:
+            return True
+
+        logger.warning(f"Order sequence cache behind database for restaurant {restaurant_id}, reseeding")
+        try:
+            if current is not None and stored > current:
+                # Move the counter up instead of deleting it under other workers
+                cache.incr(cache_key, stored - current)
+        except Exception:
+            pass
+        return False
+
+    def _reserve_from_database(self, key: Tuple[str, date], count: int) -> int:
+        """Reserve a block by bumping the locked counter row"""
+        restaurant_id, business_date = key
+
+        with transaction.atomic():
+            self._get_counter(key)
+            counter = OrderSequence.objects.select_for_update().get(
+                restaurant_id=restaurant_id,
+                business_date=business_date
+            )
+            counter.last_value += count
+            counter.save(update_fields=['last_value', 'updated_at'])
+            return counter.last_value
+
+    def _get_counter(self, key: Tuple[str, date]) -> OrderSequence:
+        restaurant_id, business_date = key
+        counter, _ = OrderSequence.objects.get_or_create(
+            restaurant_id=restaurant_id,
+            business_date=business_date
+        )
+        return counter
+
+    def _drop_stale_blocks(self, business_date: date):
+        """Discard blocks left over from previous business days"""
+        for stale_key in [k for k in self._blocks if k[1] < business_date]:
+            del self._blocks[stale_key]
+
+
+# Allocator instance (one per worker process)
+order_sequence_allocator = OrderSequenceAllocator()
@@ -1,13 +1,17 @@
 from rest_framework import serializers
-from decimal import Decimal
 from .models import OfflineOrder, OrderCRDTState
+from .pricing import pricing_engine
+from apps.menu_cache.price_index import menu_price_index
+from .state_machine import order_state_machine
 
 class OrderItemSerializer(serializers.Serializer):
     """Serializer for individual order items"""
     id = serializers.UUIDField()
     name = serializers.CharField()
     quantity = serializers.IntegerField(min_value=1)
-    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    # Optional: taken from the menu when a price index is loaded, and
+    # reported as missing by the pricing engine when not
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     special_instructions = serializers.CharField(required=False, allow_blank=True)
     modifiers = serializers.ListField(
@@ -15,13 +19,6 @@ class OrderItemSerializer(serializers.Serializer):
         required=False,
         default=list
     )
-    
-    def validate(self, attrs):
-        # Calculate total price
-        quantity = attrs['quantity']
-        price = attrs['price']
-        attrs['total_price'] = Decimal(quantity) * price
-        return attrs
 
 # In your serializer.py, update the OrderCreateSerializer:
 class OrderCreateSerializer(serializers.Serializer):
@@ -42,8 +39,32 @@ class OrderCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError({
                 'customer_phone': 'Phone number is required for Momo payments'
             })
+        
+        # Price the whole order once; the service creates the order from this result
+        priced = pricing_engine.price_order(
+            attrs['items'],
+            menu_index=menu_price_index.get(self.context.get('restaurant_id'))
+        )
+        if not priced.is_valid:
+            item_errors = [{} for _ in attrs['items']]
+            for error in priced.errors:
+                errors = item_errors[error.item_index]
+                if error.modifier_index is None:
+                    errors.setdefault(error.field, []).append(error.message)
+                else:
+                    errors.setdefault(error.field, {}).setdefault(error.modifier_index, []).append(error.message)
+            raise serializers.ValidationError({'items': item_errors})
+        
+        priced.apply_prices(attrs['items'])
+        for line in priced.lines:
+            attrs['items'][line.index]['total_price'] = line.line_total
+        attrs['priced'] = priced
         return attrs
 
+class OrderBulkCreateSerializer(serializers.Serializer):
+    """Serializer for replaying a batch of orders in one request"""
+    orders = OrderCreateSerializer(many=True, min_length=1, max_length=200)
+
 class OrderSerializer(serializers.ModelSerializer):
     """Serializer for order details"""
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
@@ -69,6 +90,18 @@ class OrderSerializer(serializers.ModelSerializer):
         """Serialize order items with additional details"""
         return OrderItemSerializer(obj.order_items, many=True).data
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """Serializer for order list rows, built from ORDER_SUMMARY_FIELDS"""
+    status_display = serializers.CharField(source='get_order_status_display', read_only=True)
+    sync_status_display = serializers.CharField(source='get_sync_status_display', read_only=True)
+    
+    class Meta:
+        model = OfflineOrder
+        fields = [
+            'id', 'local_order_id', 'table_id', 'total_amount', 'order_status',
+            'status_display', 'sync_status', 'sync_status_display', 'created_at'
+        ]
+
 class OrderStatusUpdateSerializer(serializers.Serializer):
     """Serializer for updating order status"""
     status = serializers.ChoiceField(choices=OfflineOrder.STATUS_CHOICES)
@@ -78,22 +111,23 @@ class OrderStatusUpdateSerializer(serializers.Serializer):
         # Add business logic for status transitions
         current_status = self.instance.order_status if self.instance else None
         
-        valid_transitions = {
-            'PENDING': ['CONFIRMED', 'CANCELLED'],
-            'CONFIRMED': ['PREPARING', 'CANCELLED'],
-            'PREPARING': ['READY', 'CANCELLED'],
-            'READY': ['COMPLETED'],
-            'COMPLETED': [],  # Final state
-            'CANCELLED': [],  # Final state
-        }
-        
-        if current_status and value not in valid_transitions.get(current_status, []):
+        if current_status and not order_state_machine.is_valid_transition(current_status, value):
             raise serializers.ValidationError(
                 f"Cannot transition from {current_status} to {value}"
             )
         
         return value
 
+class OrderBulkStatusUpdateSerializer(serializers.Serializer):
+    """Serializer for moving many orders to the same status"""
+    order_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        min_length=1,
+        max_length=200
+    )
+    status = serializers.ChoiceField(choices=OfflineOrder.STATUS_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
 class OrderWithPaymentSerializer(serializers.Serializer):
     """Combined order and payment data"""
     order = OrderSerializer()
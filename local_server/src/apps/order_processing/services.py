@@ -1,16 +1,46 @@
+import json
 import logging
+import warnings
 from decimal import Decimal
+from typing import Optional, Tuple
 from datetime import datetime
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django.db import transaction
 
 from apps.order_processing.models import OfflineOrder, OrderCRDTState
+from apps.order_processing.board import active_order_board
+from apps.order_processing.broadcast import order_broadcaster
+from apps.order_processing.crdt import field_values, item_values, merge_states, order_crdt
+from apps.order_processing.pagination import keyset_page
+from apps.order_processing.pricing import pricing_engine, PricedOrder
+from apps.menu_cache.price_index import menu_price_index
+from apps.sync_manager.coalescing import order_coalesce_key
+from apps.order_processing.sequences import order_sequence_allocator
+from apps.order_processing.state_machine import order_state_machine
 from apps.core.models import SyncQueue, Restaurant
 from apps.otp_service.services import OTPService
 from apps.payment.services import PaymentService
 
 logger = logging.getLogger('dineswift')
 
+# Columns needed for order list views and exports
+ORDER_SUMMARY_FIELDS = (
+    'id', 'local_order_id', 'table_id', 'total_amount',
+    'order_status', 'sync_status', 'created_at'
+)
+
+
+def json_safe(order_data):
+    """Validated serializer data (UUIDs, Decimals) as plain JSON values for storage"""
+    return json.loads(json.dumps(order_data, cls=DjangoJSONEncoder))
+
+
+def split_priced(order_data: dict) -> Tuple[dict, Optional[PricedOrder]]:
+    """Order data ready for storage, and the pricing done by the serializer if any"""
+    priced = order_data.get('priced')
+    return json_safe({key: value for key, value in order_data.items() if key != 'priced'}), priced
+
 class OrderProcessingService:
     def __init__(self):
         self.otp_service = OTPService()
@@ -20,6 +50,7 @@ class OrderProcessingService:
         """Create an offline order with full validation and processing"""
         try:
             # Validate input
+            order_data, priced = split_priced(order_data)
             if not order_data.get('items'):
                 return {
                     'success': False,
@@ -35,15 +66,26 @@ class OrderProcessingService:
                     'error': 'Restaurant not found'
                 }
             
+            # Validate and price against the active menu in a single pass,
+            # unless the serializer already did
+            if priced is None:
+                priced = self.price_order(order_data['items'], restaurant.id)
+            if not priced.is_valid:
+                return {
+                    'success': False,
+                    'error': 'Order validation failed',
+                    'details': '; '.join(priced.messages)
+                }
+            # Lines carry the prices actually charged
+            order_data['items'] = json_safe(priced.apply_prices(order_data['items']))
+            total_amount = priced.total_amount
+            tax_amount = priced.tax_amount
+            
+            # Generate local order ID outside the order transaction so the
+            # allocator can serve it from a pre-reserved block
+            local_order_id = self.generate_local_order_id(restaurant)
+            
             with transaction.atomic():
-                # Calculate totals
-                subtotal = self.calculate_subtotal(order_data['items'])
-                tax_amount = self.calculate_tax(subtotal)
-                total_amount = subtotal + tax_amount
-                                
-                # Generate local order ID
-                local_order_id = self.generate_local_order_id(restaurant)
-                
                 # Create order
                 order = OfflineOrder.objects.create(
                     restaurant=restaurant,
@@ -54,7 +96,9 @@ class OrderProcessingService:
                     table_id=order_data.get('table_id'),
                     customer_id=order_data.get('customer_id'),
                     special_instructions=order_data.get('special_instructions', ''),
-                    estimated_preparation_time=order_data.get('estimated_preparation_time'),
+                    estimated_preparation_time=(
+                        order_data.get('estimated_preparation_time') or priced.preparation_time
+                    ),
                     order_status='PENDING',
                     sync_status='PENDING_SYNC'
                 )
@@ -63,17 +107,21 @@ class OrderProcessingService:
                 otp_code = self.otp_service.generate_otp(order_id=str(order.id))
                 
                 # Create CRDT state for conflict resolution
+                current_time = timezone.now()
+                crdt_state = order_crdt.initial_state(order, current_time)
                 OrderCRDTState.objects.create(
                     order=order,
-                    vector_clock={'local': 1, 'cloud': 0},
+                    vector_clock=crdt_state['clock'],
+                    state=crdt_state,
                     last_operation='ORDER_CREATE',
-                    operation_timestamp=timezone.now()
+                    operation_timestamp=current_time
                 )
                 
                 # Create sync queue entry
                 SyncQueue.objects.create(
                     restaurant=restaurant,
                     sync_type='ORDER_CREATE',
+                    coalesce_key=order_coalesce_key(order.id),
                     payload={
                         'local_order_id': str(order.id),
                         'order_data': {
@@ -85,6 +133,10 @@ class OrderProcessingService:
                     }
                 )
                 
+                # Put the order on the kitchen/waiter board and screens once committed
+                active_order_board.on_commit_upsert(restaurant.id, [order])
+                order_broadcaster.on_commit_created(restaurant.id, [order])
+                
                 logger.info(f"Order created successfully: {local_order_id} for restaurant {restaurant_id}")
                 
                 return {
@@ -104,6 +156,146 @@ class OrderProcessingService:
                 'details': str(e)
             }
     
+    def create_offline_orders_bulk(self, restaurant_id: str, orders_data: list) -> dict:
+        """Create a batch of offline orders in one transaction
+        
+        Used by tablets replaying orders after an outage. Every order is
+        validated and priced first; valid orders are then written with one
+        bulk insert per table. Results are returned in input order.
+        """
+        try:
+            try:
+                restaurant = Restaurant.objects.get(id=restaurant_id)
+            except Restaurant.DoesNotExist:
+                return {
+                    'success': False,
+                    'error': 'Restaurant not found'
+                }
+            
+            results = [None] * len(orders_data)
+            valid = []
+            
+            # Validate and price the whole batch before touching the database
+            for index, order_data in enumerate(orders_data):
+                order_data, priced = split_priced(order_data)
+                if not order_data.get('items'):
+                    results[index] = {
+                        'index': index,
+                        'success': False,
+                        'error': 'Order must contain at least one item'
+                    }
+                    continue
+                
+                if priced is None:
+                    priced = self.price_order(order_data['items'], restaurant.id)
+                if not priced.is_valid:
+                    results[index] = {
+                        'index': index,
+                        'success': False,
+                        'error': 'Order validation failed',
+                        'details': '; '.join(priced.messages)
+                    }
+                    continue
+                
+                order_data['items'] = json_safe(priced.apply_prices(order_data['items']))
+                valid.append((index, order_data, priced))
+            
+            if valid:
+                local_order_ids = self.generate_local_order_ids(restaurant, len(valid))
+                current_time = timezone.now()
+                
+                orders = [
+                    OfflineOrder(
+                        restaurant=restaurant,
+                        local_order_id=local_order_id,
+                        order_items=order_data['items'],
+                        total_amount=priced.total_amount,
+                        tax_amount=priced.tax_amount,
+                        table_id=order_data.get('table_id'),
+                        customer_id=order_data.get('customer_id'),
+                        special_instructions=order_data.get('special_instructions', ''),
+                        estimated_preparation_time=(
+                            order_data.get('estimated_preparation_time') or priced.preparation_time
+                        ),
+                        order_status='PENDING',
+                        sync_status='PENDING_SYNC'
+                    )
+                    for local_order_id, (index, order_data, priced)
+                    in zip(local_order_ids, valid)
+                ]
+                
+                with transaction.atomic():
+                    OfflineOrder.objects.bulk_create(orders)
+                    
+                    otps = self.otp_service.generate_otps_bulk([str(order.id) for order in orders])
+                    
+                    crdt_states = [order_crdt.initial_state(order, current_time) for order in orders]
+                    OrderCRDTState.objects.bulk_create([
+                        OrderCRDTState(
+                            order=order,
+                            vector_clock=crdt_state['clock'],
+                            state=crdt_state,
+                            last_operation='ORDER_CREATE',
+                            operation_timestamp=current_time
+                        )
+                        for order, crdt_state in zip(orders, crdt_states)
+                    ])
+                    
+                    SyncQueue.objects.bulk_create([
+                        SyncQueue(
+                            restaurant=restaurant,
+                            sync_type='ORDER_CREATE',
+                            coalesce_key=order_coalesce_key(order.id),
+                            payload={
+                                'local_order_id': str(order.id),
+                                'order_data': {
+                                    'items': order_data['items'],
+                                    'table_id': order_data.get('table_id'),
+                                    'total_amount': float(order.total_amount),
+                                    'tax_amount': float(order.tax_amount)
+                                }
+                            }
+                        )
+                        for order, (index, order_data, _) in zip(orders, valid)
+                    ])
+                    
+                    active_order_board.on_commit_upsert(restaurant.id, orders)
+                    order_broadcaster.on_commit_created(restaurant.id, orders)
+                
+                for order, (index, _, _) in zip(orders, valid):
+                    results[index] = {
+                        'index': index,
+                        'success': True,
+                        'order_id': str(order.id),
+                        'local_order_id': order.local_order_id,
+                        'otp_code': otps[str(order.id)],
+                        'total_amount': order.total_amount,
+                        'tax_amount': order.tax_amount
+                    }
+            
+            created_count = len(valid)
+            failed_count = len(orders_data) - created_count
+            
+            logger.info(
+                f"Bulk order ingestion for restaurant {restaurant_id}: "
+                f"{created_count} created, {failed_count} rejected"
+            )
+            
+            return {
+                'success': created_count > 0,
+                'created': created_count,
+                'failed': failed_count,
+                'results': results
+            }
+            
+        except Exception as e:
+            logger.error(f"Bulk order creation failed: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'error': 'Bulk order creation failed',
+                'details': str(e)
+            }
+    
     def update_order_status(self, order_id: str, new_status: str, notes: str = '') -> bool:
         """Update order status with validation and audit trail"""
         try:
@@ -124,44 +316,13 @@ class OrderProcessingService:
                 
                 # Set timestamps based on status
                 current_time = timezone.now()
-                if new_status == 'PREPARING' and not order.preparation_started_at:
-                    order.preparation_started_at = current_time
-                elif new_status == 'COMPLETED' and not order.completed_at:
-                    order.completed_at = current_time
-                    # Calculate actual preparation time
-                    if order.preparation_started_at:
-                        prep_time = (current_time - order.preparation_started_at).total_seconds() / 60
-                        order.actual_preparation_time = int(prep_time)
+                order_state_machine.apply_entry_effects(order, new_status, current_time)
                 
                 order.save()
                 
-                # Update CRDT state
-                try:
-                    crdt_state = OrderCRDTState.objects.get(order=order)
-                    crdt_state.vector_clock['local'] = crdt_state.vector_clock.get('local', 0) + 1
-                    crdt_state.last_operation = 'STATUS_UPDATE'
-                    crdt_state.operation_timestamp = current_time
-                    crdt_state.save()
-                except OrderCRDTState.DoesNotExist:
-                    # Create CRDT state if it doesn't exist
-                    OrderCRDTState.objects.create(
-                        order=order,
-                        vector_clock={'local': 1, 'cloud': 0},
-                        last_operation='STATUS_UPDATE',
-                        operation_timestamp=current_time
-                    )
-                
-                # Create sync queue entry
-                SyncQueue.objects.create(
-                    restaurant=order.restaurant,
-                    sync_type='ORDER_UPDATE',
-                    payload={
-                        'local_order_id': str(order.id),
-                        'previous_status': previous_status,
-                        'new_status': new_status,
-                        'notes': notes,
-                        'timestamp': current_time.isoformat()
-                    }
+                # Update CRDT state and queue the change for sync
+                order_state_machine.run_hooks(
+                    [(order, previous_status)], new_status, notes, current_time
                 )
                 
                 logger.info(
@@ -178,43 +339,45 @@ class OrderProcessingService:
             logger.error(f"Status update failed for order {order_id}: {str(e)}", exc_info=True)
             return False
     
-    def calculate_subtotal(self, items: list) -> Decimal:
-        """Calculate order subtotal including modifiers"""
-        subtotal = Decimal('0.00')
-        
-        for item in items:
-            # Validate required fields
-            if 'price' not in item or 'quantity' not in item:
-                raise ValueError("Item missing price or quantity")
-            
-            price = Decimal(str(item['price']))
-            quantity = int(item['quantity'])
-            
-            # Validate positive values
-            if price < Decimal('0.00'):
-                raise ValueError(f"Invalid price for item: {item.get('name', 'Unknown')}")
-            if quantity <= 0:
-                raise ValueError(f"Invalid quantity for item: {item.get('name', 'Unknown')}")
-            
-            item_total = price * quantity
-            subtotal += item_total
+    def update_orders_status_bulk(self, order_ids: list, new_status: str, notes: str = '',
+                                  restaurant_id: str = None) -> dict:
+        """Update many orders (e.g. a whole KDS ticket) with one conditional UPDATE"""
+        try:
+            result = order_state_machine.apply_transitions(
+                order_ids, new_status, notes=notes, restaurant_id=restaurant_id
+            )
+            return {'success': True, **result}
             
-            # Add modifiers if any
-            for modifier in item.get('modifiers', []):
-                modifier_price = Decimal(str(modifier.get('price', '0.00')))
-                if modifier_price < Decimal('0.00'):
-                    raise ValueError(f"Invalid modifier price for {modifier.get('name', 'Unknown')}")
-                subtotal += modifier_price * quantity
+        except Exception as e:
+            logger.error(f"Bulk status update failed: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'error': 'Bulk status update failed'
+            }
+    
+    def price_order(self, items: list, restaurant_id=None) -> PricedOrder:
+        """Validate and price order items in one pass
         
-        return subtotal.quantize(Decimal('0.01'))
+        Items are priced from the restaurant's menu price index when a menu
+        is cached locally; client prices are only used when none is.
+        """
+        menu_index = menu_price_index.get(restaurant_id)
+        if menu_index is None and restaurant_id:
+            logger.debug(f"No cached menu for restaurant {restaurant_id}, using submitted prices")
+        return pricing_engine.price_order(items, menu_index=menu_index)
+    
+    def calculate_subtotal(self, items: list) -> Decimal:
+        """Calculate order subtotal including modifiers"""
+        priced = self.price_order(items)
+        if not priced.is_valid:
+            raise ValueError(priced.messages[0])
+        return priced.subtotal
     
     def calculate_tax(self, subtotal: Decimal, tax_rate: float = 0.08) -> Decimal:
         """Calculate tax amount with configurable tax rate"""
-        if subtotal < Decimal('0.00'):
-            raise ValueError("Subtotal cannot be negative")
-        
-        tax_amount = subtotal * Decimal(str(tax_rate))
-        return tax_amount.quantize(Decimal('0.01'))
+        subtotal_cents = int(Decimal(str(subtotal)).scaleb(2).to_integral_value())
+        tax_cents = pricing_engine.calculate_tax_cents(subtotal_cents, Decimal(str(tax_rate)))
+        return Decimal(tax_cents).scaleb(-2).quantize(Decimal('0.01'))
     
     def generate_local_order_id(self, restaurant: Restaurant) -> str:
         """Generate unique local order ID with restaurant prefix"""
@@ -226,30 +389,22 @@ class OrderProcessingService:
         # Get current timestamp
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
         
-        # Get sequence number for today
-        today = timezone.now().date()
-        today_orders_count = OfflineOrder.objects.filter(
-            restaurant=restaurant,
-            created_at__date=today
-        ).count()
-        
-        sequence = today_orders_count + 1
+        # Get sequence number for today from the per-restaurant allocator
+        sequence = order_sequence_allocator.next_value(restaurant.id)
         
         return f"{prefix}-{timestamp}-{sequence:04d}"
     
+    def generate_local_order_ids(self, restaurant: Restaurant, count: int) -> list:
+        """Generate several local order IDs with one sequence reservation"""
+        prefix = restaurant.name[:3].upper() if restaurant.name else 'ORD'
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        sequences = order_sequence_allocator.next_values(restaurant.id, count)
+        
+        return [f"{prefix}-{timestamp}-{sequence:04d}" for sequence in sequences]
+    
     def is_valid_status_transition(self, current_status: str, new_status: str) -> bool:
         """Validate order status transition with business rules"""
-        valid_transitions = {
-            'PENDING': ['CONFIRMED', 'CANCELLED', 'PAYMENT_FAILED'],
-            'CONFIRMED': ['PREPARING', 'CANCELLED'],
-            'PREPARING': ['READY', 'CANCELLED'],
-            'READY': ['COMPLETED'],
-            'COMPLETED': [],  # Final state
-            'CANCELLED': [],  # Final state
-            'PAYMENT_FAILED': ['CANCELLED']
-        }
-        
-        return new_status in valid_transitions.get(current_status, [])
+        return order_state_machine.is_valid_transition(current_status, new_status)
     
     def get_order_details(self, order_id: str) -> dict:
         """Get complete order details with related data"""
@@ -303,31 +458,25 @@ class OrderProcessingService:
             logger.error(f"Order cancellation failed: {str(e)}", exc_info=True)
             return False
     
-    def get_restaurant_orders(self, restaurant_id: str, status: str = None) -> dict:
-        """Get all orders for a restaurant with optional status filter"""
+    def get_restaurant_orders(self, restaurant_id: str, status: str = None,
+                              cursor: str = None, limit: int = 50) -> dict:
+        """Get one page of a restaurant's orders, newest first
+        
+        Uses keyset pagination on (created_at, id); pass the returned
+        next_cursor to fetch the following page.
+        """
         try:
-            queryset = OfflineOrder.objects.filter(restaurant_id=restaurant_id)
-            
-            if status:
-                queryset = queryset.filter(order_status=status)
-            
-            orders = queryset.order_by('-created_at')
+            rows, next_cursor = keyset_page(
+                self._restaurant_orders_queryset(restaurant_id, status),
+                cursor=cursor,
+                limit=limit
+            )
             
             return {
                 'success': True,
-                'orders': [
-                    {
-                        'id': str(order.id),
-                        'local_order_id': order.local_order_id,
-                        'table_id': str(order.table_id) if order.table_id else None,
-                        'total_amount': float(order.total_amount),
-                        'order_status': order.order_status,
-                        'sync_status': order.sync_status,
-                        'created_at': order.created_at.isoformat()
-                    }
-                    for order in orders
-                ],
-                'count': orders.count()
+                'orders': [self._order_summary(row) for row in rows],
+                'count': len(rows),
+                'next_cursor': next_cursor
             }
             
         except Exception as e:
@@ -337,6 +486,29 @@ class OrderProcessingService:
                 'error': 'Failed to retrieve orders'
             }
     
+    def iter_restaurant_orders(self, restaurant_id: str, status: str = None, chunk_size: int = 500):
+        """Stream all of a restaurant's orders as summary dicts, newest first"""
+        queryset = self._restaurant_orders_queryset(restaurant_id, status).order_by('-created_at', '-id')
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield self._order_summary(row)
+    
+    def _restaurant_orders_queryset(self, restaurant_id: str, status: str = None):
+        queryset = OfflineOrder.objects.filter(restaurant_id=restaurant_id)
+        if status:
+            queryset = queryset.filter(order_status=status)
+        return queryset.values(*ORDER_SUMMARY_FIELDS)
+    
+    def _order_summary(self, row: dict) -> dict:
+        return {
+            'id': str(row['id']),
+            'local_order_id': row['local_order_id'],
+            'table_id': str(row['table_id']) if row['table_id'] else None,
+            'total_amount': float(row['total_amount']),
+            'order_status': row['order_status'],
+            'sync_status': row['sync_status'],
+            'created_at': row['created_at'].isoformat()
+        }
+    
     def create_order_with_payment(self, restaurant_id: str, order_data: dict) -> dict:
         """Complete order flow with payment integration"""
         try:
@@ -406,6 +578,18 @@ class ConflictResolutionService:
     
     def resolve_order_conflict(self, local_order: dict, remote_order: dict) -> dict:
         """Resolve conflicts between local and remote order versions"""
+        # Versions carrying CRDT state merge deterministically, field by field
+        if local_order.get('crdt') and remote_order.get('crdt'):
+            merged = merge_states(local_order['crdt'], remote_order['crdt'])
+            return {
+                **remote_order,
+                **local_order,
+                **field_values(merged),
+                'items': item_values(merged),
+                'crdt': merged,
+                'vector_clock': merged['clock'],
+            }
+        
         try:
             # Compare timestamps - most recent wins for most fields
             local_time = local_order.get('last_updated')
@@ -464,9 +648,7 @@ class OrderValidationService:
         if not order_data.get('items'):
             errors.append("Order must contain at least one item")
         else:
-            for i, item in enumerate(order_data['items']):
-                item_errors = self.validate_order_item(item, i)
-                errors.extend(item_errors)
+            errors.extend(pricing_engine.price_order(order_data['items']).messages)
         
         # Validate payment method if specified
         payment_method = order_data.get('payment_method')
@@ -481,46 +663,19 @@ class OrderValidationService:
     def validate_order_item(self, item: dict, index: int) -> list:
         """Validate individual order item"""
         errors = []
-        
-        if not item.get('id'):
-            errors.append(f"Item {index + 1}: Missing ID")
-        
-        if not item.get('name'):
-            errors.append(f"Item {index + 1}: Missing name")
-        
-        try:
-            price = Decimal(str(item.get('price', 0)))
-            if price < Decimal('0.00'):
-                errors.append(f"Item {index + 1}: Price cannot be negative")
-        except (TypeError, ValueError):
-            errors.append(f"Item {index + 1}: Invalid price format")
-        
-        try:
-            quantity = int(item.get('quantity', 0))
-            if quantity <= 0:
-                errors.append(f"Item {index + 1}: Quantity must be positive")
-        except (TypeError, ValueError):
-            errors.append(f"Item {index + 1}: Invalid quantity format")
-        
-        # Validate modifiers
-        for j, modifier in enumerate(item.get('modifiers', [])):
-            modifier_errors = self.validate_modifier(modifier, index, j)
-            errors.extend(modifier_errors)
-        
-        return errors
+        pricing_engine.price_line(item, index, errors)
+        return [str(error) for error in errors]
     
     def validate_modifier(self, modifier: dict, item_index: int, modifier_index: int) -> list:
-        """Validate item modifier"""
-        errors = []
-        
-        if not modifier.get('name'):
-            errors.append(f"Item {item_index + 1} modifier {modifier_index + 1}: Missing name")
+        """Validate item modifier
         
-        try:
-            price = Decimal(str(modifier.get('price', 0)))
-            if price < Decimal('0.00'):
-                errors.append(f"Item {item_index + 1} modifier {modifier_index + 1}: Price cannot be negative")
-        except (TypeError, ValueError):
-            errors.append(f"Item {item_index + 1} modifier {modifier_index + 1}: Invalid price format")
-        
-        return errors
\ No newline at end of file
+        Deprecated: modifiers are validated with their item by validate_order_item.
+        """
+        warnings.warn(
+            "OrderValidationService.validate_modifier is deprecated; use validate_order_item",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        errors = []
+        pricing_engine.price_modifier(modifier, item_index, modifier_index, errors)
+        return [str(error) for error in errors]
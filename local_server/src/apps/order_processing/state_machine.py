@@ -0,0 +1,262 @@
+"""
+Order State Machine
+Single, precompiled source of truth for order status transitions
+"""
+import logging
+from enum import Enum
+from types import MappingProxyType
+from typing import Callable, FrozenSet, List, Mapping, Optional
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.sync_manager.coalescing import sync_coalescer
+from .crdt import delta_since, empty_state, order_crdt
+from .models import OfflineOrder, OrderCRDTState
+
+logger = logging.getLogger('dineswift')
+
+
+class OrderStatus(str, Enum):
+    PENDING = 'PENDING'
+    CONFIRMED = 'CONFIRMED'
+    PREPARING = 'PREPARING'
+    READY = 'READY'
+    COMPLETED = 'COMPLETED'
+    CANCELLED = 'CANCELLED'
+    PAYMENT_FAILED = 'PAYMENT_FAILED'
+
+
+# Frozen transition table, built once at import time
+TRANSITIONS: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    OrderStatus.PENDING.value: frozenset({
+        OrderStatus.CONFIRMED.value, OrderStatus.CANCELLED.value, OrderStatus.PAYMENT_FAILED.value
+    }),
+    OrderStatus.CONFIRMED.value: frozenset({OrderStatus.PREPARING.value, OrderStatus.CANCELLED.value}),
+    OrderStatus.PREPARING.value: frozenset({OrderStatus.READY.value, OrderStatus.CANCELLED.value}),
+    OrderStatus.READY.value: frozenset({OrderStatus.COMPLETED.value}),
+    OrderStatus.COMPLETED.value: frozenset(),  # Final state
+    OrderStatus.CANCELLED.value: frozenset(),  # Final state
+    OrderStatus.PAYMENT_FAILED.value: frozenset({OrderStatus.CANCELLED.value}),
+})
+
+# Reverse index: statuses an order may be in to move to a given status
+SOURCES: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    target: frozenset(source for source, targets in TRANSITIONS.items() if target in targets)
+    for target in TRANSITIONS
+})
+
+TERMINAL_STATUSES: FrozenSet[str] = frozenset(
+    source for source, targets in TRANSITIONS.items() if not targets
+)
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+# Post-transition hook signature: hook(transitions, new_status, notes, current_time)
+# where transitions is a list of (order, previous_status) pairs.
+TransitionHook = Callable[[list, str, str, object], None]
+
+
+class OrderStateMachine:
+    """
+    Validates order status transitions and applies their side effects.
+
+    Field side effects (timestamps) are applied on entry to a status, both
+    to single instances and as expressions in bulk UPDATEs. Post-transition
+    hooks (CRDT bookkeeping, sync queue rows) run once per batch inside the
+    same transaction as the status change.
+    """
+
+    def __init__(self):
+        self._hooks: List[TransitionHook] = []
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+
+    def is_valid_transition(self, current_status: Optional[str], new_status: str) -> bool:
+        return new_status in TRANSITIONS.get(current_status, _EMPTY)
+
+    def allowed_sources(self, new_status: str) -> FrozenSet[str]:
+        return SOURCES.get(new_status, _EMPTY)
+
+    # ------------------------------------------------------------------
+    # Hooks
+    # ------------------------------------------------------------------
+
+    def register_hook(self, hook: TransitionHook) -> TransitionHook:
+        """Register a post-transition hook (usable as a decorator)"""
+        if hook not in self._hooks:
+            self._hooks.append(hook)
+        return hook
+
+    def run_hooks(self, transitions: list, new_status: str, notes: str = '', current_time=None):
+        current_time = current_time or timezone.now()
+        for hook in self._hooks:
+            hook(transitions, new_status, notes, current_time)
+
+    def apply_entry_effects(self, order: OfflineOrder, new_status: str, current_time) -> List[str]:
+        """Set status timestamps on a single order; returns the changed fields"""
+        changed = []
+        if new_status == OrderStatus.PREPARING and not order.preparation_started_at:
+            order.preparation_started_at = current_time
+            changed.append('preparation_started_at')
+        elif new_status == OrderStatus.COMPLETED and not order.completed_at:
+            order.completed_at = current_time
+            changed.append('completed_at')
+            # Calculate actual preparation time
+            if order.preparation_started_at:
+                prep_time = (current_time - order.preparation_started_at).total_seconds() / 60
+                order.actual_preparation_time = int(prep_time)
+                changed.append('actual_preparation_time')
+        return changed
+
+    def _entry_update_fields(self, new_status: str, current_time, orders: list) -> dict:
+        """Bulk UPDATE expressions equivalent to apply_entry_effects"""
+        if new_status == OrderStatus.PREPARING:
+            return {'preparation_started_at': Coalesce('preparation_started_at', Value(current_time))}
+
+        if new_status == OrderStatus.COMPLETED:
+            fields = {'completed_at': Coalesce('completed_at', Value(current_time))}
+            whens = [
+                When(
+                    id=order.id,
+                    then=Value(int((current_time - order.preparation_started_at).total_seconds() / 60))
+                )
+                for order in orders
+                if order.preparation_started_at and not order.completed_at
+            ]
+            if whens:
+                fields['actual_preparation_time'] = Case(
+                    *whens,
+                    default='actual_preparation_time',
+                    output_field=IntegerField()
+                )
+            return fields
+
+        return {}
+
+    # ------------------------------------------------------------------
+    # Bulk transitions
+    # ------------------------------------------------------------------
+
+    def apply_transitions(self, order_ids: list, new_status: str, notes: str = '',
+                          restaurant_id=None) -> dict:
+        """
+        Move many orders to `new_status` with a single conditional UPDATE.
+
+        Orders that are not in a valid source status (or do not exist) are
+        reported as rejected and left untouched.
+        """
+        sources = self.allowed_sources(new_status)
+        order_ids = [str(order_id) for order_id in order_ids]
+
+        if not sources:
+            return {'updated': [], 'rejected': order_ids}
+
+        current_time = timezone.now()
+
+        with transaction.atomic():
+            queryset = OfflineOrder.objects.filter(id__in=order_ids, order_status__in=sources)
+            if restaurant_id is not None:
+                queryset = queryset.filter(restaurant_id=restaurant_id)
+
+            orders = list(
+                queryset.select_for_update().only(
+                    'id', 'restaurant_id', 'local_order_id', 'order_status', 'supabase_order_id',
+                    'preparation_started_at', 'completed_at'
+                )
+            )
+
+            if orders:
+                OfflineOrder.objects.filter(
+                    id__in=[order.id for order in orders],
+                    order_status__in=sources
+                ).update(
+                    order_status=new_status,
+                    updated_at=current_time,
+                    **self._entry_update_fields(new_status, current_time, orders)
+                )
+
+                transitions = [(order, order.order_status) for order in orders]
+                for order, _ in transitions:
+                    order.order_status = new_status
+
+                self.run_hooks(transitions, new_status, notes, current_time)
+
+        updated = [str(order.id) for order in orders]
+        updated_set = set(updated)
+
+        logger.info(f"Bulk status update to {new_status}: {len(updated)} of {len(order_ids)} orders")
+
+        return {
+            'updated': updated,
+            'rejected': [order_id for order_id in order_ids if order_id not in updated_set],
+        }
+
+
+order_state_machine = OrderStateMachine()
+
+
+@order_state_machine.register_hook
+def record_crdt_operation(transitions: list, new_status: str, notes: str, current_time):
+    """Write the new status into each order's CRDT state, ticking the local clock"""
+    orders = {order.id: order for order, _ in transitions}
+    states = list(OrderCRDTState.objects.filter(order_id__in=orders.keys()))
+
+    for state in states:
+        # Rows from before delta state carry only a clock
+        crdt_state = state.state or empty_state(state.vector_clock)
+        state.state, _ = order_crdt.set_fields(crdt_state, {'order_status': new_status}, current_time)
+        state.vector_clock = state.state['clock']
+        state.last_operation = 'STATUS_UPDATE'
+        state.operation_timestamp = current_time
+        state.updated_at = current_time
+
+    if states:
+        OrderCRDTState.objects.bulk_update(
+            states, ['state', 'vector_clock', 'last_operation', 'operation_timestamp', 'updated_at']
+        )
+
+    # Create CRDT state for orders that don't have one yet
+    missing = orders.keys() - {state.order_id for state in states}
+    if missing:
+        created = []
+        for order_id in missing:
+            crdt_state, _ = order_crdt.set_fields(empty_state(), {'order_status': new_status}, current_time)
+            created.append(OrderCRDTState(
+                order=orders[order_id],
+                vector_clock=crdt_state['clock'],
+                state=crdt_state,
+                last_operation='STATUS_UPDATE',
+                operation_timestamp=current_time
+            ))
+        OrderCRDTState.objects.bulk_create(created)
+
+
+@order_state_machine.register_hook
+def emit_sync_rows(transitions: list, new_status: str, notes: str, current_time):
+    """Queue ORDER_UPDATE sync for every transitioned order, coalescing pending rows"""
+    crdt_states = {
+        order_id: (crdt_state, acked_clock)
+        for order_id, crdt_state, acked_clock in OrderCRDTState.objects.filter(
+            order_id__in=[order.id for order, _ in transitions]
+        ).values_list('order_id', 'state', 'acked_clock')
+    }
+
+    sync_coalescer.queue_order_updates([
+        {
+            'restaurant_id': order.restaurant_id,
+            'local_order_id': str(order.id),
+            'previous_status': previous_status,
+            'new_status': new_status,
+            'notes': notes,
+            'timestamp': current_time.isoformat(),
+            'vector_clock': crdt_states[order.id][0].get('clock', {}) if order.id in crdt_states else {},
+            # Everything Supabase has not acknowledged yet
+            'delta': delta_since(*crdt_states[order.id]) if order.id in crdt_states else None,
+        }
+        for order, previous_status in transitions
+    ])
@@ -1,4 +1,5 @@
 #Core Unit Tests
+import asyncio
 import pytest
 import json
 from decimal import Decimal
@@ -477,3 +478,727 @@ class TestOrderErrorScenarios:
         assert result['success'] is True
         order = OfflineOrder.objects.get(id=result['order_id'])
         assert order.total_amount == Decimal('10800.00')  # 1000 * 10 * 1.08
+
+
+@pytest.mark.django_db
+class TestOrderSequenceAllocator:
+    """Unit tests for the per-restaurant order sequence allocator"""
+    
+    def test_sequence_increments_per_restaurant_and_day(self, test_restaurant):
+        """Sequences are independent per restaurant and per business day"""
+        from datetime import date
+        from apps.order_processing.sequences import OrderSequenceAllocator
+        
+        other_restaurant = Restaurant.objects.create(
+            supabase_restaurant_id='00000000-0000-0000-0000-000000000042',
+            name='Other Restaurant'
+        )
+        allocator = OrderSequenceAllocator()
+        today = date(2025, 1, 1)
+        tomorrow = date(2025, 1, 2)
+        
+        assert allocator.next_value(test_restaurant.id, today) == 1
+        assert allocator.next_value(test_restaurant.id, today) == 2
+        assert allocator.next_value(other_restaurant.id, today) == 1
+        assert allocator.next_value(test_restaurant.id, tomorrow) == 1
+    
+    def test_generate_local_order_id_uses_allocator(self, test_restaurant):
+        """Local order IDs carry consecutive sequence numbers"""
+        service = OrderProcessingService()
+        
+        first = service.generate_local_order_id(test_restaurant)
+        second = service.generate_local_order_id(test_restaurant)
+        
+        assert first.startswith('TES-')
+        assert first.endswith('-0001')
+        assert second.endswith('-0002')
+    
+    def _cache_allocator(self, settings):
+        from django.core.cache import cache
+        from apps.order_processing.sequences import OrderSequenceAllocator
+    
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'order-sequence-tests',
+            }
+        }
+        cache.clear()
+        return OrderSequenceAllocator()
+    
+    def test_out_of_order_cache_blocks_are_kept(self, test_restaurant, settings):
+        """A block whose row update lost to a later block is still valid"""
+        from datetime import date
+        from django.core.cache import cache
+        from apps.order_processing.models import OrderSequence
+    
+        allocator = self._cache_allocator(settings)
+        key = (str(test_restaurant.id), date(2025, 1, 1))
+        cache_key = f'order_seq_{key[0]}_2025-01-01'
+    
+        assert allocator._reserve_from_cache(key, 10) == 10
+        earlier = cache.incr(cache_key, 10)
+        assert allocator._reserve_from_cache(key, 10) == 30
+    
+        assert allocator._advance_high_water(key, cache_key, earlier) is True
+        assert cache.get(cache_key) == 30
+        assert OrderSequence.objects.get(restaurant=test_restaurant).last_value == 30
+    
+    def test_cache_behind_database_is_moved_up(self, test_restaurant, settings):
+        """Numbers issued by the database path are never handed out again"""
+        from datetime import date
+        from apps.order_processing.models import OrderSequence
+    
+        allocator = self._cache_allocator(settings)
+        key = (str(test_restaurant.id), date(2025, 1, 1))
+    
+        assert allocator._reserve_from_cache(key, 10) == 10
+        OrderSequence.objects.filter(restaurant=test_restaurant).update(last_value=50)
+    
+        assert allocator._reserve_from_cache(key, 10) is None
+        assert allocator._reserve_from_cache(key, 10) == 60
+
+
+@pytest.mark.django_db(transaction=True)
+class TestOrderSequenceBlocks:
+    """Block reservation outside of a surrounding transaction"""
+    
+    def test_block_reserved_once_and_served_from_memory(self, test_restaurant):
+        """A block is reserved up front and then handed out without queries"""
+        from datetime import date
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.order_processing.models import OrderSequence
+        from apps.order_processing.sequences import OrderSequenceAllocator
+        
+        allocator = OrderSequenceAllocator()
+        allocator.block_size = 5
+        business_date = date(2025, 1, 1)
+        
+        assert allocator.next_value(test_restaurant.id, business_date) == 1
+        counter = OrderSequence.objects.get(restaurant=test_restaurant, business_date=business_date)
+        assert counter.last_value == 5
+        
+        with CaptureQueriesContext(connection) as queries:
+            values = [allocator.next_value(test_restaurant.id, business_date) for _ in range(4)]
+        
+        assert values == [2, 3, 4, 5]
+        assert len(queries) == 0
+        
+        # Next block continues from the durable high-water mark
+        assert allocator.next_value(test_restaurant.id, business_date) == 6
+        counter.refresh_from_db()
+        assert counter.last_value == 10
+    
+    def test_next_values_spans_blocks(self, test_restaurant):
+        """Large requests drain the current block and reserve the remainder at once"""
+        from datetime import date
+        from apps.order_processing.sequences import OrderSequenceAllocator
+        
+        allocator = OrderSequenceAllocator()
+        allocator.block_size = 5
+        business_date = date(2025, 1, 1)
+        
+        assert allocator.next_values(test_restaurant.id, 3, business_date) == [1, 2, 3]
+        assert allocator.next_values(test_restaurant.id, 10, business_date) == list(range(4, 14))
+
+
+@pytest.mark.django_db
+class TestBulkOrderIngestion:
+    """Unit tests for batched order ingestion"""
+    
+    def test_bulk_create_orders(self, test_restaurant):
+        """Valid orders are written together, invalid ones reported per index"""
+        from apps.otp_service.models import OTP
+        
+        service = OrderProcessingService()
+        orders_data = [
+            {'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 2}]},
+            {'items': []},
+            {
+                'items': [{'id': ANOTHER_ITEM_UUID, 'name': 'Juice', 'price': '5.00', 'quantity': 1}],
+                'table_id': '00000000-0000-0000-0000-000000000002'
+            },
+        ]
+        
+        result = service.create_offline_orders_bulk(str(test_restaurant.id), orders_data)
+        
+        assert result['success'] is True
+        assert result['created'] == 2
+        assert result['failed'] == 1
+        assert [item['index'] for item in result['results']] == [0, 1, 2]
+        assert result['results'][1]['success'] is False
+        
+        first, third = result['results'][0], result['results'][2]
+        assert first['total_amount'] == Decimal('21.60')
+        assert third['total_amount'] == Decimal('5.40')
+        assert first['local_order_id'] != third['local_order_id']
+        assert len(first['otp_code']['otp_code']) == 6
+        
+        order_ids = [first['order_id'], third['order_id']]
+        assert OfflineOrder.objects.filter(id__in=order_ids).count() == 2
+        assert OrderCRDTState.objects.filter(order_id__in=order_ids).count() == 2
+        assert OTP.objects.filter(order_id__in=order_ids, status='ACTIVE').count() == 2
+        assert SyncQueue.objects.filter(
+            restaurant=test_restaurant,
+            sync_type='ORDER_CREATE'
+        ).count() == 2
+    
+    def test_bulk_create_uses_constant_queries(self, test_restaurant, django_assert_max_num_queries):
+        """Query count does not grow with the batch size"""
+        service = OrderProcessingService()
+        orders_data = [
+            {'items': [{'id': TEST_ITEM_UUID, 'name': f'Item {i}', 'price': '10.00', 'quantity': 1}]}
+            for i in range(25)
+        ]
+        
+        with django_assert_max_num_queries(25):
+            result = service.create_offline_orders_bulk(str(test_restaurant.id), orders_data)
+        
+        assert result['created'] == 25
+    
+    def test_bulk_create_invalid_restaurant(self):
+        """Unknown restaurant rejects the whole batch"""
+        service = OrderProcessingService()
+        
+        result = service.create_offline_orders_bulk(
+            '00000000-0000-0000-0000-000000000999',
+            [{'items': [{'id': TEST_ITEM_UUID, 'name': 'Test', 'price': '10.00', 'quantity': 1}]}]
+        )
+        
+        assert result['success'] is False
+        assert 'error' in result
+
+
+@pytest.mark.django_db
+class TestOrderStateMachine:
+    """Unit tests for the shared order state machine"""
+    
+    def _create_order(self, restaurant, local_order_id, order_status):
+        return OfflineOrder.objects.create(
+            restaurant=restaurant,
+            local_order_id=local_order_id,
+            order_items=[],
+            total_amount=Decimal('10.00'),
+            tax_amount=Decimal('0.80'),
+            order_status=order_status
+        )
+    
+    def test_transition_table(self):
+        """Service and serializer validate against the same table"""
+        from apps.order_processing.state_machine import order_state_machine, TERMINAL_STATUSES
+        
+        service = OrderProcessingService()
+        
+        assert order_state_machine.is_valid_transition('PENDING', 'CONFIRMED')
+        assert order_state_machine.is_valid_transition('READY', 'COMPLETED')
+        assert not order_state_machine.is_valid_transition('PENDING', 'COMPLETED')
+        assert not order_state_machine.is_valid_transition('UNKNOWN', 'PENDING')
+        assert service.is_valid_status_transition('PENDING', 'PAYMENT_FAILED')
+        assert order_state_machine.allowed_sources('PREPARING') == frozenset({'CONFIRMED'})
+        assert TERMINAL_STATUSES == frozenset({'COMPLETED', 'CANCELLED'})
+    
+    def test_apply_transitions_bulk(self, test_restaurant, django_assert_max_num_queries):
+        """Eligible orders move together; others are rejected untouched"""
+        confirmed = [
+            self._create_order(test_restaurant, f'BULK-{i}', 'CONFIRMED') for i in range(3)
+        ]
+        completed = self._create_order(test_restaurant, 'BULK-DONE', 'COMPLETED')
+        order_ids = [order.id for order in confirmed] + [completed.id]
+        
+        service = OrderProcessingService()
+        with django_assert_max_num_queries(12):
+            result = service.update_orders_status_bulk(
+                order_ids, 'PREPARING', notes='Ticket bump', restaurant_id=test_restaurant.id
+            )
+        
+        assert result['success'] is True
+        assert sorted(result['updated']) == sorted(str(order.id) for order in confirmed)
+        assert result['rejected'] == [str(completed.id)]
+        
+        for order in confirmed:
+            order.refresh_from_db()
+            assert order.order_status == 'PREPARING'
+            assert order.preparation_started_at is not None
+        
+        completed.refresh_from_db()
+        assert completed.order_status == 'COMPLETED'
+        
+        assert SyncQueue.objects.filter(sync_type='ORDER_UPDATE').count() == 3
+        assert OrderCRDTState.objects.filter(order__in=confirmed).count() == 3
+    
+    def test_apply_transitions_sets_preparation_time(self, test_restaurant):
+        """Completing in bulk records the actual preparation time"""
+        from datetime import timedelta
+        from apps.order_processing.state_machine import order_state_machine
+        
+        order = self._create_order(test_restaurant, 'BULK-READY', 'READY')
+        order.preparation_started_at = timezone.now() - timedelta(minutes=12)
+        order.save()
+        
+        result = order_state_machine.apply_transitions([order.id], 'COMPLETED')
+        
+        assert result['updated'] == [str(order.id)]
+        order.refresh_from_db()
+        assert order.completed_at is not None
+        assert order.actual_preparation_time == 12
+
+
+class TestPricingEngine:
+    """Tests for the single-pass order pricing engine"""
+    
+    def test_price_order_in_cents(self):
+        from apps.order_processing.pricing import pricing_engine
+        
+        priced = pricing_engine.price_order([
+            {'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 2,
+             'modifiers': [{'name': 'Cheese', 'price': '1.25'}]},
+            {'id': TEST_ITEM_UUID, 'name': 'Juice', 'price': 3, 'quantity': 1},
+            {'id': TEST_ITEM_UUID, 'name': 'Fries', 'price': Decimal('2.5'), 'quantity': 3},
+        ])
+        
+        assert priced.is_valid
+        assert [line.line_cents for line in priced.lines] == [2250, 300, 750]
+        assert priced.subtotal == Decimal('33.00')
+        assert priced.tax_amount == Decimal('2.64')
+        assert priced.total_amount == Decimal('35.64')
+    
+    def test_price_order_collects_errors(self):
+        from apps.order_processing.pricing import pricing_engine
+        
+        priced = pricing_engine.price_order([
+            {'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': 'abc', 'quantity': 1},
+            {'name': 'Fries', 'price': '2.00', 'quantity': 0,
+             'modifiers': [{'name': 'Salt', 'price': '-0.50'}]},
+        ])
+        
+        assert not priced.is_valid
+        assert priced.messages == [
+            "Item 1: Invalid price format",
+            "Item 2: Missing ID",
+            "Item 2: Quantity must be positive",
+            "Item 2 modifier 1: Price cannot be negative",
+        ]
+        assert [(error.item_index, error.field, error.modifier_index) for error in priced.errors] == [
+            (0, 'price', None), (1, 'id', None), (1, 'quantity', None), (1, 'modifiers', 0),
+        ]
+    
+    def test_serializer_prices_once(self, test_restaurant):
+        """The service reuses the serializer's pricing instead of pricing again"""
+        data = {'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 2}]}
+        serializer = OrderCreateSerializer(data=data, context={'restaurant_id': test_restaurant.id})
+        assert serializer.is_valid(), serializer.errors
+        assert serializer.validated_data['items'][0]['total_price'] == Decimal('20.00')
+        
+        service = OrderProcessingService()
+        with patch.object(OrderProcessingService, 'price_order') as price_order:
+            result = service.create_offline_order(str(test_restaurant.id), serializer.validated_data)
+        
+        price_order.assert_not_called()
+        assert result['success'] is True
+        assert result['total_amount'] == Decimal('21.60')
+    
+    def test_serializer_reports_errors_per_field(self):
+        serializer = OrderCreateSerializer(data={'items': [
+            {'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1,
+             'modifiers': [{'price': '1.00'}]},
+        ]})
+        
+        assert not serializer.is_valid()
+        assert serializer.errors['items'][0]['modifiers'] == {0: ['Missing name']}
+    
+    def test_validate_modifier_still_supported(self):
+        from apps.order_processing.services import OrderValidationService
+        
+        with pytest.warns(DeprecationWarning):
+            errors = OrderValidationService().validate_modifier({'price': '-1.00'}, 0, 1)
+        
+        assert errors == [
+            "Item 1 modifier 2: Missing name",
+            "Item 1 modifier 2: Price cannot be negative",
+        ]
+    
+    def test_tax_rounding_matches_decimal(self):
+        from apps.order_processing.pricing import to_cents
+        
+        service = OrderProcessingService()
+        
+        assert to_cents('0.1') == 10
+        assert to_cents(0.105) == 10  # Half-even, as Decimal quantize
+        assert service.calculate_tax(Decimal('10.05')) == Decimal('0.80')
+        assert service.calculate_tax(Decimal('10.06')) == Decimal('0.80')
+    
+    def _cached_menu(self, restaurant):
+        from apps.menu_cache.models import MenuCache
+        
+        return MenuCache.objects.create(
+            restaurant=restaurant,
+            menu_data={'categories': [{
+                'id': 'mains',
+                'name': 'Mains',
+                'items': [
+                    {'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '12.00', 'preparation_time': 15,
+                     'modifiers': [{'id': 'bacon', 'name': 'Bacon', 'price': '2.00'}]},
+                    {'id': ANOTHER_ITEM_UUID, 'name': 'Juice', 'price': '4.00', 'is_available': False},
+                ]
+            }]},
+            version=1
+        )
+    
+    def test_order_priced_from_cached_menu(self, test_restaurant):
+        """With a cached menu, submitted prices are replaced by menu prices"""
+        self._cached_menu(test_restaurant)
+        service = OrderProcessingService()
+        
+        result = service.create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '0.01', 'quantity': 2,
+                       'modifiers': [{'id': 'bacon', 'name': 'Bacon', 'price': '0.00'}]}]
+        })
+        
+        assert result['success'] is True
+        order = OfflineOrder.objects.get(id=result['order_id'])
+        assert order.total_amount == Decimal('30.24')  # (12 + 2) * 2 * 1.08
+        assert order.estimated_preparation_time == 15
+        # Stored and synced lines show what was charged, not what was sent
+        sync_items = SyncQueue.objects.get(payload__local_order_id=str(order.id)).payload['order_data']['items']
+        for items in (order.order_items, sync_items):
+            assert items[0]['price'] == '12.00'
+            assert items[0]['modifiers'][0]['price'] == '2.00'
+        
+        unavailable = service.create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': ANOTHER_ITEM_UUID, 'name': 'Juice', 'price': '4.00', 'quantity': 1}]
+        })
+        assert unavailable['success'] is False
+        assert 'Item 1: Not available' in unavailable['details']
+    
+    def test_serializer_takes_prices_from_menu(self, test_restaurant):
+        """With a menu index the client may omit prices; sent ones are overwritten"""
+        self._cached_menu(test_restaurant)
+        serializer = OrderCreateSerializer(data={'items': [
+            {'id': TEST_ITEM_UUID, 'name': 'Burger', 'quantity': 1,
+             'modifiers': [{'id': 'bacon', 'name': 'Bacon', 'price': '0.00'}]},
+        ]}, context={'restaurant_id': test_restaurant.id})
+        
+        assert serializer.is_valid(), serializer.errors
+        item = serializer.validated_data['items'][0]
+        assert (item['price'], item['total_price']) == (Decimal('12.00'), Decimal('14.00'))
+        assert item['modifiers'][0]['price'] == Decimal('2.00')
+    
+    def test_serializer_requires_price_without_menu(self, test_restaurant):
+        serializer = OrderCreateSerializer(data={'items': [
+            {'id': TEST_ITEM_UUID, 'name': 'Burger', 'quantity': 1},
+        ]}, context={'restaurant_id': test_restaurant.id})
+        
+        assert not serializer.is_valid()
+        assert serializer.errors['items'][0]['price'] == ['Missing price']
+
+
+@pytest.mark.django_db
+class TestActiveOrderBoard:
+    """Tests for the cached active-order board"""
+    
+    @pytest.fixture(autouse=True)
+    def board_cache(self, settings):
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'active-order-board-tests',
+            }
+        }
+        from django.core.cache import cache
+        cache.clear()
+    
+    def _create(self, service, restaurant, table_id=None):
+        return service.create_offline_order(str(restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}],
+            'table_id': table_id
+        })
+    
+    def test_board_follows_order_lifecycle(self, test_restaurant, django_capture_on_commit_callbacks):
+        from apps.order_processing.board import active_order_board
+        
+        service = OrderProcessingService()
+        table_id = '00000000-0000-0000-0000-000000000007'
+        board = active_order_board.get_board(test_restaurant.id)
+        assert board['orders'] == {}
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            result = self._create(service, test_restaurant, table_id)
+        order_id = result['order_id']
+        
+        pending = active_order_board.get_orders(test_restaurant.id, status='PENDING')
+        assert [order['id'] for order in pending] == [order_id]
+        assert [o['id'] for o in active_order_board.get_orders(test_restaurant.id, table_id=table_id)] == [order_id]
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            service.update_order_status(order_id, 'CONFIRMED')
+            service.update_orders_status_bulk([order_id], 'PREPARING')
+        
+        board = active_order_board.get_board(test_restaurant.id)
+        assert board['statuses']['PENDING'] == []
+        assert board['statuses']['PREPARING'] == [order_id]
+        assert board['orders'][order_id]['preparation_started_at'] is not None
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            service.update_order_status(order_id, 'CANCELLED')
+        
+        board = active_order_board.get_board(test_restaurant.id)
+        assert board['orders'] == {}
+        assert board['tables'] == {}
+    
+    def test_board_read_skips_orders_table(self, test_restaurant, django_assert_num_queries,
+                                           django_capture_on_commit_callbacks):
+        from apps.order_processing.board import active_order_board
+        
+        service = OrderProcessingService()
+        active_order_board.get_board(test_restaurant.id)
+        with django_capture_on_commit_callbacks(execute=True):
+            self._create(service, test_restaurant)
+        
+        with django_assert_num_queries(0):
+            assert len(active_order_board.get_orders(test_restaurant.id)) == 1
+    
+    def test_board_rebuilt_when_evicted(self, test_restaurant):
+        from django.core.cache import cache
+        from apps.order_processing.board import active_order_board
+        
+        service = OrderProcessingService()
+        result = self._create(service, test_restaurant)
+        cache.clear()
+        
+        orders = active_order_board.get_orders(test_restaurant.id)
+        
+        assert [order['id'] for order in orders] == [result['order_id']]
+
+
+
+@pytest.mark.django_db
+class TestOrderBroadcasts:
+    """Order changes published to WebSocket groups once committed"""
+    
+    def test_status_change_published_after_commit(self, test_order, django_capture_on_commit_callbacks):
+        from apps.order_processing.broadcast import order_broadcaster
+        
+        service = OrderProcessingService()
+        with patch.object(order_broadcaster, 'publish') as mock_publish:
+            with django_capture_on_commit_callbacks() as callbacks:
+                service.update_order_status(str(test_order.id), 'CONFIRMED')
+            mock_publish.assert_not_called()
+            
+            for callback in callbacks:
+                callback()
+        
+        restaurant_id, events = mock_publish.call_args.args
+        assert restaurant_id == test_order.restaurant_id
+        assert events[0]['type'] == 'order_status'
+        assert events[0]['data']['id'] == str(test_order.id)
+        assert events[0]['data']['previous_status'] == 'PENDING'
+        assert events[0]['data']['status'] == 'CONFIRMED'
+    
+    def test_bulk_transition_publishes_once_per_restaurant(self, test_restaurant,
+                                                           django_capture_on_commit_callbacks):
+        from apps.order_processing.broadcast import order_broadcaster
+        
+        orders = [
+            OfflineOrder.objects.create(
+                restaurant=test_restaurant,
+                local_order_id=f'BCAST-{index}',
+                order_items=[],
+                total_amount=Decimal('10.00'),
+                tax_amount=Decimal('0.80'),
+                order_status='CONFIRMED'
+            )
+            for index in range(3)
+        ]
+        
+        service = OrderProcessingService()
+        with patch.object(order_broadcaster, 'publish') as mock_publish:
+            with django_capture_on_commit_callbacks(execute=True):
+                service.update_orders_status_bulk([order.id for order in orders], 'PREPARING')
+        
+        mock_publish.assert_called_once()
+        _, events = mock_publish.call_args.args
+        assert {event['data']['id'] for event in events} == {str(order.id) for order in orders}
+    
+    def test_created_orders_are_announced(self, test_restaurant, django_capture_on_commit_callbacks):
+        from apps.order_processing.broadcast import order_broadcaster
+        
+        service = OrderProcessingService()
+        with patch.object(order_broadcaster, 'publish') as mock_publish:
+            with django_capture_on_commit_callbacks(execute=True):
+                result = service.create_offline_order(str(test_restaurant.id), {
+                    'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+                })
+        
+        _, events = mock_publish.call_args.args
+        assert events == [{'type': 'order_created', 'data': events[0]['data']}]
+        assert events[0]['data']['id'] == result['order_id']
+    
+    def test_channel_layer_errors_do_not_reach_writer(self, test_order):
+        from apps.order_processing.broadcast import order_broadcaster
+        
+        with patch('apps.order_processing.broadcast.get_channel_layer') as mock_layer:
+            mock_layer.return_value.group_send.side_effect = ConnectionError('redis down')
+            order_broadcaster.publish(test_order.restaurant_id, [
+                order_broadcaster.status_event(test_order, 'PENDING', 'CONFIRMED', timezone.now())
+            ])
+
+
+@pytest.mark.asyncio
+class TestEventDispatcher:
+    """Batching, coalescing and backpressure for WebSocket events"""
+    
+    def _status(self, order_id, previous_status, status):
+        return {'type': 'order_status', 'data': {'id': order_id, 'previous_status': previous_status, 'status': status}}
+    
+    async def test_burst_is_coalesced_into_one_batch(self):
+        from apps.order_processing.dispatch import EventDispatcher
+        
+        sent = []
+        async def send(text):
+            sent.append(json.loads(text))
+        
+        dispatcher = EventDispatcher(send, window=0.01)
+        dispatcher.push({'type': 'order_created', 'data': {'id': 'a', 'order_status': 'PENDING'}})
+        dispatcher.push(self._status('a', 'PENDING', 'CONFIRMED'))
+        dispatcher.push(self._status('b', 'CONFIRMED', 'PREPARING'))
+        dispatcher.push(self._status('b', 'PREPARING', 'READY'))
+        await asyncio.sleep(0.05)
+        
+        assert len(sent) == 1
+        assert sent[0] == {'type': 'batch', 'events': [
+            {'type': 'order_created', 'data': {'id': 'a', 'order_status': 'CONFIRMED'}},
+            self._status('b', 'CONFIRMED', 'READY'),
+        ]}
+    
+    async def test_slow_client_keeps_coalescing(self):
+        """Events arriving during a slow send wait for one follow-up batch"""
+        from apps.order_processing.dispatch import EventDispatcher
+        
+        sent = []
+        async def send(text):
+            await asyncio.sleep(0.05)
+            sent.append(json.loads(text))
+        
+        dispatcher = EventDispatcher(send, window=0.01)
+        dispatcher.push(self._status('a', 'PENDING', 'CONFIRMED'))
+        await asyncio.sleep(0.02)
+        for status in ('PREPARING', 'READY', 'COMPLETED'):
+            dispatcher.push(self._status('a', 'x', status))
+        await asyncio.sleep(0.2)
+        
+        assert [event['data']['status'] for batch in sent for event in batch['events']] == ['CONFIRMED', 'COMPLETED']
+    
+    async def test_overflow_resyncs_instead_of_buffering(self):
+        from apps.order_processing.dispatch import EventDispatcher
+        
+        sent = []
+        resyncs = []
+        async def send(text):
+            sent.append(text)
+        async def resync():
+            resyncs.append(True)
+        
+        dispatcher = EventDispatcher(send, resync=resync, window=0.01, max_pending=5)
+        for index in range(20):
+            dispatcher.push(self._status(str(index), 'PENDING', 'CONFIRMED'))
+        await asyncio.sleep(0.05)
+        
+        assert resyncs == [True]
+        assert sent == []
+    
+    async def test_lagging_client_is_resynced(self):
+        """Events that waited longer than max_lag behind a slow send are replaced by a resync"""
+        from apps.order_processing.dispatch import EventDispatcher
+        
+        sent = []
+        resyncs = []
+        async def send(text):
+            await asyncio.sleep(0.1)
+            sent.append(json.loads(text))
+        async def resync():
+            resyncs.append(True)
+        
+        dispatcher = EventDispatcher(send, resync=resync, window=0.01, max_lag=0.05)
+        dispatcher.push(self._status('a', 'PENDING', 'CONFIRMED'))
+        await asyncio.sleep(0.02)
+        dispatcher.push(self._status('b', 'PENDING', 'CONFIRMED'))
+        await asyncio.sleep(0.2)
+        
+        assert [event['data']['id'] for batch in sent for event in batch['events']] == ['a']
+        assert resyncs == [True]
+    
+    async def test_unframed_sends_plain_events(self):
+        from apps.order_processing.dispatch import EventDispatcher
+        
+        sent = []
+        async def send(text):
+            sent.append(json.loads(text))
+        
+        dispatcher = EventDispatcher(send, window=0.01, framed=False)
+        dispatcher.push(self._status('a', 'PENDING', 'CONFIRMED'))
+        dispatcher.push(self._status('a', 'CONFIRMED', 'PREPARING'))
+        await asyncio.sleep(0.05)
+        dispatcher.close()
+        
+        assert sent == [self._status('a', 'PENDING', 'PREPARING')]
+
+
+class TestOrderCRDT:
+    """Tests for the order delta-CRDT"""
+    
+    def _replicas(self):
+        from apps.order_processing.crdt import OrderCRDT
+        return OrderCRDT('local'), OrderCRDT('cloud')
+    
+    def test_merge_is_commutative_and_idempotent(self):
+        from apps.order_processing.crdt import merge_states
+        local, cloud = self._replicas()
+        base, _ = local.add_items(None, [{'id': 'a', 'quantity': 1}])
+        
+        left, left_delta = local.set_fields(base, {'order_status': 'READY'}, '2026-01-01T10:00:01')
+        right, right_delta = cloud.set_fields(base, {'order_status': 'CANCELLED'}, '2026-01-01T10:00:02')
+        
+        one = merge_states(left, right_delta)
+        other = merge_states(right, left_delta)
+        
+        assert one == other
+        assert merge_states(one, right_delta) == one
+        assert one['fields']['order_status']['value'] == 'CANCELLED'
+        assert one['clock'] == {'local': 2, 'cloud': 1}
+    
+    def test_timestamp_ties_break_on_node(self):
+        from apps.order_processing.crdt import merge_states
+        local, cloud = self._replicas()
+        
+        _, left = local.set_fields(None, {'order_status': 'READY'}, '2026-01-01T10:00:00')
+        _, right = cloud.set_fields(None, {'order_status': 'CANCELLED'}, '2026-01-01T10:00:00')
+        
+        assert merge_states(left, right) == merge_states(right, left)
+    
+    def test_or_set_add_wins_over_concurrent_remove(self):
+        from apps.order_processing.crdt import merge_states, item_values
+        local, cloud = self._replicas()
+        base, _ = local.add_items(None, [{'id': 'a'}])
+        tag = next(iter(base['items']['adds']))
+        
+        removed, remove_delta = local.remove_items(base, [tag])
+        _, add_delta = cloud.add_items(base, [{'id': 'a'}])
+        
+        assert item_values(removed) == []
+        assert item_values(merge_states(removed, add_delta)) == [{'id': 'a'}]
+        assert item_values(merge_states(merge_states(base, add_delta), remove_delta)) == [{'id': 'a'}]
+    
+    def test_delta_since_ships_only_unacknowledged_changes(self):
+        from apps.order_processing.crdt import delta_since, supabase_updates
+        local, _ = self._replicas()
+        state, _ = local.add_items(None, [{'id': 'a'}])
+        state, _ = local.set_fields(state, {'order_status': 'PENDING', 'total_amount': '10.00'}, '2026-01-01T10:00:00')
+        acked = dict(state['clock'])
+        state, _ = local.set_fields(state, {'order_status': 'READY'}, '2026-01-01T10:05:00')
+        
+        delta = delta_since(state, acked)
+        
+        assert list(delta['fields']) == ['order_status']
+        assert delta['items']['adds'] == {}
+        assert supabase_updates(delta) == {'status': 'READY'}
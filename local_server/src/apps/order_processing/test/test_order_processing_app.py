@@ -459,6 +459,165 @@ class TestOrderWebSocketConsumers:
         finally:
             await communicator.disconnect()
 
+    
+    @pytest.mark.django_db(transaction=True)
+    async def test_handshake_reads_order_once(self):
+        """The access check and the first frame share one order read"""
+        from apps.order_processing.access import order_access_cache
+        from apps.order_processing.consumers import OrderStatusConsumer
+        
+        @sync_to_async
+        def setup_data():
+            restaurant = Restaurant.objects.create(
+                supabase_restaurant_id=str(uuid.uuid4()),
+                name='Handshake Restaurant'
+            )
+            order = OfflineOrder.objects.create(
+                restaurant=restaurant,
+                local_order_id=f'HS-{uuid.uuid4().hex[:8]}',
+                order_items=[],
+                total_amount=Decimal('10.00'),
+                tax_amount=Decimal('0.80')
+            )
+            user = User.objects.create_user(
+                username=f'hsuser_{uuid.uuid4().hex[:8]}',
+                password='hspass123',
+                restaurant=restaurant
+            )
+            return order, user
+        
+        order, user = await setup_data()
+        
+        def communicator_for(order_id):
+            communicator = WebsocketCommunicator(OrderStatusConsumer.as_asgi(), f"/ws/orders/{order_id}/")
+            communicator.scope.update({
+                'type': 'websocket',
+                'user': user,
+                'url_route': {'kwargs': {'order_id': str(order_id)}}
+            })
+            return communicator
+        
+        with patch.object(OfflineOrder.objects, 'filter', wraps=OfflineOrder.objects.filter) as reads:
+            communicator = communicator_for(order.id)
+            try:
+                connected, _ = await communicator.connect(timeout=5.0)
+                assert connected
+                frame = await communicator.receive_json_from(timeout=5.0)
+            finally:
+                await communicator.disconnect()
+            
+            assert reads.call_count == 1
+            assert frame['data']['id'] == str(order.id)
+            assert frame['data']['status'] == 'PENDING'
+            assert 'restaurant_id' not in frame['data']
+            
+            # A cached denial turns the reconnect away without a read
+            denied_order_id = str(uuid.uuid4())
+            order_access_cache.set(user.restaurant_id, denied_order_id, False)
+            communicator = communicator_for(denied_order_id)
+            connected, _ = await communicator.connect(timeout=5.0)
+            
+            assert not connected
+            assert reads.call_count == 1
+    
+    @pytest.mark.django_db(transaction=True)
+    async def test_restaurant_socket_multiplexes_orders(self):
+        """One restaurant socket receives the orders it subscribed to"""
+        from apps.order_processing.broadcast import order_broadcaster
+        from apps.order_processing.consumers import RestaurantOrdersConsumer
+        
+        @sync_to_async
+        def setup_data():
+            restaurant = Restaurant.objects.create(
+                supabase_restaurant_id=str(uuid.uuid4()),
+                name='Kitchen Restaurant'
+            )
+            orders = [
+                OfflineOrder.objects.create(
+                    restaurant=restaurant,
+                    local_order_id=f'KDS-{uuid.uuid4().hex[:8]}',
+                    order_items=[],
+                    total_amount=Decimal('10.00'),
+                    tax_amount=Decimal('0.80')
+                )
+                for _ in range(2)
+            ]
+            user = User.objects.create_user(
+                username=f'kdsuser_{uuid.uuid4().hex[:8]}',
+                password='kdspass123',
+                restaurant=restaurant
+            )
+            return restaurant, orders, user
+        
+        restaurant, orders, user = await setup_data()
+        
+        communicator = WebsocketCommunicator(
+            RestaurantOrdersConsumer.as_asgi(),
+            f"/ws/restaurants/{restaurant.id}/orders/"
+        )
+        communicator.scope.update({
+            'type': 'websocket',
+            'user': user,
+            'url_route': {'kwargs': {'restaurant_id': str(restaurant.id)}}
+        })
+        
+        try:
+            connected, _ = await communicator.connect(timeout=5.0)
+            assert connected
+            
+            snapshot = await communicator.receive_json_from(timeout=5.0)
+            assert snapshot['type'] == 'orders_snapshot'
+            assert {order['id'] for order in snapshot['data']} == {str(order.id) for order in orders}
+            
+            await communicator.send_json_to({'type': 'subscribe', 'order_ids': [str(orders[0].id)]})
+            subscription = await communicator.receive_json_from(timeout=5.0)
+            assert subscription == {'type': 'subscription', 'all': False, 'order_ids': [str(orders[0].id)]}
+            
+            now = timezone.now()
+            await sync_to_async(order_broadcaster.publish)(restaurant.id, [
+                order_broadcaster.status_event(order, 'PENDING', 'CONFIRMED', now) for order in orders
+            ])
+            
+            batch = await communicator.receive_json_from(timeout=5.0)
+            assert batch['type'] == 'batch'
+            assert [event['data']['id'] for event in batch['events']] == [str(orders[0].id)]
+            assert batch['events'][0]['data']['status'] == 'CONFIRMED'
+            assert await communicator.receive_nothing(timeout=0.2)
+        finally:
+            await communicator.disconnect()
+    
+    @pytest.mark.django_db(transaction=True)
+    async def test_restaurant_socket_rejects_other_restaurants(self):
+        from apps.order_processing.consumers import RestaurantOrdersConsumer
+        
+        @sync_to_async
+        def setup_data():
+            restaurant = Restaurant.objects.create(
+                supabase_restaurant_id=str(uuid.uuid4()),
+                name='Own Restaurant'
+            )
+            return User.objects.create_user(
+                username=f'foreign_{uuid.uuid4().hex[:8]}',
+                password='foreignpass123',
+                restaurant=restaurant
+            )
+        
+        user = await setup_data()
+        other_restaurant_id = str(uuid.uuid4())
+        
+        communicator = WebsocketCommunicator(
+            RestaurantOrdersConsumer.as_asgi(),
+            f"/ws/restaurants/{other_restaurant_id}/orders/"
+        )
+        communicator.scope.update({
+            'type': 'websocket',
+            'user': user,
+            'url_route': {'kwargs': {'restaurant_id': other_restaurant_id}}
+        })
+        
+        connected, _ = await communicator.connect(timeout=5.0)
+        assert not connected
+
 
 @pytest.mark.django_db
 class TestOrderCRDTOperations:
@@ -498,4 +657,121 @@ class TestOrderCRDTOperations:
         conflict_service = ConflictResolutionService()
         
         # Test that service can be instantiated
-        assert conflict_service is not None
\ No newline at end of file
+        assert conflict_service is not None
+
+@pytest.mark.django_db
+class TestOrderBulkAPI:
+    """Test cases for the bulk order endpoint"""
+    
+    def test_bulk_create_via_api(self, authenticated_client, test_restaurant):
+        """Batch endpoint creates orders and returns per-order results"""
+        payload = {
+            'orders': [
+                {'items': [{'id': str(uuid.uuid4()), 'name': 'Burger', 'price': '10.00', 'quantity': 1}]},
+                {'items': [{'id': str(uuid.uuid4()), 'name': 'Pizza', 'price': '12.00', 'quantity': 2}]},
+            ]
+        }
+        
+        response = authenticated_client.post(
+            '/api/orders/bulk/',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == status.HTTP_201_CREATED, response.data
+        assert response.data['created'] == 2
+        assert all(item['success'] for item in response.data['results'])
+        assert OfflineOrder.objects.filter(restaurant=test_restaurant).count() == 2
+    
+    def test_bulk_create_validation_error(self, authenticated_client):
+        """Empty batches are rejected by the serializer"""
+        response = authenticated_client.post(
+            '/api/orders/bulk/',
+            data=json.dumps({'orders': []}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+class TestOrderListingAPI:
+    """Test cases for keyset-paginated order listing and export"""
+    
+    def _create_orders(self, restaurant, count):
+        orders = [
+            OfflineOrder.objects.create(
+                restaurant=restaurant,
+                local_order_id=f'PAGE-{i}',
+                order_items=[],
+                total_amount=Decimal('10.00'),
+                tax_amount=Decimal('0.80')
+            )
+            for i in range(count)
+        ]
+        # Share one timestamp so pages must break ties on id
+        OfflineOrder.objects.filter(restaurant=restaurant).update(created_at=timezone.now())
+        return orders
+    
+    def test_list_pages_with_cursor(self, authenticated_client, test_restaurant):
+        """Following next links returns every order exactly once"""
+        orders = self._create_orders(test_restaurant, 5)
+        
+        seen = []
+        url = '/api/orders/?page_size=2'
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) <= 2
+            seen.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        
+        assert sorted(seen) == sorted(str(order.id) for order in orders)
+        assert len(seen) == len(set(seen))
+    
+    def test_list_rejects_invalid_cursor(self, authenticated_client):
+        response = authenticated_client.get('/api/orders/?cursor=not-a-cursor')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'cursor' in response.data['error']
+    
+    def test_list_loads_summary_columns(self, authenticated_client, test_restaurant):
+        """List rows are built from the summary columns without extra queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self._create_orders(test_restaurant, 3)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get('/api/orders/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 3
+        assert 'order_items' not in response.data['results'][0]
+        assert response.data['results'][0]['status_display'] == 'Pending'
+        order_queries = [query['sql'] for query in queries if 'offline_orders' in query['sql']]
+        assert len(order_queries) == 1
+        assert 'order_items' not in order_queries[0]
+    
+    def test_export_streams_ndjson(self, authenticated_client, test_restaurant):
+        """Export streams one JSON order summary per line"""
+        self._create_orders(test_restaurant, 3)
+        
+        response = authenticated_client.get('/api/orders/export/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert len(lines) == 3
+        assert {json.loads(line)['local_order_id'] for line in lines} == {'PAGE-0', 'PAGE-1', 'PAGE-2'}
+    
+    def test_active_board_endpoint(self, authenticated_client, test_restaurant):
+        """Active endpoint groups open orders by status and table"""
+        self._create_orders(test_restaurant, 2)
+        OfflineOrder.objects.filter(local_order_id='PAGE-1').update(order_status='COMPLETED')
+        
+        response = authenticated_client.get('/api/orders/active/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [order['local_order_id'] for order in response.data['statuses']['PENDING']] == ['PAGE-0']
+        
+        response = authenticated_client.get('/api/orders/active/?order_status=READY')
+        assert response.data['orders'] == []
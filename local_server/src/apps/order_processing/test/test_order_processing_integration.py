@@ -68,9 +68,11 @@ class TestOrderProcessingIntegration:
         assert order.order_status == 'COMPLETED'
         assert order.completed_at is not None
         
-        # 4. Verify sync queue entries were created for each update
-        sync_entries = SyncQueue.objects.filter(restaurant=test_restaurant)
-        assert sync_entries.count() >= 4  # At least one for create and each status update
+        # 4. Status updates are folded into the still-pending create entry
+        sync_entries = SyncQueue.objects.filter(restaurant=test_restaurant, status='PENDING')
+        assert sync_entries.count() == 1
+        assert sync_entries.get().payload['latest_status'] == 'COMPLETED'
+        assert sync_entries.get().payload['coalesced'] == 4
     
     def test_order_with_complex_modifiers(self, test_restaurant):
         """Test order creation with complex modifiers and special instructions"""
@@ -284,8 +286,8 @@ class TestOrderProcessingIntegration:
             'items': [{'id': '1', 'name': 'Recovery Test', 'price': '10.00', 'quantity': 1}]
         }
 
-        # First attempt (simulate failure in calculate_subtotal)
-        with patch.object(service, 'calculate_subtotal') as mock_calculate:
+        # First attempt (simulate failure in price_order)
+        with patch.object(service, 'price_order') as mock_calculate:
             mock_calculate.side_effect = Exception("Calculation error")
 
             result = service.create_offline_order(
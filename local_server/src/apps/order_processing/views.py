@@ -1,5 +1,8 @@
 #Mobile App API Endpoints
 
+import json
+
+from django.http import StreamingHttpResponse
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
@@ -7,31 +10,51 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 
+from .board import active_order_board
 from .models import OfflineOrder
+from .pagination import OrderKeysetPagination
 from .serializer import (
-    OrderCreateSerializer, OrderSerializer, OrderStatusUpdateSerializer,
-    OrderWithPaymentSerializer
+    OrderCreateSerializer, OrderBulkCreateSerializer, OrderSerializer,
+    OrderStatusUpdateSerializer, OrderBulkStatusUpdateSerializer,
+    OrderSummarySerializer, OrderWithPaymentSerializer
 )
-from .services import OrderProcessingService
+from .services import ORDER_SUMMARY_FIELDS, OrderProcessingService
 
 class OrderViewSet(ModelViewSet):
     """ViewSet for order operations"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['order_status', 'sync_status']
+    pagination_class = OrderKeysetPagination
     
     def get_queryset(self):
-        return OfflineOrder.objects.filter(
+        queryset = OfflineOrder.objects.filter(
             restaurant_id=self.request.user.restaurant_id
-        ).select_related('restaurant').order_by('-created_at')
+        ).order_by('-created_at', '-id')
+        if self.action == 'list':
+            # List rows skip the item and sync error columns
+            return queryset.only(*ORDER_SUMMARY_FIELDS)
+        return queryset.select_related('restaurant')
     
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
+        elif self.action == 'bulk_create':
+            return OrderBulkCreateSerializer
         elif self.action == 'update_status':
             return OrderStatusUpdateSerializer
+        elif self.action == 'bulk_update_status':
+            return OrderBulkStatusUpdateSerializer
+        elif self.action == 'list':
+            return OrderSummarySerializer
         return OrderSerializer
     
+    def get_serializer_context(self):
+        # Orders are priced against the user's restaurant menu while validating
+        context = super().get_serializer_context()
+        context['restaurant_id'] = getattr(self.request.user, 'restaurant_id', None)
+        return context
+    
     def create(self, request, *args, **kwargs):
         """Create a new order with validation"""
         serializer = self.get_serializer(data=request.data)
@@ -54,6 +77,44 @@ class OrderViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Create a batch of orders (e.g. tablet replay after reconnect)"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = OrderProcessingService()
+        result = service.create_offline_orders_bulk(
+            restaurant_id=request.user.restaurant_id,
+            orders_data=serializer.validated_data['orders']
+        )
+        
+        if 'results' not in result:
+            return Response(
+                {'error': result.get('error', 'Bulk order creation failed')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(
+            {
+                'created': result['created'],
+                'failed': result['failed'],
+                'results': [
+                    {
+                        'index': item['index'],
+                        'success': item['success'],
+                        'order_id': item.get('order_id'),
+                        'local_order_id': item.get('local_order_id'),
+                        'otp_code': item['otp_code']['otp_code'] if item.get('otp_code') else None,
+                        'total_amount': item.get('total_amount'),
+                        'error': item.get('error'),
+                    }
+                    for item in result['results']
+                ]
+            },
+            status=status.HTTP_201_CREATED if result['success'] else status.HTTP_400_BAD_REQUEST
+        )
+    
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         """Update order status"""
@@ -78,6 +139,34 @@ class OrderViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_update_status(self, request):
+        """Update status for many orders at once (e.g. KDS ticket bump)"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = OrderProcessingService()
+        result = service.update_orders_status_bulk(
+            order_ids=serializer.validated_data['order_ids'],
+            new_status=serializer.validated_data['status'],
+            notes=serializer.validated_data.get('notes', ''),
+            restaurant_id=request.user.restaurant_id
+        )
+        
+        if result['success'] and result['updated']:
+            return Response({
+                'updated': result['updated'],
+                'rejected': result['rejected']
+            })
+        else:
+            return Response(
+                {
+                    'error': result.get('error', 'Failed to update order status'),
+                    'rejected': result.get('rejected', [])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
     @action(detail=True, methods=['get'])
     def with_payment(self, request, pk=None):
         """Get order with payment status"""
@@ -94,4 +183,43 @@ class OrderViewSet(ModelViewSet):
             'payment': payment_status
         })
         return Response(serializer.data)
-
+    
+    @action(detail=False, methods=['get'])
+    def active(self, request):
+        """Open orders for kitchen and waiter screens, served from the board cache"""
+        restaurant_id = request.user.restaurant_id
+        status_filter = request.query_params.get('order_status')
+        table_id = request.query_params.get('table_id')
+        
+        board = active_order_board.get_board(restaurant_id)
+        
+        if status_filter or table_id:
+            return Response({
+                'version': board['version'],
+                'orders': active_order_board.filter_orders(board, status_filter, table_id)
+            })
+        
+        return Response({
+            'version': board['version'],
+            'statuses': {
+                order_status: [board['orders'][order_id] for order_id in order_ids]
+                for order_status, order_ids in board['statuses'].items()
+            },
+            'tables': board['tables']
+        })
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all orders as NDJSON (one order summary per line)"""
+        service = OrderProcessingService()
+        orders = service.iter_restaurant_orders(
+            restaurant_id=request.user.restaurant_id,
+            status=request.query_params.get('order_status')
+        )
+        
+        response = StreamingHttpResponse(
+            (json.dumps(order) + '\n' for order in orders),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = 'attachment; filename="orders.ndjson"'
+        return response
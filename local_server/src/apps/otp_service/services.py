@@ -54,7 +54,44 @@ class OTPService:
         except Exception as e:
             logger.error(f'Failed to generate OTP: {str(e)}', exc_info=True)
             raise
-    
+
+    def generate_otps_bulk(self, order_ids: list) -> dict:
+        #Generate OTPs for many orders with one revoke and one insert
+
+        try:
+            with transaction.atomic():
+                OTP.objects.filter(
+                    order_id__in=order_ids,
+                    status='ACTIVE'
+                ).update(status='REVOKED')
+
+                expires_at = timezone.now() + timedelta(minutes=self.expiry_minutes)
+
+                otps = [
+                    OTP(
+                        order_id=order_id,
+                        otp_code=''.join([str(secrets.randbelow(10)) for _ in range(6)]),
+                        expires_at=expires_at
+                    )
+                    for order_id in order_ids
+                ]
+                OTP.objects.bulk_create(otps)
+
+                logger.info(f'{len(otps)} OTPs generated in bulk')
+
+                return {
+                    str(otp.order_id): {
+                        'otp_code': otp.otp_code,
+                        'expires_at': expires_at,
+                        'otp_id': str(otp.id)
+                    }
+                    for otp in otps
+                }
+
+        except Exception as e:
+            logger.error(f'Failed to generate OTPs in bulk: {str(e)}', exc_info=True)
+            raise
+
     def verify_otp(self, order_id: str, otp_code: str) -> dict:
        #Verify OTP for order pickup
         
@@ -0,0 +1,184 @@
+"""
+Sync Coalescing
+Collapses pending order sync rows so each order has at most one pending push
+"""
+import logging
+from typing import Dict, List
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.models import SyncQueue
+from apps.order_processing.crdt import merge_clocks as merge_vector_clocks, merge_states
+
+logger = logging.getLogger('dineswift')
+
+
+def order_coalesce_key(order_id) -> str:
+    return f"order:{order_id}"
+
+
+class SyncCoalescer:
+    """
+    Queues ORDER_UPDATE sync rows, merging them into rows still pending.
+
+    While an order's ORDER_CREATE row is pending, status changes are folded
+    into it (the create push reads the order's current state). Otherwise
+    the change is merged into the order's pending ORDER_UPDATE row, keeping
+    the first previous_status, the latest new_status and the merged vector
+    clock. Older duplicate pending rows are merged and cancelled, and so
+    are FAILED update rows waiting for a retry, which would otherwise be
+    pushed after the newer change. Queued rows are locked while merging so
+    a sync worker never reads a half merged payload.
+    """
+
+    def queue_order_updates(self, updates: List[dict]) -> Dict[str, int]:
+        """
+        Queue status updates; each dict carries restaurant_id,
+        local_order_id, previous_status, new_status, notes, timestamp and
+        vector_clock. Returns counts of created, merged and folded rows.
+        """
+        counts = {'created': 0, 'merged': 0, 'folded': 0}
+        if not updates:
+            return counts
+
+        keys = {order_coalesce_key(update['local_order_id']) for update in updates}
+
+        with transaction.atomic():
+            queued = SyncQueue.objects.select_for_update().filter(
+                Q(status='PENDING') | Q(status='FAILED', sync_type='ORDER_UPDATE'),
+                coalesce_key__in=keys,
+                sync_type__in=('ORDER_CREATE', 'ORDER_UPDATE')
+            ).order_by('created_at')
+
+            creates: Dict[str, SyncQueue] = {}
+            targets: Dict[str, SyncQueue] = {}
+            # Failed updates with no pending row yet; merged into the new row
+            carried: Dict[str, dict] = {}
+            superseded: Dict[str, List[SyncQueue]] = {}
+
+            for row in queued:
+                key = row.coalesce_key
+                if row.sync_type == 'ORDER_CREATE':
+                    creates.setdefault(key, row)
+                elif key in targets:
+                    # Legacy duplicates: fold into the oldest pending update
+                    target = targets[key]
+                    target.payload = self._merge_update(target.payload, row.payload)
+                    superseded.setdefault(key, []).append(row)
+                elif row.status == 'FAILED':
+                    carried[key] = (
+                        self._merge_update(carried[key], row.payload) if key in carried else row.payload
+                    )
+                    superseded.setdefault(key, []).append(row)
+                else:
+                    if key in carried:
+                        row.payload = self._merge_update(carried.pop(key), row.payload)
+                    targets[key] = row
+
+            changed = {}
+            new_rows = []
+
+            for update in updates:
+                key = order_coalesce_key(update['local_order_id'])
+                payload = self._update_payload(update)
+
+                if key in creates:
+                    row = creates[key]
+                    row.payload = self._fold_into_create(row.payload, payload)
+                    changed[row.id] = row
+                    counts['folded'] += 1
+                elif key in targets:
+                    row = targets[key]
+                    row.payload = self._merge_update(row.payload, payload)
+                    changed[row.id] = row
+                    counts['merged'] += 1
+                else:
+                    if key in carried:
+                        payload = self._merge_update(carried.pop(key), payload)
+                    row = SyncQueue(
+                        restaurant_id=update['restaurant_id'],
+                        sync_type='ORDER_UPDATE',
+                        coalesce_key=key,
+                        payload=payload
+                    )
+                    targets[key] = row
+                    new_rows.append(row)
+                    counts['created'] += 1
+
+            for key, rows in superseded.items():
+                if key not in targets:
+                    # Folded into a pending create instead
+                    continue
+                for row in rows:
+                    row.status = 'CANCELLED'
+                    row.error_message = f'Superseded by {targets[key].id}'
+                    changed[row.id] = row
+
+            # Rows created in this batch are inserted with their final payload
+            new_ids = {row.id for row in new_rows}
+            to_update = [row for row_id, row in changed.items() if row_id not in new_ids]
+
+            if to_update:
+                current_time = timezone.now()
+                for row in to_update:
+                    row.updated_at = current_time
+                SyncQueue.objects.bulk_update(to_update, ['payload', 'status', 'error_message', 'updated_at'])
+            if new_rows:
+                SyncQueue.objects.bulk_create(new_rows)
+
+        if counts['merged'] or counts['folded']:
+            logger.debug(
+                f"Coalesced order updates: {counts['created']} queued, "
+                f"{counts['merged']} merged, {counts['folded']} folded into creates"
+            )
+
+        return counts
+
+    def _update_payload(self, update: dict) -> dict:
+        return {
+            'local_order_id': str(update['local_order_id']),
+            'previous_status': update.get('previous_status'),
+            'new_status': update['new_status'],
+            'updates': {'status': update['new_status']},
+            'notes': update.get('notes', ''),
+            'timestamp': update['timestamp'],
+            'vector_clock': update.get('vector_clock') or {},
+            'delta': update.get('delta'),
+            'coalesced': 1,
+        }
+
+    def _merge_update(self, existing: dict, incoming: dict) -> dict:
+        """Merge a newer ORDER_UPDATE payload into an older one"""
+        notes = [note for note in (existing.get('notes'), incoming.get('notes')) if note]
+
+        return {
+            **existing,
+            **incoming,
+            'previous_status': existing.get('previous_status', incoming.get('previous_status')),
+            'updates': {**existing.get('updates', {}), **incoming.get('updates', {})},
+            'notes': '\n'.join(notes),
+            'vector_clock': merge_vector_clocks(existing.get('vector_clock'), incoming.get('vector_clock')),
+            'delta': self._merge_deltas(existing.get('delta'), incoming.get('delta')),
+            'coalesced': existing.get('coalesced', 1) + incoming.get('coalesced', 1),
+        }
+
+    def _merge_deltas(self, existing: dict, incoming: dict) -> dict:
+        # Deltas are CRDT states, so joining them is safe in any order
+        if existing is None or incoming is None:
+            return incoming if existing is None else existing
+        return merge_states(existing, incoming)
+
+    def _fold_into_create(self, existing: dict, incoming: dict) -> dict:
+        """Record a status change on a still-pending ORDER_CREATE row"""
+        return {
+            **existing,
+            'latest_status': incoming['new_status'],
+            'vector_clock': merge_vector_clocks(existing.get('vector_clock'), incoming.get('vector_clock')),
+            'coalesced': existing.get('coalesced', 0) + 1,
+        }
+
+
+# Coalescer instance
+sync_coalescer = SyncCoalescer()
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:46
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0003_syncqueue_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCursor',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sync_version', models.IntegerField(default=0)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('table_name', models.CharField(max_length=100)),
+                ('last_updated_at', models.CharField(blank=True, max_length=64)),
+                ('last_id', models.CharField(blank=True, max_length=64)),
+                ('rows_pulled', models.BigIntegerField(default=0)),
+                ('last_pulled_at', models.DateTimeField(blank=True, null=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.restaurant')),
+            ],
+            options={
+                'db_table': 'sync_cursors',
+                'unique_together': {('restaurant', 'table_name')},
+            },
+        ),
+    ]
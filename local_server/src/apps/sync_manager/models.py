@@ -4,4 +4,29 @@ Note: Main sync models are in apps.core.models (SyncQueue)
 This file can contain sync-specific helper models
 """
 
+import uuid
+
 from django.db import models
+
+from apps.core.models import TimeStampedModel, Restaurant
+
+
+class SyncCursor(TimeStampedModel):
+    """High-water mark of pull replication for one Supabase table and restaurant"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    table_name = models.CharField(max_length=100)
+    
+    # Last applied row, ordered by (updated_at, id)
+    last_updated_at = models.CharField(max_length=64, blank=True)  # Remote timestamp, verbatim
+    last_id = models.CharField(max_length=64, blank=True)
+    
+    rows_pulled = models.BigIntegerField(default=0)
+    last_pulled_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'sync_cursors'
+        unique_together = [['restaurant', 'table_name']]
+    
+    def __str__(self):
+        return f"{self.table_name} cursor for {self.restaurant_id}: {self.last_updated_at}"
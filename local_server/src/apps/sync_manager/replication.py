@@ -0,0 +1,330 @@
+"""
+Pull Replication
+Incremental cloud-to-local replication driven by per-table change cursors
+"""
+import logging
+import uuid
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.models import Restaurant
+from apps.core.services.supabase_client import supabase_client
+from apps.order_processing.board import active_order_board
+from apps.order_processing.broadcast import order_broadcaster
+from apps.order_processing.crdt import ORDER_FIELDS, OrderCRDT, empty_state, merge_clocks, merge_states
+from apps.order_processing.models import OfflineOrder, OrderCRDTState
+from apps.payment.models import Payment
+from .models import SyncCursor
+
+logger = logging.getLogger('dineswift')
+
+# Remote statuses outside the local order lifecycle
+REMOTE_ORDER_STATUSES = {
+    'DELIVERED': 'COMPLETED',
+    'IN_DELIVERY': 'READY',
+}
+
+# Supabase column -> local order field
+REMOTE_ORDER_FIELDS = {
+    'status': 'order_status',
+    'special_instructions': 'special_instructions',
+    'table_id': 'table_id',
+    'total_amount': 'total_amount',
+    'tax_amount': 'tax_amount',
+}
+
+
+class PullReplicator:
+    """
+    Pulls rows changed in Supabase since each table's cursor.
+
+    For every (restaurant, table) the cursor holds the (updated_at, id) of
+    the last applied row. Changed rows are fetched oldest first in pages;
+    each page is applied in bulk and the cursor is advanced in the same
+    transaction, so a crash re-applies at most one page and applying is
+    idempotent. The page transaction locks the cursor row and checks it
+    has not moved since the page was fetched, so overlapping runs never
+    move a cursor backwards.
+    """
+
+    def __init__(self):
+        self.supabase = supabase_client
+        # Remote edits enter the CRDT as the cloud replica
+        self.cloud = OrderCRDT('cloud')
+        self.appliers: Dict[str, Callable] = {
+            'orders': self._apply_orders,
+            'payments': self._apply_payments,
+        }
+
+    def pull_all(self) -> Dict[str, int]:
+        """Pull every replicated table for every active restaurant"""
+        totals = {table: 0 for table in self.appliers}
+        for restaurant in Restaurant.objects.filter(is_active=True):
+            for table in self.appliers:
+                # One bad table or restaurant must not hold back the others
+                try:
+                    totals[table] += self.pull_table(restaurant, table)
+                except Exception as e:
+                    logger.error(
+                        f"Pull of {table} failed for restaurant {restaurant.id}: {str(e)}",
+                        exc_info=True
+                    )
+        return totals
+
+    def pull_table(self, restaurant: Restaurant, table: str) -> int:
+        """Pull one table for one restaurant; returns the number of rows applied"""
+        config = settings.SYNC_CONFIG
+        page_size = config['pull_page_size']
+        cursor, _ = SyncCursor.objects.get_or_create(restaurant=restaurant, table_name=table)
+
+        pulled = 0
+        for _ in range(config['pull_max_pages']):
+            rows = self.supabase.fetch_changes(
+                table,
+                str(restaurant.supabase_restaurant_id),
+                updated_after=cursor.last_updated_at or None,
+                after_id=cursor.last_id or None,
+                limit=page_size
+            )
+            if rows is None:
+                break  # Failure already logged; resume from the checkpoint next run
+
+            if rows:
+                with transaction.atomic():
+                    position = (cursor.last_updated_at, cursor.last_id)
+                    cursor = SyncCursor.objects.select_for_update(skip_locked=True).filter(
+                        id=cursor.id
+                    ).first()
+                    # Another run holds the cursor or already moved it past
+                    # this page; leave the rest to that run
+                    if cursor is None or (cursor.last_updated_at, cursor.last_id) != position:
+                        logger.info(f"Pull of {table} for restaurant {restaurant.id} overtaken by another run")
+                        break
+
+                    self.appliers[table](restaurant, rows)
+                    # Checkpoint with the page it covers
+                    cursor.last_updated_at = rows[-1]['updated_at']
+                    cursor.last_id = str(rows[-1]['id'])
+                    cursor.rows_pulled += len(rows)
+                    cursor.last_pulled_at = timezone.now()
+                    cursor.save()
+                pulled += len(rows)
+
+            if len(rows) < page_size:
+                break
+
+        if pulled:
+            logger.info(f"Pulled {pulled} {table} rows for restaurant {restaurant.id}")
+        return pulled
+
+    # ------------------------------------------------------------------
+    # Appliers
+    # ------------------------------------------------------------------
+
+    def _remote_order_values(self, row: dict) -> dict:
+        values = {}
+        for column, field in REMOTE_ORDER_FIELDS.items():
+            if column not in row:
+                continue
+            value = row[column]
+            if field == 'order_status':
+                value = str(value or '').upper()
+                value = REMOTE_ORDER_STATUSES.get(value, value)
+                if value not in dict(OfflineOrder.STATUS_CHOICES):
+                    continue
+            values[field] = value
+        return values
+
+    @staticmethod
+    def _same_value(local, remote) -> bool:
+        if local is None or remote is None:
+            return local is None and remote is None
+        if isinstance(local, Decimal):
+            try:
+                return local == Decimal(str(remote))
+            except InvalidOperation:
+                return False
+        return str(local) == str(remote)
+
+    def _apply_orders(self, restaurant: Restaurant, rows: List[dict]):
+        """Upsert remote orders, merging field changes through the order CRDT"""
+        remote_ids = [str(row['id']) for row in rows]
+        local_ids = [row['local_order_id'] for row in rows if row.get('local_order_id')]
+
+        existing = OfflineOrder.objects.filter(restaurant=restaurant, supabase_order_id__in=remote_ids)
+        if local_ids:
+            existing = existing | OfflineOrder.objects.filter(restaurant=restaurant, local_order_id__in=local_ids)
+        by_remote_id = {}
+        by_local_id = {}
+        for order in existing:
+            if order.supabase_order_id:
+                by_remote_id[str(order.supabase_order_id)] = order
+            by_local_id[order.local_order_id] = order
+
+        states = {
+            state.order_id: state
+            for state in OrderCRDTState.objects.filter(
+                order_id__in=[order.id for order in by_local_id.values()]
+            )
+        }
+
+        current_time = timezone.now()
+        changed_orders = {}
+        changed_states = {}
+        previous_statuses = {}
+        new_orders = []
+
+        for row in rows:
+            values = self._remote_order_values(row)
+            order = by_remote_id.get(str(row['id'])) or by_local_id.get(row.get('local_order_id'))
+
+            if order is None:
+                order = OfflineOrder(
+                    restaurant=restaurant,
+                    local_order_id=row.get('local_order_id') or f"CLOUD-{str(row['id'])[:8].upper()}",
+                    supabase_order_id=row['id'],
+                    customer_id=row.get('customer_id'),
+                    order_items=row.get('items') or [],
+                    sync_status='SYNCED',
+                    **{'total_amount': 0, 'tax_amount': 0, **values}
+                )
+                new_orders.append(order)
+                by_remote_id[str(row['id'])] = order
+                by_local_id[order.local_order_id] = order
+                continue
+
+            if order in new_orders:
+                for field, value in values.items():
+                    setattr(order, field, value)
+                continue
+
+            # Only fields that differ become remote registers; echoes of our
+            # own pushes change nothing
+            remote_changes = {
+                field: value for field, value in values.items()
+                if not self._same_value(getattr(order, field), value)
+            }
+            if not order.supabase_order_id:
+                order.supabase_order_id = row['id']
+                changed_orders[order.id] = order
+            if not remote_changes:
+                continue
+            previous_statuses.setdefault(order.id, order.order_status)
+
+            state = states.get(order.id)
+            if state is None:
+                state = OrderCRDTState(
+                    order=order,
+                    vector_clock={},
+                    state={},
+                    last_operation='PULL',
+                    operation_timestamp=current_time
+                )
+                states[order.id] = state
+            local_state = state.state or empty_state(state.vector_clock)
+            _, remote_delta = self.cloud.set_fields(local_state, remote_changes, row.get('updated_at') or current_time)
+
+            merged = merge_states(local_state, remote_delta)
+            for field, register in merged['fields'].items():
+                if field in remote_changes and register['node'] == 'cloud':
+                    setattr(order, field, register['value'])
+                    changed_orders[order.id] = order
+
+            state.state = merged
+            state.vector_clock = merged['clock']
+            state.acked_clock = merge_clocks(state.acked_clock or {}, remote_delta['clock'])
+            state.last_operation = 'PULL'
+            state.operation_timestamp = current_time
+            state.updated_at = current_time
+            changed_states[order.id] = state
+
+        if new_orders:
+            OfflineOrder.objects.bulk_create(new_orders)
+            crdt_states = []
+            for order in new_orders:
+                crdt_state = self.cloud.initial_state(order, current_time)
+                crdt_states.append(OrderCRDTState(
+                    order=order,
+                    vector_clock=crdt_state['clock'],
+                    state=crdt_state,
+                    acked_clock=crdt_state['clock'],
+                    last_operation='PULL',
+                    operation_timestamp=current_time
+                ))
+            OrderCRDTState.objects.bulk_create(crdt_states)
+
+        if changed_orders:
+            for order in changed_orders.values():
+                order.updated_at = current_time
+            OfflineOrder.objects.bulk_update(
+                list(changed_orders.values()),
+                ['supabase_order_id', 'updated_at', *ORDER_FIELDS]
+            )
+
+        if changed_states:
+            to_create = [state for state in changed_states.values() if state._state.adding]
+            to_update = [state for state in changed_states.values() if not state._state.adding]
+            if to_create:
+                OrderCRDTState.objects.bulk_create(to_create)
+            if to_update:
+                OrderCRDTState.objects.bulk_update(
+                    to_update,
+                    ['state', 'vector_clock', 'acked_clock', 'last_operation', 'operation_timestamp', 'updated_at']
+                )
+
+        touched = new_orders + list(changed_orders.values())
+        if touched:
+            active_order_board.on_commit_upsert(restaurant.id, touched)
+
+        # Screens learn about cloud-side orders and status changes too
+        events = [order_broadcaster.created_event(order) for order in new_orders] + [
+            order_broadcaster.status_event(order, previous_statuses[order.id], order.order_status, current_time)
+            for order in changed_orders.values()
+            if order.id in previous_statuses and order.order_status != previous_statuses[order.id]
+        ]
+        if events:
+            order_broadcaster.on_commit_publish(restaurant.id, events)
+
+    def _apply_payments(self, restaurant: Restaurant, rows: List[dict]):
+        """Copy remote payment status onto local payments (remote-only payments are skipped)"""
+        def local_id(row):
+            value = row.get('payment_id') or row.get('id')
+            try:
+                return uuid.UUID(str(value))
+            except ValueError:
+                return None
+
+        rows_by_id = {local_id(row): row for row in rows if local_id(row)}
+        payments = list(Payment.objects.filter(restaurant=restaurant, id__in=rows_by_id.keys()))
+
+        current_time = timezone.now()
+        changed = []
+        for payment in payments:
+            row = rows_by_id[payment.id]
+            status = str(row.get('status') or payment.status).upper()
+            if status not in dict(Payment.STATUS_CHOICES):
+                status = payment.status
+
+            if status == payment.status and (row.get('gateway_reference') or '') == (payment.gateway_reference or ''):
+                continue
+
+            payment.status = status
+            payment.gateway_reference = row.get('gateway_reference') or payment.gateway_reference
+            if row.get('completed_at') and not payment.completed_at:
+                payment.completed_at = parse_datetime(row['completed_at'])
+            payment.updated_at = current_time
+            changed.append(payment)
+
+        if changed:
+            Payment.objects.bulk_update(
+                changed, ['status', 'gateway_reference', 'completed_at', 'updated_at']
+            )
+
+
+# Replicator instance
+pull_replicator = PullReplicator()
@@ -2,14 +2,19 @@
 
 
 import logging
-from typing import Optional, Dict
+import uuid
+from typing import Optional, Dict, List, Tuple
 from django.utils import timezone
 from django.db import transaction
 from django.conf import settings
 
 from apps.core.models import SyncQueue, ActivityLog
 from apps.core.services.supabase_client import supabase_client
-from apps.order_processing.models import OfflineOrder
+from apps.order_processing.crdt import (
+    ORDER_FIELDS, compare_clocks, delta_since, empty_state, item_values,
+    merge_clocks, merge_states, supabase_updates
+)
+from apps.order_processing.models import OfflineOrder, OrderCRDTState
 
 logger = logging.getLogger('dineswift')
 
@@ -20,15 +25,22 @@ class SyncManager:
     def __init__(self):
         self.supabase = supabase_client
         self.max_retries = settings.SYNC_CONFIG['max_retries']
+        self.lease_seconds = settings.SYNC_CONFIG['lease_seconds']
     
     @transaction.atomic
     def process_sync_item(self, sync_item: SyncQueue) -> bool:
         #Process a single sync queue item
        
         try:
-            # Mark as processing
-            sync_item.status = 'PROCESSING'
-            sync_item.save(update_fields=['status'])
+            if sync_item.leased_by:
+                # Extend the lease for this push; the row stays locked until commit
+                if sync_item.id not in SyncQueue.objects.renew_leases([sync_item], self.lease_seconds):
+                    logger.warning(f'Sync item {sync_item.id} lease lost, skipping')
+                    return False
+            else:
+                # Mark as processing
+                sync_item.status = 'PROCESSING'
+                sync_item.save(update_fields=['status'])
             
             # Route to appropriate handler
             if sync_item.sync_type == 'ORDER_CREATE':
@@ -40,19 +52,7 @@ class SyncManager:
                 success = False
             
             if success:
-                sync_item.status = 'COMPLETED'
-                sync_item.save()
-                
-                ActivityLog.objects.create(
-                    restaurant_id=sync_item.restaurant_id,
-                    level='INFO',
-                    module='SYNC_MANAGER',
-                    action='SYNC_COMPLETED',
-                    details={
-                        'sync_id': str(sync_item.id),
-                        'sync_type': sync_item.sync_type,
-                    }
-                )
+                success = self._complete_sync_item(sync_item)
             else:
                 self._handle_sync_failure(sync_item, 'Sync operation failed')
             
@@ -78,18 +78,7 @@ class SyncManager:
             order = OfflineOrder.objects.get(id=order_id)
             
             # Prepare data for Supabase
-            supabase_data = {
-                'local_order_id': order.local_order_id,
-                'restaurant_id': str(order.restaurant.supabase_restaurant_id),
-                'table_id': str(order.table_id) if order.table_id else None,
-                'customer_id': str(order.customer_id) if order.customer_id else None,
-                'items': order.order_items,
-                'total_amount': float(order.total_amount),
-                'tax_amount': float(order.tax_amount),
-                'status': order.order_status,
-                'special_instructions': order.special_instructions,
-                'created_at': order.created_at.isoformat(),
-            }
+            supabase_data = self._order_payload(order)
             
             # Sync to Supabase
             supabase_id = self.supabase.sync_order(supabase_data)
@@ -107,34 +96,329 @@ class SyncManager:
             
         except OfflineOrder.DoesNotExist:
             logger.error(f'Order not found: {order_id}')
-            sync_item.status = 'CANCELLED'
-            sync_item.save()
+            sync_item.update_leased(release=False, status='CANCELLED')
             return False
         except Exception as e:
             logger.error(f'Order create sync failed: {str(e)}', exc_info=True)
             return False
     
+    def _order_payload(self, order: OfflineOrder) -> Dict:
+        #Supabase row for a local order
+        
+        return {
+            'local_order_id': order.local_order_id,
+            'restaurant_id': str(order.restaurant.supabase_restaurant_id),
+            'table_id': str(order.table_id) if order.table_id else None,
+            'customer_id': str(order.customer_id) if order.customer_id else None,
+            'items': order.order_items,
+            'total_amount': float(order.total_amount),
+            'tax_amount': float(order.tax_amount),
+            'status': order.order_status,
+            'special_instructions': order.special_instructions,
+            'created_at': order.created_at.isoformat(),
+        }
+    
+    def process_batch(self, sync_items: List[SyncQueue]) -> Tuple[int, int]:
+        #Process claimed items, pushing ORDER_CREATEs in chunked upserts
+        #Returns (synced, failed)
+        
+        creates = [item for item in sync_items if item.sync_type == 'ORDER_CREATE']
+        others = [item for item in sync_items if item.sync_type != 'ORDER_CREATE']
+        
+        synced_count = 0
+        failed_count = 0
+        
+        if creates:
+            try:
+                synced_count, failed_count = self._batch_sync_order_creates(creates)
+            except Exception as e:
+                logger.error(f'Batch order sync failed: {str(e)}', exc_info=True)
+                # Items not yet written back are still PROCESSING
+                for item in creates:
+                    if item.status == 'PROCESSING':
+                        self._handle_sync_failure(item, str(e))
+                        failed_count += 1
+        
+        updates = [item for item in others if item.sync_type == 'ORDER_UPDATE']
+        if updates:
+            synced, failed = self._sync_order_updates_concurrently(updates)
+            synced_count += synced
+            failed_count += failed
+        
+        for item in others:
+            if item.sync_type == 'ORDER_UPDATE':
+                continue
+            if self.process_sync_item(item):
+                synced_count += 1
+            else:
+                failed_count += 1
+        
+        return synced_count, failed_count
+    
+    def _sync_order_updates_concurrently(self, sync_items: List[SyncQueue]) -> Tuple[int, int]:
+        #Push ORDER_UPDATE rows as concurrent PATCHes over the pooled transport
+        #Returns (synced, failed)
+        
+        orders = OfflineOrder.objects.select_related('restaurant').in_bulk(
+            [item.payload.get('local_order_id') for item in sync_items
+             if self._is_uuid(item.payload.get('local_order_id'))]
+        )
+        orders = {str(order_id): order for order_id, order in orders.items()}
+        
+        pushable = []
+        failed_count = 0
+        for item in sync_items:
+            order = orders.get(str(item.payload.get('local_order_id')))
+            supabase_order_id = item.payload.get('supabase_order_id') or (order.supabase_order_id if order else None)
+            if order is None or not supabase_order_id:
+                logger.warning('No Supabase order ID for update')
+                self._handle_sync_failure(item, 'Sync operation failed')
+                failed_count += 1
+                continue
+            pushable.append((item, order, str(supabase_order_id), self._update_fields(item.payload, order)))
+        
+        # Items another worker took over while this batch waited are not pushed
+        held = SyncQueue.objects.renew_leases([entry[0] for entry in pushable], self.lease_seconds)
+        pushable = [entry for entry in pushable if entry[0].id in held]
+        
+        results = list(self.supabase.run_concurrently(
+            self.supabase.update_order_async(
+                str(order.restaurant.supabase_restaurant_id), supabase_order_id, updates
+            )
+            for _, order, supabase_order_id, updates in pushable
+        ) or [])
+        results += [False] * (len(pushable) - len(results))
+        
+        synced_count = 0
+        acked = {}
+        for (item, order, _, _), result in zip(pushable, results):
+            if result is True:
+                with transaction.atomic():
+                    if not self._complete_sync_item(item):
+                        continue
+                    order.sync_status = 'SYNCED'
+                    order.save(update_fields=['sync_status'])
+                if item.payload.get('delta'):
+                    acked[order.id] = item.payload['delta']['clock']
+                synced_count += 1
+            else:
+                error = str(result) if isinstance(result, Exception) else 'Sync operation failed'
+                self._handle_sync_failure(item, error)
+                failed_count += 1
+        
+        self._ack_clocks(acked)
+        return synced_count, failed_count
+    
+    def _update_fields(self, payload: Dict, order: OfflineOrder) -> Dict:
+        #Supabase columns to PATCH for an ORDER_UPDATE row
+        #Rows carrying a CRDT delta send only the fields Supabase has not acknowledged
+        
+        delta = payload.get('delta')
+        if delta:
+            updates = supabase_updates(delta, items=order.order_items)
+            if updates:
+                return updates
+        return payload.get('updates') or {'status': payload.get('new_status')}
+    
+    def _ack_clocks(self, clocks: Dict):
+        #Record the clocks Supabase has acknowledged, keyed by order id
+        
+        if not clocks:
+            return
+        
+        current_time = timezone.now()
+        states = list(OrderCRDTState.objects.filter(order_id__in=clocks.keys()))
+        for state in states:
+            state.acked_clock = merge_clocks(state.acked_clock, clocks[state.order_id])
+            state.updated_at = current_time
+        OrderCRDTState.objects.bulk_update(states, ['acked_clock', 'updated_at'])
+    
+    def _complete_sync_item(self, sync_item: SyncQueue) -> bool:
+        #Mark an item done; False if its lease was lost and the result dropped
+        
+        if not sync_item.update_leased(status='COMPLETED', supabase_id=sync_item.supabase_id):
+            logger.warning(f'Sync item {sync_item.id} lease lost, dropping result')
+            return False
+        
+        ActivityLog.objects.create(
+            restaurant_id=sync_item.restaurant_id,
+            level='INFO',
+            module='SYNC_MANAGER',
+            action='SYNC_COMPLETED',
+            details={
+                'sync_id': str(sync_item.id),
+                'sync_type': sync_item.sync_type,
+            }
+        )
+        return True
+    
+    @staticmethod
+    def _is_uuid(value) -> bool:
+        try:
+            uuid.UUID(str(value))
+            return True
+        except ValueError:
+            return False
+    
+    def _batch_sync_order_creates(self, sync_items: List[SyncQueue]) -> Tuple[int, int]:
+        #Push many new orders with one upsert per chunk
+        
+        chunk_size = settings.SYNC_CONFIG['push_chunk_size']
+        items_by_order = {}
+        for item in sync_items:
+            try:
+                order_id = str(uuid.UUID(str(item.payload.get('local_order_id'))))
+            except ValueError:
+                order_id = None
+            items_by_order.setdefault(order_id, []).append(item)
+        
+        orders = OfflineOrder.objects.filter(
+            id__in=[order_id for order_id in items_by_order if order_id]
+        ).select_related('restaurant')
+        orders_by_id = {str(order.id): order for order in orders}
+        
+        # Items whose order no longer exists cannot be synced
+        missing = [
+            item for order_id, items in items_by_order.items()
+            if order_id not in orders_by_id for item in items
+        ]
+        for item in missing:
+            logger.error(f"Order not found: {item.payload.get('local_order_id')}")
+            item.update_leased(status='CANCELLED')
+        
+        # Group by restaurant; each push carries its own restaurant header
+        orders_by_restaurant = {}
+        for order in orders_by_id.values():
+            orders_by_restaurant.setdefault(order.restaurant_id, []).append(order)
+        
+        synced_count = 0
+        failed_count = len(missing)
+        
+        for restaurant_orders in orders_by_restaurant.values():
+            restaurant_id = str(restaurant_orders[0].restaurant.supabase_restaurant_id)
+            
+            for start in range(0, len(restaurant_orders), chunk_size):
+                chunk = restaurant_orders[start:start + chunk_size]
+                
+                # Renew before each push so a long batch never outlives its
+                # lease; orders whose items were taken over are left out
+                held = SyncQueue.objects.renew_leases(
+                    [item for order in chunk for item in items_by_order[str(order.id)]],
+                    self.lease_seconds
+                )
+                for order in chunk:
+                    items_by_order[str(order.id)] = [
+                        item for item in items_by_order[str(order.id)] if item.id in held
+                    ]
+                chunk = [order for order in chunk if items_by_order[str(order.id)]]
+                if not chunk:
+                    continue
+                
+                # Clocks read before the push: everything up to them is in the rows sent
+                clocks = dict(
+                    OrderCRDTState.objects.filter(
+                        order_id__in=[order.id for order in chunk]
+                    ).values_list('order_id', 'vector_clock')
+                )
+                rows = self.supabase.batch_sync_orders(
+                    restaurant_id, [self._order_payload(order) for order in chunk]
+                )
+                supabase_ids = {row.get('local_order_id'): row.get('id') for row in rows or []}
+                
+                pushed_orders = []
+                
+                for order in chunk:
+                    supabase_id = supabase_ids.get(order.local_order_id)
+                    order_items = items_by_order[str(order.id)]
+                    
+                    if not supabase_id:
+                        for item in order_items:
+                            self._handle_sync_failure(item, 'Batch upsert returned no row')
+                        failed_count += len(order_items)
+                        continue
+                    
+                    order.supabase_order_id = supabase_id
+                    order.sync_status = 'SYNCED'
+                    order.updated_at = timezone.now()
+                    pushed_orders.append(order)
+                
+                if pushed_orders:
+                    with transaction.atomic():
+                        # Write back only items whose lease is still ours; the
+                        # rows stay locked until commit
+                        held = SyncQueue.objects.held_leases(
+                            [item for order in pushed_orders for item in items_by_order[str(order.id)]]
+                        )
+                        synced_orders = []
+                        completed_items = []
+                        for order in pushed_orders:
+                            order_items = [item for item in items_by_order[str(order.id)] if item.id in held]
+                            if not order_items:
+                                logger.warning(f'Order {order.local_order_id} lease lost, dropping result')
+                                continue
+                            synced_orders.append(order)
+                            for item in order_items:
+                                item.status = 'COMPLETED'
+                                item.supabase_id = order.supabase_order_id
+                                item.updated_at = order.updated_at
+                                item.leased_by = ''
+                                item.lease_expires_at = None
+                                completed_items.append(item)
+                        
+                        OfflineOrder.objects.bulk_update(
+                            synced_orders, ['supabase_order_id', 'sync_status', 'updated_at']
+                        )
+                        SyncQueue.objects.bulk_update(
+                            completed_items,
+                            ['status', 'supabase_id', 'leased_by', 'lease_expires_at', 'updated_at']
+                        )
+                        self._ack_clocks({
+                            order.id: clocks[order.id] for order in synced_orders if order.id in clocks
+                        })
+                        if synced_orders:
+                            ActivityLog.objects.create(
+                                restaurant_id=chunk[0].restaurant_id,
+                                level='INFO',
+                                module='SYNC_MANAGER',
+                                action='SYNC_BATCH_COMPLETED',
+                                details={
+                                    'sync_type': 'ORDER_CREATE',
+                                    'orders': len(synced_orders),
+                                }
+                            )
+                    synced_count += len(completed_items)
+        
+        logger.info(f'Batch order sync: {synced_count} synced, {failed_count} failed')
+        return synced_count, failed_count
+    
     def _sync_order_update(self, sync_item: SyncQueue) -> bool:
       # Sync order updates to Supabase
        
         try:
             payload = sync_item.payload
             order_id = payload.get('local_order_id')
-            supabase_order_id = payload.get('supabase_order_id')
-            updates = payload.get('updates', {})
+            order = OfflineOrder.objects.get(id=order_id)
+            
+            # Coalesced rows carry the latest state of every field changed
+            # while the order was offline
+            supabase_order_id = payload.get('supabase_order_id') or order.supabase_order_id
+            updates = self._update_fields(payload, order)
             
             if not supabase_order_id:
                 logger.warning('No Supabase order ID for update')
                 return False
             
             # Update in Supabase
-            success = self.supabase.update_order(supabase_order_id, updates)
+            success = self.supabase.update_order(
+                str(order.restaurant.supabase_restaurant_id), str(supabase_order_id), updates
+            )
             
             if success:
                 # Update local status
-                order = OfflineOrder.objects.get(id=order_id)
                 order.sync_status = 'SYNCED'
                 order.save(update_fields=['sync_status'])
+                if payload.get('delta'):
+                    self._ack_clocks({order.id: payload['delta']['clock']})
             
             return success
             
@@ -145,7 +429,15 @@ class SyncManager:
     def _handle_sync_failure(self, sync_item: SyncQueue, error_msg: str):
         #Handle sync failure with retry logic
        
-        sync_item.mark_retry(error_msg)
+        # Failures while the circuit is open are the outage, not the item:
+        # put it back without spending a retry or writing a log row
+        if self.supabase.circuit_open():
+            sync_item.update_leased(status='PENDING')
+            return
+        
+        if not sync_item.mark_retry(error_msg):
+            logger.warning(f'Sync item {sync_item.id} lease lost, dropping failure')
+            return
         
         ActivityLog.objects.create(
             restaurant_id=sync_item.restaurant_id,
@@ -161,11 +453,15 @@ class SyncManager:
         )
     
     def resolve_conflict(self, sync_item: SyncQueue) -> bool:
-        #Resolve sync conflict using last-write-wins strategy
+        #Resolve sync conflict: merge the remote CRDT delta locally when the
+        #conflict carries one, otherwise fall back to last-write-wins
         
         try:
             # Get conflict data
             conflict_data = sync_item.conflict_data
+            if conflict_data.get('remote_delta'):
+                return self._merge_remote_delta(sync_item)
+            
             local_version = conflict_data.get('local_version')
             remote_version = conflict_data.get('remote_version')
             
@@ -188,6 +484,61 @@ class SyncManager:
             logger.error(f'Conflict resolution failed: {str(e)}', exc_info=True)
             return False
     
+    @transaction.atomic
+    def _merge_remote_delta(self, sync_item: SyncQueue) -> bool:
+        #Join the remote delta into the local CRDT state without fetching the remote order
+        
+        remote_delta = sync_item.conflict_data['remote_delta']
+        order = OfflineOrder.objects.select_for_update().get(id=sync_item.payload.get('local_order_id'))
+        state, _ = OrderCRDTState.objects.get_or_create(
+            order=order,
+            defaults={
+                'vector_clock': {},
+                'last_operation': 'MERGE',
+                'operation_timestamp': timezone.now(),
+            }
+        )
+        
+        local_state = state.state or empty_state(state.vector_clock)
+        merged = merge_states(local_state, remote_delta)
+        
+        # Apply the winning registers and surviving items to the order row
+        for field, register in merged['fields'].items():
+            if field in ORDER_FIELDS:
+                setattr(order, field, register['value'])
+        if merged['items']['adds']:
+            order.order_items = item_values(merged)
+        
+        remote_clock = remote_delta.get('clock', {})
+        local_ahead = compare_clocks(local_state['clock'], remote_clock) in ('after', 'concurrent')
+        
+        order.sync_status = 'PENDING_SYNC' if local_ahead else 'SYNCED'
+        order.sync_version += 1
+        order.save()
+        
+        state.state = merged
+        state.vector_clock = merged['clock']
+        # The peer already holds everything it sent us
+        state.acked_clock = merge_clocks(state.acked_clock, remote_clock)
+        state.last_operation = 'MERGE'
+        state.operation_timestamp = timezone.now()
+        state.save()
+        
+        if local_ahead:
+            # Ship back only what the peer is missing
+            sync_item.payload = {
+                **sync_item.payload,
+                'delta': delta_since(merged, remote_clock),
+                'vector_clock': merged['clock'],
+            }
+            sync_item.status = 'PENDING'
+        else:
+            sync_item.status = 'COMPLETED'
+        sync_item.conflict_data = None
+        sync_item.save()
+        
+        return True
+    
     def _force_push_to_supabase(self, sync_item: SyncQueue) -> bool:
         #Force push local version to Supabase
         # Implementation similar to regular sync but with force flag
@@ -200,7 +551,9 @@ class SyncManager:
             order = OfflineOrder.objects.get(id=order_id)
             
             # Fetch latest from Supabase
-            remote_order = self.supabase.get_order(order.supabase_order_id)
+            remote_order = self.supabase.get_order(
+                str(order.restaurant.supabase_restaurant_id), order.supabase_order_id
+            )
             
             if remote_order:
                 # Update local with remote data
@@ -2,58 +2,100 @@
 
 
 import logging
+import os
+import socket
 from celery import shared_task
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import F
 from django.conf import settings
 
 from apps.core.models import SyncQueue, ActivityLog
 from apps.core.services.supabase_client import supabase_client
+from .replication import pull_replicator
 from .services import SyncManager
 
 logger = logging.getLogger('dineswift')
 
+def _worker_id(task) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{task.request.id or 'local'}"
+
+def _process_items(sync_manager, items) -> tuple:
+    synced_count = 0
+    failed_count = 0
+    
+    for item in items:
+        try:
+            success = sync_manager.process_sync_item(item)
+            if success:
+                synced_count += 1
+            else:
+                failed_count += 1
+        except Exception as e:
+            logger.error(
+                f'Failed to sync item {item.id}: {str(e)}',
+                exc_info=True
+            )
+            failed_count += 1
+    
+    return synced_count, failed_count
+
 @shared_task(
     name='apps.sync_manager.tasks.sync_pending_orders',
     bind=True,
     max_retries=3,
     default_retry_delay=60
 )
-def sync_pending_orders(self):
+def sync_pending_orders(self, fan_out=True):
     
     #Sync pending orders to Supabase
     #UC-LOCAL-ORDER-105
+    #Items are leased with SKIP LOCKED, so any number of these tasks can
+    #drain the queue side by side without processing an item twice.
    
     try:
-        sync_manager = SyncManager()
-        batch_size = settings.SYNC_CONFIG['batch_size']
-        
-        # Get pending sync items
-        pending_items = SyncQueue.objects.filter(
-            status='PENDING',
-            sync_type__in=['ORDER_CREATE', 'ORDER_UPDATE']
-        ).order_by('priority', 'created_at')[:batch_size]
+        # Uplink down: leave the queue alone until the breaker closes
+        if not supabase_client.ensure_available():
+            logger.debug('Supabase circuit open, skipping sync run')
+            return {'synced': 0, 'failed': 0, 'skipped': True}
         
-        if not pending_items:
-            logger.debug('No pending orders to sync')
-            return {'synced': 0, 'failed': 0}
+        sync_manager = SyncManager()
+        config = settings.SYNC_CONFIG
+        batch_size = config['batch_size']
+        worker_id = _worker_id(self)
         
         synced_count = 0
         failed_count = 0
         
-        for item in pending_items:
-            try:
-                success = sync_manager.process_sync_item(item)
-                if success:
-                    synced_count += 1
-                else:
-                    failed_count += 1
-            except Exception as e:
-                logger.error(
-                    f'Failed to sync item {item.id}: {str(e)}',
-                    exc_info=True
-                )
-                failed_count += 1
+        for batch_number in range(config['max_batches_per_run']):
+            pending_items = SyncQueue.objects.claim(
+                worker_id,
+                batch_size,
+                lease_seconds=config['lease_seconds'],
+                sync_types=['ORDER_CREATE', 'ORDER_UPDATE']
+            )
+            
+            if not pending_items:
+                break
+            
+            if batch_number and supabase_client.circuit_open():
+                SyncQueue.objects.filter(
+                    id__in=[item.id for item in pending_items], leased_by=worker_id
+                ).update(status='PENDING', leased_by='', lease_expires_at=None)
+                break
+            
+            # A full first batch means a backlog: start sibling drainers
+            if batch_number == 0 and fan_out and len(pending_items) == batch_size:
+                for _ in range(config['workers'] - 1):
+                    sync_pending_orders.delay(fan_out=False)
+            
+            synced, failed = sync_manager.process_batch(pending_items)
+            synced_count += synced
+            failed_count += failed
+        
+        if not synced_count and not failed_count:
+            logger.debug('No pending orders to sync')
+            return {'synced': 0, 'failed': 0}
         
         logger.info(
             f'Sync completed: {synced_count} synced, {failed_count} failed',
@@ -69,32 +111,32 @@ def sync_pending_orders(self):
         logger.error(f'Sync task failed: {str(e)}', exc_info=True)
         raise self.retry(exc=e)
 
-@shared_task(name='apps.sync_manager.tasks.retry_failed_syncs')
-def retry_failed_syncs():
+@shared_task(name='apps.sync_manager.tasks.retry_failed_syncs', bind=True)
+def retry_failed_syncs(self):
     
     #Retry failed sync operations
     
     try:
+        if not supabase_client.ensure_available():
+            return {'retried': 0, 'abandoned': 0, 'skipped': True}
+        
         sync_manager = SyncManager()
         
-        # Get failed items ready for retry
-        retry_items = SyncQueue.objects.filter(
+        # Abandon items that are out of retries
+        abandoned_count = SyncQueue.objects.filter(
             status='FAILED',
-            next_retry__lte=timezone.now()
-        ).order_by('priority', 'next_retry')[:50]
+            retry_count__gte=F('max_retries')
+        ).update(status='CANCELLED')
+        
+        # Lease failed items ready for retry
+        retry_items = SyncQueue.objects.claim(
+            _worker_id(self),
+            50,
+            lease_seconds=settings.SYNC_CONFIG['lease_seconds'],
+            retry=True
+        )
         
-        retried_count = 0
-        abandoned_count = 0
-        
-        for item in retry_items:
-            if item.can_retry():
-                success = sync_manager.process_sync_item(item)
-                if success:
-                    retried_count += 1
-            else:
-                item.status = 'CANCELLED'
-                item.save()
-                abandoned_count += 1
+        retried_count, _ = _process_items(sync_manager, retry_items)
         
         logger.info(
             f'Retry completed: {retried_count} retried, {abandoned_count} abandoned'
@@ -106,6 +148,53 @@ def retry_failed_syncs():
         logger.error(f'Retry task failed: {str(e)}', exc_info=True)
         return {'error': str(e)}
 
+@shared_task(name='apps.sync_manager.tasks.reap_expired_sync_leases')
+def reap_expired_sync_leases():
+    
+    #Return items leased by crashed or stalled workers to PENDING
+    
+    try:
+        released = SyncQueue.objects.release_expired_leases()
+        if released:
+            logger.warning(f'Released {released} expired sync leases')
+        return {'released': released}
+        
+    except Exception as e:
+        logger.error(f'Lease reaper failed: {str(e)}', exc_info=True)
+        return {'error': str(e)}
+
+@shared_task(name='apps.sync_manager.tasks.pull_remote_changes')
+def pull_remote_changes():
+    
+    #Apply rows changed in Supabase since each table's cursor
+    #One incremental keyset query per table and restaurant per run
+    
+    try:
+        if not supabase_client.ensure_available():
+            return {'skipped': True}
+        
+        return pull_replicator.pull_all()
+        
+    except Exception as e:
+        logger.error(f'Pull replication failed: {str(e)}', exc_info=True)
+        return {'error': str(e)}
+
+@shared_task(name='apps.sync_manager.tasks.probe_supabase_circuit')
+def probe_supabase_circuit():
+    
+    #Probe Supabase while the circuit is open and restart draining on recovery
+    #Runs every few seconds; a no-op while the circuit is closed
+    
+    if not supabase_client.circuit_open():
+        return {'circuit': 'CLOSED'}
+    
+    if supabase_client.ensure_available():
+        logger.info('Supabase reachable again, resuming sync')
+        sync_pending_orders.delay()
+        return {'circuit': 'CLOSED', 'resumed': True}
+    
+    return {'circuit': supabase_client.breaker.state}
+
 @shared_task(name='apps.sync_manager.tasks.resolve_conflicts')
 def resolve_conflicts():
   #Resolve sync conflicts using CRDT
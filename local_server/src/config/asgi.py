@@ -9,6 +9,7 @@ from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 
+from apps.core.warmup import cache_warmup
 from apps.order_processing.routing import websocket_urlpatterns
 
 application = ProtocolTypeRouter({
@@ -18,4 +19,7 @@ application = ProtocolTypeRouter({
             URLRouter(websocket_urlpatterns)
         )
     ),
-})
\ No newline at end of file
+})
+
+# Fill caches before the first diners arrive; /api/ready/ reports progress
+cache_warmup.start('asgi')
@@ -1,6 +1,6 @@
 import os
 from celery import Celery
-from celery.signals import task_failure, task_success
+from celery.signals import task_failure, task_success, worker_process_init
 from django.conf import settings
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -35,4 +35,11 @@ def handle_task_success(sender=None, result=None, **kwargs):
                 'task_id': sender.request.id,
                 'task_name': sender.name,
             }
-        )
\ No newline at end of file
+        )
+
+@worker_process_init.connect
+def warm_worker_caches(**kwargs):
+    # Runs in each pool process after the fork, in the background so the
+    # process init timeout is not spent on it
+    from apps.core.warmup import cache_warmup
+    cache_warmup.start('celery')
@@ -104,6 +104,11 @@ SUPABASE_CONFIG = {
     'anon_key': os.environ['SUPABASE_ANON_KEY'],
     'service_key': os.environ['SUPABASE_SERVICE_KEY'],
     'jwt_secret': os.environ['SUPABASE_JWT_SECRET'],
+    # Pooled HTTP transport (one pool per process)
+    'max_connections': int(os.getenv('SUPABASE_MAX_CONNECTIONS', 10)),
+    'max_keepalive': int(os.getenv('SUPABASE_MAX_KEEPALIVE', 5)),
+    'timeout': float(os.getenv('SUPABASE_TIMEOUT', 10)),
+    'http2': os.getenv('SUPABASE_HTTP2', 'True').lower() == 'true',
 }
 
 # REST Framework
@@ -218,6 +223,18 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.core.tasks.perform_health_check',
         'schedule': 120.0,
     },
+    'reap-sync-leases': {
+        'task': 'apps.sync_manager.tasks.reap_expired_sync_leases',
+        'schedule': 60.0,
+    },
+    'pull-remote-changes': {
+        'task': 'apps.sync_manager.tasks.pull_remote_changes',
+        'schedule': 30.0,
+    },
+    'probe-supabase-circuit': {
+        'task': 'apps.sync_manager.tasks.probe_supabase_circuit',
+        'schedule': 5.0,
+    },
 }
 
 # Field Encryption
@@ -229,6 +246,63 @@ SYNC_CONFIG = {
     'retry_delay': int(os.getenv('SYNC_RETRY_DELAY', 60)),
     'max_retries': int(os.getenv('SYNC_MAX_RETRIES', 5)),
     'conflict_resolution': 'last_write_wins',
+    'lease_seconds': int(os.getenv('SYNC_LEASE_SECONDS', 300)),  # Claimed items return to PENDING after this
+    'workers': int(os.getenv('SYNC_WORKERS', 4)),  # Parallel drain tasks during a backlog
+    'max_batches_per_run': int(os.getenv('SYNC_MAX_BATCHES_PER_RUN', 20)),
+    'push_chunk_size': int(os.getenv('SYNC_PUSH_CHUNK_SIZE', 100)),  # Orders per Supabase upsert
+    'node_id': os.getenv('SYNC_NODE_ID', 'local'),  # This replica's vector clock entry
+    'pull_page_size': int(os.getenv('SYNC_PULL_PAGE_SIZE', 500)),  # Rows per incremental pull request
+    'pull_max_pages': int(os.getenv('SYNC_PULL_MAX_PAGES', 20)),
+    'menu_concurrency': int(os.getenv('SYNC_MENU_CONCURRENCY', 8)),  # Restaurants synced at once
+    'menu_timeout': float(os.getenv('SYNC_MENU_TIMEOUT', 30)),  # Seconds per restaurant menu sync
+}
+
+# Supabase circuit breaker (state shared between workers through the cache)
+CIRCUIT_BREAKER_CONFIG = {
+    'failure_rate': float(os.getenv('CIRCUIT_FAILURE_RATE', 0.5)),  # Failed share of calls that opens it
+    'min_calls': int(os.getenv('CIRCUIT_MIN_CALLS', 5)),
+    'window_seconds': int(os.getenv('CIRCUIT_WINDOW_SECONDS', 30)),
+    'open_seconds': int(os.getenv('CIRCUIT_OPEN_SECONDS', 10)),  # Wait before the recovery probe
+    'slow_call_seconds': float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', 5)),  # Slower calls count as failures
+}
+
+# Menu cache (per-process LRU in front of Redis)
+MENU_CACHE_CONFIG = {
+    'max_entries': int(os.getenv('MENU_CACHE_MAX_ENTRIES', 64)),  # Menu versions kept per process
+    'pointer_ttl': float(os.getenv('MENU_CACHE_POINTER_TTL', 60)),  # Trust in-process version while subscribed
+    'unsubscribed_pointer_ttl': float(os.getenv('MENU_CACHE_UNSUBSCRIBED_POINTER_TTL', 5)),
+    'timeout': int(os.getenv('MENU_CACHE_TIMEOUT', 3600)),
+    'lock_timeout': int(os.getenv('MENU_CACHE_LOCK_TIMEOUT', 10)),  # Refill lock held by one process
+    'lock_wait': float(os.getenv('MENU_CACHE_LOCK_WAIT', 2)),  # Wait for another process's refill
+    'backoff_max': float(os.getenv('MENU_CACHE_BACKOFF_MAX', 60)),  # Longest pause after Redis errors
+    'channel': os.getenv('MENU_CACHE_CHANNEL', 'dineswift:menu_invalidation'),
+}
+
+# Order sequence allocation (numbers reserved per worker process)
+ORDER_SEQUENCE_CONFIG = {
+    'block_size': int(os.getenv('ORDER_SEQUENCE_BLOCK_SIZE', 20)),
+    'use_cache': os.getenv('ORDER_SEQUENCE_USE_CACHE', 'True').lower() == 'true',
+}
+
+# WebSocket event dispatch (per connection)
+WEBSOCKET_CONFIG = {
+    'batch_window_ms': int(os.getenv('WS_BATCH_WINDOW_MS', 50)),  # Events buffered before one batched send
+    'max_pending_events': int(os.getenv('WS_MAX_PENDING_EVENTS', 200)),  # Orders buffered before a resync
+    'max_lag_ms': int(os.getenv('WS_MAX_LAG_MS', 2000)),  # Age of the oldest unsent event before a resync
+    'access_cache_ttl': float(os.getenv('WS_ACCESS_CACHE_TTL', 60)),  # Seconds an order access decision is reused
+}
+
+# Authentication lookups cached per process
+AUTH_CACHE_CONFIG = {
+    'restaurant_ttl': int(os.getenv('AUTH_RESTAURANT_CACHE_TTL', 300)),  # Seconds a restaurant lookup is reused; saves invalidate at once
+    'restaurant_check_interval': float(os.getenv('AUTH_RESTAURANT_CHECK_INTERVAL', 5)),  # Seconds between checks for changes made by other processes
+    'token_max_entries': int(os.getenv('AUTH_TOKEN_CACHE_MAX_ENTRIES', 1024)),  # Verified tokens kept per process
+    'token_max_ttl': float(os.getenv('AUTH_TOKEN_CACHE_MAX_TTL', 300)),  # Upper bound below the token's own exp
+}
+
+# Cache warmup when a server or worker process starts
+WARMUP_CONFIG = {
+    'enabled': os.getenv('WARMUP_ENABLED', 'True').lower() == 'true',  # Disabled processes report ready at once
 }
 
 # Create logs directory if it doesn't exist
@@ -320,9 +394,7 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR.parent / 'media'
 
 
-CELERY_BEAT_SCHEDULE = {
-    # ... existing tasks ...
-    
+CELERY_BEAT_SCHEDULE.update({
     'monitor-payments': {
         'task': 'apps.billing.tasks.monitor_pending_payments',
         'schedule': 120.0,  # Every 2 minutes
@@ -331,7 +403,7 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.billing.tasks.expire_old_payments',
         'schedule': 600.0,  # Every 10 minutes
     },
-}
+})
 """
 
 ## 📝 **Summary: Two Payment Processing Paths**
@@ -3,7 +3,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from prometheus_client import make_wsgi_app
+from apps.core.metrics import metrics_view
 from django.http import JsonResponse
 
 def health_check(request):
@@ -17,15 +17,25 @@ def health_check(request):
         'components': list(checks)
     }, status=200 if all_healthy else 503)
 
+def readiness_check(request):
+    from apps.core.warmup import cache_warmup
+    
+    # Processes not started through asgi/wsgi begin warming on first probe
+    cache_warmup.start('readiness')
+    status = cache_warmup.status()
+    
+    return JsonResponse(status, status=200 if cache_warmup.ready else 503)
+
 urlpatterns = [
     # Admin
     path('admin/', admin.site.urls),
     
     # Health check
     path('api/health/', health_check),
+    path('api/ready/', readiness_check),
     
     # Prometheus metrics
-    path('metrics/', make_wsgi_app()),
+    path('metrics/', metrics_view),
     
     
     # API endpoints - NOW ALL DEFINED!
@@ -14,3 +14,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
 
+# Fill caches before the first diners arrive; /api/ready/ reports progress
+from apps.core.warmup import cache_warmup  # noqa: E402
+cache_warmup.start('wsgi')
+
@@ -2,10 +2,16 @@
 
 
 import pytest
-from unittest.mock import Mock, patch
+import uuid
+from decimal import Decimal
+from unittest.mock import Mock, MagicMock, patch
+from django.utils import timezone
 from apps.sync_manager.services import SyncManager
 from apps.core.models import SyncQueue
-from apps.order_processing.models import OfflineOrder
+from apps.order_processing.models import OfflineOrder, OrderCRDTState
+from apps.order_processing.services import OrderProcessingService
+
+TEST_ITEM_UUID = 'a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11'
 
 @pytest.mark.django_db
 class TestSyncManager:
@@ -51,6 +57,7 @@ class TestSyncManager:
         )
         
         mock_supabase.sync_order.side_effect = Exception('Network error')
+        mock_supabase.circuit_open.return_value = False
         
         manager = SyncManager()
         success = manager.process_sync_item(sync_item)
@@ -59,4 +66,538 @@ class TestSyncManager:
         sync_item.refresh_from_db()
         assert sync_item.status == 'FAILED'
         assert sync_item.retry_count == 1
-        assert sync_item.next_retry is not None
\ No newline at end of file
+        assert sync_item.next_retry is not None
+
+
+@pytest.mark.django_db
+class TestSyncCoalescing:
+    """Tests for coalescing of pending ORDER_UPDATE sync rows"""
+    
+    def test_updates_merge_into_one_pending_row(self, test_restaurant):
+        service = OrderProcessingService()
+        result = service.create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+        })
+        order_id = result['order_id']
+        
+        # Create already pushed; later changes need ORDER_UPDATE rows
+        SyncQueue.objects.filter(restaurant=test_restaurant, sync_type='ORDER_CREATE').update(status='COMPLETED')
+        
+        for new_status in ['CONFIRMED', 'PREPARING', 'READY', 'COMPLETED']:
+            assert service.update_order_status(order_id, new_status, notes=new_status.lower())
+        
+        updates = SyncQueue.objects.filter(restaurant=test_restaurant, sync_type='ORDER_UPDATE', status='PENDING')
+        assert updates.count() == 1
+        payload = updates.get().payload
+        assert payload['previous_status'] == 'PENDING'
+        assert payload['new_status'] == 'COMPLETED'
+        assert payload['updates'] == {'status': 'COMPLETED'}
+        assert payload['coalesced'] == 4
+        # One tick per item plus one for the initial registers, then one per change
+        assert payload['vector_clock']['local'] == 6
+        assert payload['delta']['fields']['order_status']['value'] == 'COMPLETED'
+        assert payload['notes'] == 'confirmed\npreparing\nready\ncompleted'
+    
+    def test_legacy_duplicates_are_superseded(self, test_restaurant):
+        from apps.sync_manager.coalescing import sync_coalescer, order_coalesce_key
+        
+        order_id = '00000000-0000-0000-0000-0000000000aa'
+        for previous, new in [('PENDING', 'CONFIRMED'), ('CONFIRMED', 'PREPARING')]:
+            SyncQueue.objects.create(
+                restaurant=test_restaurant,
+                sync_type='ORDER_UPDATE',
+                coalesce_key=order_coalesce_key(order_id),
+                payload={'local_order_id': order_id, 'previous_status': previous,
+                         'new_status': new, 'updates': {'status': new}}
+            )
+        
+        counts = sync_coalescer.queue_order_updates([{
+            'restaurant_id': test_restaurant.id,
+            'local_order_id': order_id,
+            'previous_status': 'PREPARING',
+            'new_status': 'READY',
+            'timestamp': timezone.now().isoformat(),
+        }])
+        
+        assert counts == {'created': 0, 'merged': 1, 'folded': 0}
+        pending = SyncQueue.objects.get(restaurant=test_restaurant, status='PENDING')
+        assert pending.payload['previous_status'] == 'PENDING'
+        assert pending.payload['new_status'] == 'READY'
+        assert SyncQueue.objects.filter(restaurant=test_restaurant, status='CANCELLED').count() == 1
+    
+    def test_failed_update_merged_into_newer_update(self, test_restaurant):
+        from apps.sync_manager.coalescing import sync_coalescer, order_coalesce_key
+        
+        order_id = '00000000-0000-0000-0000-0000000000ab'
+        failed = SyncQueue.objects.create(
+            restaurant=test_restaurant,
+            sync_type='ORDER_UPDATE',
+            status='FAILED',
+            retry_count=1,
+            next_retry=timezone.now(),
+            coalesce_key=order_coalesce_key(order_id),
+            payload={'local_order_id': order_id, 'previous_status': 'PENDING',
+                     'new_status': 'CONFIRMED', 'updates': {'status': 'CONFIRMED'}}
+        )
+        
+        counts = sync_coalescer.queue_order_updates([{
+            'restaurant_id': test_restaurant.id,
+            'local_order_id': order_id,
+            'previous_status': 'CONFIRMED',
+            'new_status': 'PREPARING',
+            'timestamp': timezone.now().isoformat(),
+        }])
+        
+        assert counts == {'created': 1, 'merged': 0, 'folded': 0}
+        failed.refresh_from_db()
+        pending = SyncQueue.objects.get(restaurant=test_restaurant, status='PENDING')
+        assert failed.status == 'CANCELLED'
+        assert failed.error_message == f'Superseded by {pending.id}'
+        assert pending.payload['previous_status'] == 'PENDING'
+        assert pending.payload['new_status'] == 'PREPARING'
+        # Nothing left for the retry task to push after the newer change
+        assert SyncQueue.objects.claim('worker-a', 10, retry=True) == []
+
+
+@pytest.mark.django_db
+class TestSyncQueueLeasing:
+    """Tests for lease-based claiming of sync queue items"""
+    
+    def _queue(self, restaurant, count, **kwargs):
+        return [
+            SyncQueue.objects.create(
+                restaurant=restaurant,
+                sync_type='ORDER_CREATE',
+                payload={'local_order_id': str(i)},
+                **kwargs
+            )
+            for i in range(count)
+        ]
+    
+    def test_claims_do_not_overlap(self, test_restaurant):
+        self._queue(test_restaurant, 5)
+        
+        first = SyncQueue.objects.claim('worker-a', 3)
+        second = SyncQueue.objects.claim('worker-b', 3)
+        
+        assert len(first) == 3
+        assert len(second) == 2
+        assert not {item.id for item in first} & {item.id for item in second}
+        assert all(item.status == 'PROCESSING' and item.leased_by == 'worker-a' for item in first)
+        assert SyncQueue.objects.claim('worker-c', 3) == []
+    
+    def test_expired_leases_are_reaped(self, test_restaurant):
+        self._queue(test_restaurant, 2)
+        claimed = SyncQueue.objects.claim('worker-a', 2, lease_seconds=-1)
+        
+        assert SyncQueue.objects.release_expired_leases() == 2
+        
+        item = SyncQueue.objects.get(id=claimed[0].id)
+        assert item.status == 'PENDING'
+        assert item.lease_expires_at is None
+        assert len(SyncQueue.objects.claim('worker-b', 5)) == 2
+    
+    def test_retry_claims_only_due_failures(self, test_restaurant):
+        due = self._queue(test_restaurant, 1, status='FAILED', retry_count=1,
+                          next_retry=timezone.now())[0]
+        self._queue(test_restaurant, 1, status='FAILED', retry_count=5)
+        self._queue(test_restaurant, 1, status='PENDING')
+        
+        claimed = SyncQueue.objects.claim('worker-a', 10, retry=True)
+        
+        assert [item.id for item in claimed] == [due.id]
+    
+    def test_stale_worker_cannot_write_reclaimed_item(self, test_restaurant):
+        self._queue(test_restaurant, 1)
+        stale = SyncQueue.objects.claim('worker-a', 1, lease_seconds=-1)[0]
+        SyncQueue.objects.release_expired_leases()
+        SyncQueue.objects.claim('worker-b', 1)
+    
+        assert stale.update_leased(status='COMPLETED') is False
+        assert stale.mark_retry('timeout') is False
+    
+        item = SyncQueue.objects.get(id=stale.id)
+        assert (item.status, item.leased_by, item.retry_count) == ('PROCESSING', 'worker-b', 0)
+    
+    def test_renew_extends_only_held_leases(self, test_restaurant):
+        self._queue(test_restaurant, 2)
+        held, lost = SyncQueue.objects.claim('worker-a', 2, lease_seconds=-1)
+        SyncQueue.objects.filter(id=lost.id).update(leased_by='worker-b')
+    
+        assert SyncQueue.objects.renew_leases([held, lost], 300) == {held.id}
+        assert SyncQueue.objects.get(id=held.id).lease_expires_at > timezone.now()
+        assert SyncQueue.objects.release_expired_leases() == 1
+    
+    @patch('apps.sync_manager.services.supabase_client')
+    def test_batch_results_dropped_when_lease_lost(self, mock_supabase, test_restaurant):
+        mock_supabase.circuit_open.return_value = False
+        OrderProcessingService().create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+        })
+        items = SyncQueue.objects.claim('worker-a', 10)
+    
+        def push_while_reclaimed(restaurant_id, rows):
+            # The lease runs out mid-push and another worker claims the item
+            SyncQueue.objects.filter(id__in=[item.id for item in items]).update(leased_by='worker-b')
+            return [{'id': str(uuid.uuid4()), 'local_order_id': row['local_order_id']} for row in rows]
+        mock_supabase.batch_sync_orders.side_effect = push_while_reclaimed
+    
+        assert SyncManager().process_batch(items) == (0, 0)
+    
+        item = SyncQueue.objects.get(id=items[0].id)
+        assert (item.status, item.leased_by) == ('PROCESSING', 'worker-b')
+        assert OfflineOrder.objects.get(restaurant=test_restaurant).sync_status == 'PENDING_SYNC'
+    
+    @patch('apps.sync_manager.services.supabase_client')
+    def test_sync_task_drains_claimed_items(self, mock_supabase, test_restaurant):
+        from apps.sync_manager.tasks import sync_pending_orders
+        mock_supabase.circuit_open.return_value = False
+        
+        service = OrderProcessingService()
+        for _ in range(3):
+            service.create_offline_order(str(test_restaurant.id), {
+                'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+            })
+        mock_supabase.batch_sync_orders.side_effect = lambda restaurant_id, rows: [
+            {'id': str(uuid.uuid4()), 'local_order_id': row['local_order_id']} for row in rows
+        ]
+        
+        result = sync_pending_orders.apply(kwargs={'fan_out': False}).get()
+        
+        assert result == {'synced': 3, 'failed': 0}
+        assert SyncQueue.objects.filter(restaurant=test_restaurant, status='COMPLETED', leased_by='').count() == 3
+
+
+@pytest.mark.django_db
+class TestBatchOrderSync:
+    """Tests for chunked ORDER_CREATE pushes"""
+    
+    @patch('apps.sync_manager.services.supabase_client')
+    def test_creates_pushed_in_chunks(self, mock_supabase, test_restaurant, settings):
+        from apps.sync_manager.services import SyncManager
+        mock_supabase.circuit_open.return_value = False
+        
+        settings.SYNC_CONFIG = {**settings.SYNC_CONFIG, 'push_chunk_size': 2}
+        service = OrderProcessingService()
+        service.create_offline_orders_bulk(str(test_restaurant.id), [
+            {'items': [{'id': TEST_ITEM_UUID, 'name': f'Item {i}', 'price': '10.00', 'quantity': 1}]}
+            for i in range(5)
+        ])
+        # The last order is rejected upstream and must be retried later
+        rejected = OfflineOrder.objects.filter(restaurant=test_restaurant).order_by('-local_order_id').first().local_order_id
+        mock_supabase.batch_sync_orders.side_effect = lambda restaurant_id, rows: [
+            {'id': str(uuid.uuid4()), 'local_order_id': row['local_order_id']}
+            for row in rows if row['local_order_id'] != rejected
+        ]
+        
+        items = SyncQueue.objects.claim('worker-a', 10)
+        synced, failed = SyncManager().process_batch(items)
+        
+        assert (synced, failed) == (4, 1)
+        assert mock_supabase.batch_sync_orders.call_count == 3
+        assert mock_supabase.sync_order.call_count == 0
+        assert OfflineOrder.objects.filter(
+            restaurant=test_restaurant, sync_status='SYNCED', supabase_order_id__isnull=False
+        ).count() == 4
+        assert SyncQueue.objects.filter(restaurant=test_restaurant, status='COMPLETED').count() == 4
+        assert SyncQueue.objects.get(restaurant=test_restaurant, status='FAILED').retry_count == 1
+    
+    @patch('apps.sync_manager.services.supabase_client')
+    def test_missing_orders_are_cancelled(self, mock_supabase, test_restaurant):
+        from apps.sync_manager.services import SyncManager
+        
+        SyncQueue.objects.create(
+            restaurant=test_restaurant,
+            sync_type='ORDER_CREATE',
+            payload={'local_order_id': str(uuid.uuid4())}
+        )
+        
+        synced, failed = SyncManager().process_batch(SyncQueue.objects.claim('worker-a', 10))
+        
+        assert (synced, failed) == (0, 1)
+        assert SyncQueue.objects.get(restaurant=test_restaurant).status == 'CANCELLED'
+        mock_supabase.batch_sync_orders.assert_not_called()
+    
+    @patch('apps.sync_manager.services.supabase_client')
+    def test_updates_pushed_concurrently(self, mock_supabase, test_restaurant):
+        from apps.sync_manager.services import SyncManager
+        mock_supabase.circuit_open.return_value = False
+        
+        service = OrderProcessingService()
+        order_ids = [
+            service.create_offline_order(str(test_restaurant.id), {
+                'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+            })['order_id']
+            for _ in range(3)
+        ]
+        SyncQueue.objects.filter(restaurant=test_restaurant).delete()
+        # The last order was never pushed, so it has no Supabase id yet
+        OfflineOrder.objects.filter(id__in=order_ids[:2]).update(supabase_order_id=uuid.uuid4())
+        for order_id in order_ids:
+            SyncQueue.objects.create(
+                restaurant=test_restaurant,
+                sync_type='ORDER_UPDATE',
+                payload={'local_order_id': order_id, 'updates': {'status': 'CONFIRMED'}}
+            )
+        mock_supabase.run_concurrently.side_effect = lambda calls: [True for _ in calls]
+        
+        synced, failed = SyncManager().process_batch(SyncQueue.objects.claim('worker-a', 10))
+        
+        assert (synced, failed) == (2, 1)
+        assert mock_supabase.run_concurrently.call_count == 1
+        assert mock_supabase.update_order_async.call_count == 2
+        mock_supabase.update_order.assert_not_called()
+        assert OfflineOrder.objects.filter(id__in=order_ids, sync_status='SYNCED').count() == 2
+        assert SyncQueue.objects.filter(restaurant=test_restaurant, status='COMPLETED').count() == 2
+
+
+@pytest.mark.django_db
+class TestSyncDuringOutage:
+    """Tests for syncing while the Supabase circuit is open"""
+    
+    @patch('apps.sync_manager.tasks.supabase_client')
+    def test_sync_task_skips_while_open(self, mock_supabase, test_restaurant):
+        from apps.sync_manager.tasks import sync_pending_orders
+        
+        OrderProcessingService().create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+        })
+        mock_supabase.ensure_available.return_value = False
+        
+        result = sync_pending_orders.apply(kwargs={'fan_out': False}).get()
+        
+        assert result['skipped'] is True
+        assert SyncQueue.objects.get(restaurant=test_restaurant).status == 'PENDING'
+    
+    @patch('apps.sync_manager.services.supabase_client')
+    def test_outage_failures_do_not_spend_retries(self, mock_supabase, test_restaurant):
+        from apps.sync_manager.services import SyncManager
+        
+        OrderProcessingService().create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+        })
+        mock_supabase.batch_sync_orders.return_value = []
+        mock_supabase.circuit_open.return_value = True
+        
+        synced, failed = SyncManager().process_batch(SyncQueue.objects.claim('worker-a', 10))
+        
+        item = SyncQueue.objects.get(restaurant=test_restaurant)
+        assert (synced, failed) == (0, 1)
+        assert item.status == 'PENDING'
+        assert item.retry_count == 0
+        assert item.leased_by == ''
+
+
+@pytest.mark.django_db
+class TestCRDTSync:
+    """Tests for delta shipping and local conflict merges"""
+    
+    def _order(self, test_restaurant):
+        result = OrderProcessingService().create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+        })
+        return OfflineOrder.objects.get(id=result['order_id'])
+    
+    @patch('apps.sync_manager.services.supabase_client')
+    def test_update_pushes_delta_and_acks(self, mock_supabase, test_restaurant):
+        from apps.sync_manager.services import SyncManager
+        
+        mock_supabase.circuit_open.return_value = False
+        mock_supabase.batch_sync_orders.side_effect = lambda restaurant_id, rows: [
+            {'id': str(uuid.uuid4()), 'local_order_id': row['local_order_id']} for row in rows
+        ]
+        order = self._order(test_restaurant)
+        manager = SyncManager()
+        manager.process_batch(SyncQueue.objects.claim('worker-a', 10))
+        
+        OrderProcessingService().update_order_status(str(order.id), 'CONFIRMED')
+        mock_supabase.run_concurrently.side_effect = lambda calls: [True for _ in calls]
+        manager.process_batch(SyncQueue.objects.claim('worker-a', 10))
+        
+        # Only the changed register goes over the wire
+        mock_supabase.update_order_async.assert_called_once()
+        assert mock_supabase.update_order_async.call_args[0][2] == {'status': 'CONFIRMED'}
+        state = OrderCRDTState.objects.get(order=order)
+        assert state.acked_clock == state.vector_clock
+    
+    def test_conflict_merges_remote_delta_locally(self, test_restaurant):
+        from apps.sync_manager.services import SyncManager
+        from apps.order_processing.crdt import OrderCRDT
+        
+        order = self._order(test_restaurant)
+        state = OrderCRDTState.objects.get(order=order)
+        _, remote_delta = OrderCRDT('cloud').set_fields(
+            state.state, {'special_instructions': 'No onions'}, timezone.now()
+        )
+        item = SyncQueue.objects.create(
+            restaurant=test_restaurant,
+            sync_type='ORDER_UPDATE',
+            status='CONFLICT',
+            payload={'local_order_id': str(order.id)},
+            conflict_data={'remote_delta': remote_delta}
+        )
+        
+        with patch.object(SyncManager, '_pull_from_supabase') as pull:
+            assert SyncManager().resolve_conflict(item)
+        
+        pull.assert_not_called()
+        order.refresh_from_db()
+        item.refresh_from_db()
+        state.refresh_from_db()
+        assert order.special_instructions == 'No onions'
+        assert state.vector_clock['cloud'] == 1
+        assert state.acked_clock == remote_delta['clock']
+        assert item.status == 'COMPLETED'
+
+
+@pytest.mark.django_db
+class TestPullReplication:
+    """Tests for cursor-driven pull replication"""
+    
+    def _replicator(self, mock_supabase, pages):
+        from apps.sync_manager.replication import PullReplicator
+        
+        mock_supabase.fetch_changes.side_effect = list(pages)
+        replicator = PullReplicator()
+        replicator.supabase = mock_supabase
+        return replicator
+    
+    def _order(self, test_restaurant):
+        result = OrderProcessingService().create_offline_order(str(test_restaurant.id), {
+            'items': [{'id': TEST_ITEM_UUID, 'name': 'Burger', 'price': '10.00', 'quantity': 1}]
+        })
+        order = OfflineOrder.objects.get(id=result['order_id'])
+        order.supabase_order_id = uuid.uuid4()
+        order.save(update_fields=['supabase_order_id'])
+        return order
+    
+    def test_pages_applied_and_checkpointed(self, test_restaurant, settings):
+        from apps.sync_manager.models import SyncCursor
+        
+        settings.SYNC_CONFIG = {**settings.SYNC_CONFIG, 'pull_page_size': 2}
+        order = self._order(test_restaurant)
+        cloud_id = str(uuid.uuid4())
+        later = (timezone.now() + timezone.timedelta(minutes=1)).isoformat()
+        pages = [
+            [
+                {'id': str(order.supabase_order_id), 'local_order_id': order.local_order_id,
+                 'status': 'confirmed', 'updated_at': later},
+                {'id': cloud_id, 'status': 'pending', 'items': [], 'total_amount': 12.5,
+                 'updated_at': later},
+            ],
+            [
+                {'id': cloud_id, 'status': 'preparing', 'total_amount': 12.5, 'updated_at': later + 'Z'},
+            ],
+        ]
+        mock_supabase = MagicMock()
+        replicator = self._replicator(mock_supabase, pages)
+        
+        assert replicator.pull_table(test_restaurant, 'orders') == 3
+        
+        order.refresh_from_db()
+        assert order.order_status == 'CONFIRMED'
+        assert OrderCRDTState.objects.get(order=order).state['fields']['order_status']['node'] == 'cloud'
+        pulled = OfflineOrder.objects.get(supabase_order_id=cloud_id)
+        assert pulled.order_status == 'PREPARING'
+        assert pulled.sync_status == 'SYNCED'
+        
+        cursor = SyncCursor.objects.get(restaurant=test_restaurant, table_name='orders')
+        assert (cursor.last_updated_at, cursor.last_id, cursor.rows_pulled) == (later + 'Z', cloud_id, 3)
+        second_call = mock_supabase.fetch_changes.call_args_list[1]
+        assert second_call.kwargs['updated_after'] == later
+        assert second_call.kwargs['after_id'] == cloud_id
+    
+    def test_newer_local_change_wins(self, test_restaurant):
+        order = self._order(test_restaurant)
+        OrderProcessingService().update_order_status(str(order.id), 'CONFIRMED')
+        earlier = (timezone.now() - timezone.timedelta(minutes=5)).isoformat()
+        replicator = self._replicator(MagicMock(), [[
+            {'id': str(order.supabase_order_id), 'status': 'cancelled', 'updated_at': earlier},
+        ]])
+        
+        replicator.pull_table(test_restaurant, 'orders')
+        
+        order.refresh_from_db()
+        assert order.order_status == 'CONFIRMED'
+    
+    def test_failed_fetch_keeps_cursor(self, test_restaurant):
+        from apps.sync_manager.models import SyncCursor
+        
+        replicator = self._replicator(MagicMock(), [None])
+        
+        assert replicator.pull_table(test_restaurant, 'orders') == 0
+        assert SyncCursor.objects.get(restaurant=test_restaurant).last_updated_at == ''
+    
+    def test_overtaken_run_keeps_newer_cursor(self, test_restaurant):
+        from apps.sync_manager.models import SyncCursor
+        
+        later = (timezone.now() + timezone.timedelta(minutes=1)).isoformat()
+        stale_row = {'id': str(uuid.uuid4()), 'status': 'pending', 'items': [], 'updated_at': later}
+        mock_supabase = MagicMock()
+        replicator = self._replicator(mock_supabase, [[stale_row]])
+        
+        def fetch_while_overtaken(*args, **kwargs):
+            # A concurrent run checkpoints a newer page while this one fetches
+            SyncCursor.objects.filter(restaurant=test_restaurant).update(
+                last_updated_at='2099-01-01T00:00:00Z', last_id='newer'
+            )
+            return [stale_row]
+        mock_supabase.fetch_changes.side_effect = fetch_while_overtaken
+        
+        assert replicator.pull_table(test_restaurant, 'orders') == 0
+        cursor = SyncCursor.objects.get(restaurant=test_restaurant, table_name='orders')
+        assert (cursor.last_updated_at, cursor.last_id) == ('2099-01-01T00:00:00Z', 'newer')
+        assert not OfflineOrder.objects.filter(supabase_order_id=stale_row['id']).exists()
+    
+    def test_failing_table_does_not_stop_others(self, test_restaurant):
+        from apps.sync_manager.replication import PullReplicator
+        
+        replicator = PullReplicator()
+        with patch.object(PullReplicator, 'pull_table', side_effect=[RuntimeError('bad row'), 4]):
+            replicator.appliers = {'orders': None, 'payments': None}
+            with patch('apps.sync_manager.replication.Restaurant.objects.filter') as mock_filter:
+                mock_filter.return_value = [test_restaurant]
+                totals = replicator.pull_all()
+        
+        assert totals == {'orders': 0, 'payments': 4}
+    
+    def test_payment_completion_time_is_parsed(self, test_restaurant):
+        from apps.payment.models import Payment
+        
+        order = self._order(test_restaurant)
+        payment = Payment.objects.create(
+            restaurant=test_restaurant, order=order, amount=Decimal('10.80'), gateway='CASH'
+        )
+        replicator = self._replicator(MagicMock(), [[
+            {'id': str(payment.id), 'status': 'completed', 'completed_at': '2025-01-01T12:30:00Z',
+             'updated_at': '2025-01-01T12:30:00Z'},
+        ]])
+        
+        replicator.pull_table(test_restaurant, 'payments')
+        
+        payment.refresh_from_db()
+        assert payment.status == 'COMPLETED'
+        assert payment.completed_at.isoformat() == '2025-01-01T12:30:00+00:00'
+
+
+class TestBeatSchedule:
+    """Periodic sync tasks survive every CELERY_BEAT_SCHEDULE block in settings"""
+    
+    def _scheduled(self, task):
+        from django.conf import settings
+        return {entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()} >= {task.name}
+    
+    def test_lease_reaper_is_scheduled(self):
+        from apps.sync_manager.tasks import reap_expired_sync_leases
+        
+        assert self._scheduled(reap_expired_sync_leases)
+    
+    def test_pull_replication_is_scheduled(self):
+        from apps.sync_manager.tasks import pull_remote_changes
+        
+        assert self._scheduled(pull_remote_changes)
+    
+    def test_circuit_probe_is_scheduled(self):
+        from apps.sync_manager.tasks import probe_supabase_circuit
+        
+        assert self._scheduled(probe_supabase_circuit)